@@ -49,6 +49,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryCountHeaderMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,17 +86,65 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connections each process may pool (0 opens a connection per request),
+# seconds to wait for a free one, seconds to reuse one for, and seconds
+# idle after which one is pinged before reuse
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5))
+DB_POOL_MAX_LIFETIME = float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800))
+DB_POOL_CHECK_IDLE = float(os.environ.get('DB_POOL_CHECK_IDLE', 10))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'core.pooled_postgresql' if DB_POOL_SIZE > 0 else 'django.db.backends.postgresql'
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'PORT': os.environ.get('DB_PORT'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'POOL': {
+            'MAX_SIZE': DB_POOL_SIZE,
+            'TIMEOUT': DB_POOL_TIMEOUT,
+            'MAX_LIFETIME': DB_POOL_MAX_LIFETIME,
+            'CHECK_IDLE': DB_POOL_CHECK_IDLE,
+        },
     }
 }
 
+# Read replicas (comma separated host[:port], same name and credentials as
+# the primary) serving the reads of GET, HEAD and OPTIONS requests, and
+# seconds a client's requests stay on the primary after it wrote; set it
+# above the replicas' lag. Pointing a replica at the primary's own host
+# exercises the routing locally.
+DB_REPLICA_HOSTS = [host for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host]
+DB_REPLICA_PIN_SECONDS = float(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+
+DB_REPLICAS = []
+for index, replica_host in enumerate(DB_REPLICA_HOSTS):
+    replica_host, _, replica_port = replica_host.partition(':')
+    DB_REPLICAS.append(f'replica_{index}')
+    DATABASES[DB_REPLICAS[-1]] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'PORT': replica_port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Use a cache shared by all workers (e.g. rediscache://, as deployed) so cache
+# invalidations reach every worker. Auth tokens and API responses are not
+# cached with a process-local cache, and replica routing refuses to start
+# with one.
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -133,6 +185,9 @@ STATIC_ROOT = os.path.join(BASE_DIR, '/static_files/static')
 MEDIA_URL = '/static/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, '/static_files/media')
 
+# Processes rendering uploaded image variants (0 renders inline)
+IMAGE_PROCESSING_WORKERS = int(os.environ.get('IMAGE_PROCESSING_WORKERS', 2))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -140,10 +195,55 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+# Threads hashing passwords for the token endpoint on the whole node, shared
+# out between the uWSGI processes, and seconds a request waits for its hash
+# before giving up with a 503 (see core/passwords.py). Half the cores by
+# default, leaving the rest to the API.
+PASSWORD_HASH_WORKERS = int(
+    os.environ.get('PASSWORD_HASH_WORKERS', max((os.cpu_count() or 1) // 2, 1))
+)
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Seconds an authenticated token stays cached
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 300))
+
+# Seconds a cached recipe API response is kept
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+
+# API list pagination
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 1000))
+
+# Tag and ingredient autocomplete matches returned by default and at most
+AUTOCOMPLETE_LIMIT = int(os.environ.get('AUTOCOMPLETE_LIMIT', 10))
+AUTOCOMPLETE_MAX_LIMIT = int(os.environ.get('AUTOCOMPLETE_MAX_LIMIT', 50))
+
+# Report DB queries per request in a response header, for load tests
+DB_QUERY_COUNT_HEADER = bool(int(os.environ.get('DB_QUERY_COUNT_HEADER', 0)))
+
+# Record Prometheus metrics, served at /api/metrics/ with the bearer token
+METRICS_ENABLED = bool(int(os.environ.get('METRICS_ENABLED', 1)))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Profile requests of staff users sending an X-Profile header
+REQUEST_PROFILING = bool(int(os.environ.get('REQUEST_PROFILING', 1)))
+
+# Render recipe list pages from values() rows instead of serializer instances
+API_FAST_READ = bool(int(os.environ.get('API_FAST_READ', 1)))
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
@@ -30,11 +30,18 @@ from core import views as core_views
 urlpatterns = [
     path(f'{PANEL_NAME}/', admin.site.urls),
     path('api/health-check/', core_views.health_check, name='health-check'),
+    path(
+        'api/async/health-check/',
+        core_views.health_check_async,
+        name='health-check-async',
+    ),
+    path('api/metrics/', core_views.metrics, name='metrics'),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
     path('', SpectacularSwaggerView.as_view(url_name='api-schema'), name='api-docs'),
     path('redoc/', SpectacularRedocView.as_view(url_name='api-schema'), name='redoc'),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path('api/async/recipe/', include('recipe.async_urls')),
 ]
 
 if settings.DEBUG:
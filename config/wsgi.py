@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+try:
+    # Only importable in processes run by uWSGI
+    import uwsgi  # noqa: F401
+except ImportError:
+    pass
+else:
+    from core.warmup import install_uwsgi_hooks
+
+    install_uwsgi_hooks()
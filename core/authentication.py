@@ -0,0 +1,140 @@
+"""
+Authentication classes for the APIs.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core import metrics
+from core.caching import is_shared_cache
+
+CACHE_KEY_PREFIX = 'auth-token'
+# Cached in place of deleted tokens, so that a request which read the token
+# before it was deleted cannot cache it again
+REVOKED = 'revoked'
+
+
+def get_cache_key(key):
+    """Return the cache key for a token key."""
+    return f'{CACHE_KEY_PREFIX}:{key}'
+
+
+def _tokens():
+    """
+    Return the tokens queryset with their users, as they are cached.
+
+    The password hash is deferred, keeping it out of the cache; it is only
+    loaded if read.
+    """
+    return Token.objects.select_related('user').defer('user__password')
+
+
+def refresh_user_tokens(user):
+    """Cache every token of the user with the user's current state."""
+    # Loaded again rather than cached with the saved instance, which carries
+    # the password hash and may carry the raw password it was just set from
+    tokens = _tokens().filter(user=user)
+    cache.set_many(
+        {get_cache_key(token.key): token for token in tokens},
+        settings.AUTH_TOKEN_CACHE_TTL,
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that caches token to user lookups
+
+    Drop-in replacement for TokenAuthentication. Tokens are cached with their
+    user, less its password hash, for AUTH_TOKEN_CACHE_TTL seconds. Deleted tokens are replaced by a
+    revocation marker and the cached tokens of a user are replaced as soon
+    as the user is saved (deactivation, password or profile change), so the
+    user is checked to be active on every hit.
+
+    Tokens are only cached in a cache shared by every worker process;
+    otherwise a deleted token would keep working in the other workers.
+    Lookups are counted by result in the auth_token_cache_total metric.
+    """
+
+    def authenticate_credentials(self, key):
+        """Return the cached (user, token) pair, loading it on a miss."""
+        if not is_shared_cache():
+            return super().authenticate_credentials(key)
+
+        cache_key = get_cache_key(key)
+        token = cache.get(cache_key)
+        if token == REVOKED:
+            metrics.AUTH_TOKEN_CACHE.labels('revoked').inc()
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if token is None:
+            metrics.AUTH_TOKEN_CACHE.labels('miss').inc()
+            try:
+                token = _tokens().get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            # Does not replace an entry written since the token was read
+            cache.add(cache_key, token, settings.AUTH_TOKEN_CACHE_TTL)
+        else:
+            metrics.AUTH_TOKEN_CACHE.labels('hit').inc()
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return token.user, token
+
+
+async def _aget_active_token(key):
+    """Return the token with the key if its user is active, or None."""
+    try:
+        token = await _tokens().aget(key=key)
+    except Token.DoesNotExist:
+        return None
+    return token if token.user.is_active else None
+
+
+async def aauthenticate(request):
+    """
+    Return the active user of the request's token, or None.
+
+    Async counterpart of CachedTokenAuthentication sharing its cache entries,
+    for views served natively under ASGI.
+    """
+    auth = request.headers.get('Authorization', '').split()
+    if len(auth) != 2 or auth[0].lower() != 'token':
+        return None
+
+    if not is_shared_cache():
+        token = await _aget_active_token(auth[1])
+        return token and token.user
+
+    cache_key = get_cache_key(auth[1])
+    token = await cache.aget(cache_key)
+    if token == REVOKED:
+        metrics.AUTH_TOKEN_CACHE.labels('revoked').inc()
+        return None
+    if token is not None:
+        metrics.AUTH_TOKEN_CACHE.labels('hit').inc()
+        return token.user if token.user.is_active else None
+
+    metrics.AUTH_TOKEN_CACHE.labels('miss').inc()
+    token = await _aget_active_token(auth[1])
+    if token is not None:
+        await cache.aadd(cache_key, token, settings.AUTH_TOKEN_CACHE_TTL)
+    return token and token.user
+
+
+@receiver(post_delete, sender=Token)
+def revoke_deleted_token(sender, instance, **kwargs):
+    """Mark a token revoked in the cache once it is deleted."""
+    cache.set(get_cache_key(instance.key), REVOKED, settings.AUTH_TOKEN_CACHE_TTL)
+
+
+@receiver(post_save, sender=get_user_model())
+def refresh_saved_user_tokens(sender, instance, created, **kwargs):
+    """Refresh the cached tokens of a user whenever the user changes."""
+    if not created:
+        refresh_user_tokens(instance)
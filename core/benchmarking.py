@@ -0,0 +1,225 @@
+"""
+Helpers for benchmarks: timing code on a throwaway dataset, and HTTP load
+generation.
+"""
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.parse
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.db import transaction
+
+# Response header the QueryCountHeaderMiddleware reports DB queries in.
+QUERY_COUNT_HEADER = 'X-DB-Queries'
+
+Request = namedtuple('Request', ['method', 'path', 'body', 'headers'], defaults=[None, None])
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is rolled back, discarding its data."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def time_calls(func, repeat):
+    """
+    Call func repeat times, returning its timings and last result.
+
+    The timings are in milliseconds: the minimum and the median.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+    }, result
+
+
+def time_first_page(queryset, page_size, repeat):
+    """Return the rows and timings in milliseconds of fetching the first page."""
+    timings, rows = time_calls(lambda: list(queryset[:page_size]), repeat)
+
+    return {'rows': len(rows), **timings}
+
+
+def percentile(sorted_values, pct):
+    """Return the pct percentile of already sorted values (nearest rank)."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed, queries=None):
+    """
+    Summarize request latencies (seconds) as milliseconds and throughput.
+
+    queries are the DB query counts reported by the server, if any.
+    """
+    latencies = sorted(latencies)
+    to_ms = (lambda value: None if value is None else round(value * 1000, 3))
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0,
+        'latency_ms': {
+            'mean': to_ms(statistics.fmean(latencies)) if latencies else None,
+            'p50': to_ms(percentile(latencies, 50)),
+            'p95': to_ms(percentile(latencies, 95)),
+            'p99': to_ms(percentile(latencies, 99)),
+            'max': to_ms(latencies[-1]) if latencies else None,
+        },
+    }
+    if queries:
+        summary['db_queries'] = {
+            'mean': round(statistics.fmean(queries), 2),
+            'max': max(queries),
+        }
+
+    return summary
+
+
+class Client:
+    """Keep-alive HTTP client for an API root such as http://localhost:8000/api."""
+
+    def __init__(self, base_url, timeout=30):
+        url = urllib.parse.urlsplit(base_url)
+        self.connection_class = (
+            http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        )
+        self.netloc = url.netloc
+        self.prefix = url.path.rstrip('/')
+        self.timeout = timeout
+        self.connection = None
+
+    def send(self, request):
+        """Send request and return the response and its body."""
+        if self.connection is None:
+            self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+        try:
+            self.connection.request(
+                request.method,
+                self.prefix + request.path,
+                body=request.body,
+                headers=request.headers or {},
+            )
+            response = self.connection.getresponse()
+            return response, response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+
+    def json(self, method, path, data=None, headers=None):
+        """Send a JSON request and return the status and decoded response."""
+        headers = {'Content-Type': 'application/json', **(headers or {})}
+        body = json.dumps(data).encode() if data is not None else None
+        response, content = self.send(Request(method, path, body, headers))
+
+        return response.status, json.loads(content) if content else None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def send(client, request, result):
+    """Send request, adding its latency and DB queries, or an error, to result."""
+    start = time.perf_counter()
+    try:
+        response, _ = client.send(request)
+    except (OSError, http.client.HTTPException):
+        result['errors'] += 1
+        return
+    elapsed = time.perf_counter() - start
+    if response.status >= 400:
+        result['errors'] += 1
+        return
+    result['latencies'].append(elapsed)
+    queries = response.getheader(QUERY_COUNT_HEADER)
+    if queries is not None:
+        result['queries'].append(int(queries))
+
+
+def run_mix(base_url, operations, contexts, concurrency=8, duration=10.0, seed=0):
+    """
+    Run a weighted mix of operations from concurrency keep-alive connections.
+
+    operations maps a name to (weight, build), where build(context, rng)
+    returns the Request to send. Worker i uses contexts[i % len(contexts)],
+    e.g. the credentials and ids of one test user. Returns the summary of
+    every operation and of all requests together; responses with status 400
+    or above, connection failures and requests that could not be built are
+    counted as errors.
+    """
+    names = list(operations)
+    weights = [operations[name][0] for name in names]
+    deadline = time.perf_counter() + duration
+    lock = threading.Lock()
+    results = {name: {'latencies': [], 'errors': 0, 'queries': []} for name in names}
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        context = contexts[index % len(contexts)]
+        client = Client(base_url)
+        local = {name: {'latencies': [], 'errors': 0, 'queries': []} for name in names}
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            try:
+                request = operations[name][1](context, rng)
+            except (IndexError, KeyError, ValueError):
+                # e.g. nothing in the context to pick from
+                local[name]['errors'] += 1
+                continue
+            send(client, request, local[name])
+        client.close()
+        with lock:
+            for name, result in local.items():
+                results[name]['latencies'] += result['latencies']
+                results[name]['errors'] += result['errors']
+                results[name]['queries'] += result['queries']
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    summaries = {
+        name: summarize(result['latencies'], result['errors'], elapsed, result['queries'])
+        for name, result in results.items()
+    }
+    total = summarize(
+        [latency for result in results.values() for latency in result['latencies']],
+        sum(result['errors'] for result in results.values()),
+        elapsed,
+        [count for result in results.values() for count in result['queries']],
+    )
+    return {'total': total, 'operations': summaries}
+
+
+def run_load(base_url, paths, concurrency=8, duration=10.0, headers=None):
+    """
+    GET paths, picked evenly, from concurrency keep-alive connections for duration seconds.
+
+    Returns the summary of all requests.
+    """
+    operations = {
+        path: (1, lambda context, rng, path=path: Request('GET', path, headers=headers))
+        for path in paths
+    }
+
+    return run_mix(base_url, operations, [None], concurrency, duration)['total']
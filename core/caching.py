@@ -0,0 +1,22 @@
+"""
+Helpers for the caches shared by the worker processes.
+"""
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+
+# Backends whose entries only the process that wrote them can see
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache(alias=DEFAULT_CACHE_ALIAS):
+    """
+    Return whether a cache is shared by every worker process.
+
+    Entries that must be invalidated everywhere at once, like cached auth
+    tokens, must not be kept in a process-local cache: deleting them in one
+    worker would leave them valid in the others.
+    """
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
@@ -0,0 +1,99 @@
+"""
+Read replica routing with read-your-writes.
+
+ReplicaRoutingMiddleware picks one of the DB_REPLICAS for each GET, HEAD
+and OPTIONS request and ReplicaRouter sends the request's reads there;
+writes, reads inside transactions and every read of other requests go to
+the primary. After a client sends any other request, its requests stick to
+the primary for DB_REPLICA_PIN_SECONDS, so a recipe it just created is in
+its next list even while the replicas lag behind.
+
+Clients are told apart by their credentials (the Authorization header or
+the session cookie), as DRF only authenticates users inside the view. The
+pins are kept in the cache, which must be shared by all workers.
+"""
+import contextlib
+import contextvars
+import hashlib
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_KEY_PREFIX = 'db-primary-pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Models always read from the primary, so credentials created by one
+# request authenticate the next one
+PRIMARY_MODELS = {'authtoken.token', 'sessions.session'}
+
+_replica = contextvars.ContextVar('replica', default=None)
+
+
+class ReplicaRouter:
+    """Send the reads of replica routed requests to their replica."""
+
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if alias is None or model._meta.label_lower in PRIMARY_MODELS:
+            return None
+        # Reads in a transaction on the primary must see its writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+@contextlib.contextmanager
+def use_primary():
+    """Read from the primary inside the block, even in replica routed requests."""
+    token = _replica.set(None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def pin_key(request):
+    """Return the cache key pinning the request's client, or None when anonymous."""
+    credentials = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credentials:
+        return None
+
+    return f'{PIN_KEY_PREFIX}:{hashlib.sha256(credentials.encode()).hexdigest()}'
+
+
+def start_request(request):
+    """
+    Route the reads of a safe request to a replica, unless its client wrote
+    recently.
+
+    Returns the state to pass to finish_request.
+    """
+    key = pin_key(request)
+    if request.method not in SAFE_METHODS or (key is not None and cache.get(key)):
+        return key, None
+
+    return key, _replica.set(random.choice(settings.DB_REPLICAS))
+
+
+def finish_request(state, request):
+    """Stop routing to the replica, or pin the client after other requests."""
+    key, token = state
+    if token is not None:
+        _replica.reset(token)
+    elif key is not None and request.method not in SAFE_METHODS:
+        cache.set(key, True, settings.DB_REPLICA_PIN_SECONDS)
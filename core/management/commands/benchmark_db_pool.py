@@ -0,0 +1,102 @@
+"""
+Django command to compare per-request DB connections with pooled ones
+"""
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import DatabaseError, load_backend
+
+from core.benchmarking import summarize
+
+ENGINES = {
+    'direct': 'django.db.backends.postgresql',
+    'pooled': 'core.pooled_postgresql',
+}
+
+
+class Command(BaseCommand):
+    """
+    Run request-like cycles from concurrent threads: get a connection, run
+    a query, close the connection as Django does at the end of a request.
+    Each cycle opens a new connection without the pool and checks one out
+    with it. Reports cycle latency percentiles, throughput and the pool's
+    wait times as JSON.
+    """
+    help = 'Benchmark per-request DB connections against the connection pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--pool-size', type=int, default=max(settings.DB_POOL_SIZE, 1))
+        parser.add_argument('--query', default='SELECT 1', help='SQL run in each cycle')
+
+    def _run(self, mode, options):
+        """Run cycles from concurrent threads, returning the summary and pool."""
+        settings_dict = {
+            **connections['default'].settings_dict,
+            'ENGINE': ENGINES[mode],
+            'CONN_MAX_AGE': 0,
+            'POOL': {
+                **connections['default'].settings_dict.get('POOL', {}),
+                'MAX_SIZE': options['pool_size'],
+            },
+        }
+        backend = load_backend(settings_dict['ENGINE'])
+        deadline = time.perf_counter() + options['duration']
+        lock = threading.Lock()
+        latencies, errors, pools = [], [0], set()
+
+        def worker():
+            wrapper = backend.DatabaseWrapper(settings_dict, f'benchmark-{mode}')
+            local, failed = [], 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    with wrapper.cursor() as cursor:
+                        cursor.execute(options['query'])
+                        cursor.fetchall()
+                    wrapper.close()
+                except DatabaseError:
+                    failed += 1
+                    continue
+                local.append(time.perf_counter() - start)
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+                if getattr(wrapper, 'pool', None) is not None:
+                    pools.add(wrapper.pool)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        result = summarize(latencies, errors[0], time.perf_counter() - started)
+        for pool in pools:
+            stats = pool.stats()
+            result['pool'] = {
+                **stats,
+                'wait_ms_mean': round(
+                    stats['wait_seconds_total'] / max(stats['checkouts'], 1) * 1000, 3,
+                ),
+            }
+            pool.close_idle()
+
+        return result
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        results = {mode: self._run(mode, options) for mode in ENGINES}
+        direct, pooled = (results[mode]['latency_ms']['mean'] for mode in ENGINES)
+        self.stdout.write(json.dumps({
+            'options': {
+                key: options[key] for key in ('concurrency', 'duration', 'pool_size', 'query')
+            },
+            'results': results,
+            'saving_ms_per_request': round(direct - pooled, 3) if direct and pooled else None,
+        }, indent=2))
@@ -0,0 +1,60 @@
+"""
+Django command to compare API servers under the same read load
+"""
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarking import run_load
+
+READ_PATHS = [
+    '/recipe/recipes/',
+    '/recipe/tags/',
+    '/recipe/ingredients/',
+    '/health-check/',
+]
+
+
+class Command(BaseCommand):
+    """
+    Drive the read endpoints of each target with the same load and report
+    latency percentiles and throughput as JSON.
+
+    Targets are API roots, e.g. the uWSGI deployment at
+    ``uwsgi=http://localhost/api`` and the ASGI one at
+    ``asgi=http://localhost/api/async``. Give both servers the same number
+    of cores (uWSGI processes / uvicorn workers) for a fair comparison.
+    """
+    help = 'Compare read endpoint latency and throughput across API servers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True,
+            help='name=api_root_url, may be repeated',
+        )
+        parser.add_argument('--token', required=True, help='API token of a seeded user')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--duration', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        targets = {}
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep or not url:
+                raise CommandError(f'Invalid target "{target}", expected name=url')
+            targets[name] = url
+
+        headers = {'Authorization': f'Token {options["token"]}'}
+        results = {
+            name: run_load(url, READ_PATHS, options['concurrency'], options['duration'], headers)
+            for name, url in targets.items()
+        }
+        self.stdout.write(json.dumps({
+            'cpu_count': os.cpu_count(),
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'paths': READ_PATHS,
+            'results': results,
+        }, indent=2))
@@ -0,0 +1,256 @@
+"""
+Django command to load test the APIs of a running stack
+"""
+import io
+import json
+import os
+import random
+import time
+import uuid
+
+from PIL import Image
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarking import Client, Request, run_mix
+
+PASSWORD = 'loadtest-pass-123'
+WORDS = ['curry', 'soup', 'salad', 'pasta', 'vegan', 'spicy', 'quick', 'baked', 'lemon', 'tofu']
+
+MIXES = {
+    'read': {
+        'recipe_list': 30, 'recipe_detail': 20, 'recipe_filter': 10, 'recipe_search': 10,
+        'tag_list': 10, 'ingredient_list': 10, 'tag_autocomplete': 5, 'user_me': 5,
+    },
+    'write': {
+        'recipe_create': 35, 'recipe_update': 45, 'tag_update': 10, 'image_upload': 10,
+    },
+    'login': {
+        'token': 90, 'user_me': 10,
+    },
+    'mixed': {
+        'recipe_list': 25, 'recipe_detail': 15, 'recipe_filter': 8, 'recipe_search': 8,
+        'tag_list': 8, 'ingredient_list': 6, 'tag_autocomplete': 5, 'user_me': 5,
+        'recipe_create': 6, 'recipe_update': 8, 'image_upload': 1, 'token': 3, 'user_create': 2,
+    },
+}
+
+
+def json_request(method, path, context, data=None):
+    """Return an authenticated JSON request."""
+    headers = {'Authorization': f'Token {context["token"]}'}
+    if data is None:
+        return Request(method, path, headers=headers)
+
+    headers['Content-Type'] = 'application/json'
+    return Request(method, path, json.dumps(data).encode(), headers)
+
+
+def recipe_payload(rng):
+    """Return a random recipe payload with a few tags and ingredients."""
+    return {
+        'title': ' '.join(rng.sample(WORDS, 3)),
+        'time_minutes': rng.randint(5, 120),
+        'price': f'{rng.randint(100, 9999) / 100:.2f}',
+        'description': ' '.join(rng.choices(WORDS, k=20)),
+        'tags': [{'name': f'Tag {rng.randint(0, 19)}'} for _ in range(2)],
+        'ingredients': [{'name': f'Ingredient {rng.randint(0, 49)}'} for _ in range(3)],
+    }
+
+
+def upload_request(context, rng):
+    """Return a multipart image upload to one of the user's recipes."""
+    boundary = uuid.uuid4().hex
+    body = b''.join([
+        f'--{boundary}\r\n'.encode(),
+        b'Content-Disposition: form-data; name="image"; filename="load.jpg"\r\n',
+        b'Content-Type: image/jpeg\r\n\r\n',
+        context['image'],
+        f'\r\n--{boundary}--\r\n'.encode(),
+    ])
+    headers = {
+        'Authorization': f'Token {context["token"]}',
+        'Content-Type': f'multipart/form-data; boundary={boundary}',
+    }
+    recipe_id = rng.choice(context['recipe_ids'])
+
+    return Request('POST', f'/recipe/recipes/{recipe_id}/upload-image/', body, headers)
+
+
+OPERATIONS = {
+    'health': lambda c, rng: Request('GET', '/health-check/'),
+    'user_create': lambda c, rng: Request(
+        'POST', '/user/create/',
+        json.dumps({
+            'email': f'loadtest-{uuid.uuid4().hex}@example.com',
+            'password': PASSWORD,
+            'name': 'Load Test',
+        }).encode(),
+        {'Content-Type': 'application/json'},
+    ),
+    'token': lambda c, rng: Request(
+        'POST', '/user/token/',
+        json.dumps({'email': c['email'], 'password': PASSWORD}).encode(),
+        {'Content-Type': 'application/json'},
+    ),
+    'user_me': lambda c, rng: json_request('GET', '/user/me/', c),
+    'recipe_list': lambda c, rng: json_request('GET', '/recipe/recipes/', c),
+    'recipe_filter': lambda c, rng: json_request(
+        'GET', f'/recipe/recipes/?tags={",".join(map(str, rng.sample(c["tag_ids"], 2)))}', c,
+    ),
+    'recipe_search': lambda c, rng: json_request(
+        'GET', f'/recipe/recipes/?search={rng.choice(WORDS)}', c,
+    ),
+    'recipe_detail': lambda c, rng: json_request(
+        'GET', f'/recipe/recipes/{rng.choice(c["recipe_ids"])}/', c,
+    ),
+    'recipe_create': lambda c, rng: json_request(
+        'POST', '/recipe/recipes/', c, recipe_payload(rng),
+    ),
+    'recipe_update': lambda c, rng: json_request(
+        'PATCH', f'/recipe/recipes/{rng.choice(c["recipe_ids"])}/', c,
+        {'time_minutes': rng.randint(5, 120)},
+    ),
+    'tag_list': lambda c, rng: json_request('GET', '/recipe/tags/?with_counts=1', c),
+    'tag_update': lambda c, rng: json_request(
+        'PATCH', f'/recipe/tags/{rng.choice(c["tag_ids"])}/', c,
+        {'name': f'Tag {rng.randint(0, 19)} {uuid.uuid4().hex[:6]}'},
+    ),
+    'tag_autocomplete': lambda c, rng: json_request(
+        'GET', f'/recipe/tags/?q={rng.choice(["ta", "tag", "tag 1"])}'.replace(' ', '%20'), c,
+    ),
+    'ingredient_list': lambda c, rng: json_request('GET', '/recipe/ingredients/', c),
+    'image_upload': upload_request,
+}
+
+# Ids an operation picks from in the user's context, and how many it needs
+REQUIRED_IDS = {
+    'recipe_filter': ('tag_ids', 2),
+    'recipe_detail': ('recipe_ids', 1),
+    'recipe_update': ('recipe_ids', 1),
+    'tag_update': ('tag_ids', 1),
+    'image_upload': ('recipe_ids', 1),
+}
+
+
+def check_contexts(operations, contexts):
+    """Raise CommandError unless every user has the ids the operations pick from."""
+    for name in operations:
+        if name not in REQUIRED_IDS:
+            continue
+        key, count = REQUIRED_IDS[name]
+        for context in contexts:
+            if len(context[key]) < count:
+                raise CommandError(
+                    f'{name} needs {count} {key} per user but {context["email"]} has '
+                    f'{len(context[key])}; raise --recipes-per-user or drop it from the mix'
+                )
+
+
+class Command(BaseCommand):
+    """
+    Drive the user, token, recipe, tag, ingredient and upload endpoints of a
+    running stack with a weighted request mix and report throughput,
+    latency percentiles and DB queries per request as JSON.
+
+    Test users and their recipes are created through the API first. DB
+    queries are reported when the server runs with DB_QUERY_COUNT_HEADER=1.
+    """
+    help = 'Load test the APIs of a running stack and report JSON results.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost:8000/api', help='API root')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=30.0)
+        parser.add_argument(
+            '--mix', default='mixed',
+            help=f'One of {", ".join(MIXES)}, or name=weight pairs separated by commas',
+        )
+        parser.add_argument('--users', type=int, default=8)
+        parser.add_argument('--recipes-per-user', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Also write the JSON results to this file')
+
+    def _parse_mix(self, mix):
+        """Return the operations of a named or name=weight mix."""
+        if mix in MIXES:
+            weights = MIXES[mix]
+        else:
+            try:
+                weights = {
+                    name.strip(): float(weight)
+                    for name, weight in (item.split('=') for item in mix.split(','))
+                }
+            except ValueError:
+                raise CommandError(f'Invalid mix "{mix}"')
+        unknown = set(weights) - set(OPERATIONS)
+        if unknown:
+            raise CommandError(f'Unknown operations: {", ".join(sorted(unknown))}')
+
+        return {name: (weight, OPERATIONS[name]) for name, weight in weights.items()}
+
+    def _setup_user(self, client, index, run_id, options):
+        """Create a user with a token and recipes, returning its context."""
+        rng = random.Random(options['seed'] * 1000 + index)
+        email = f'loadtest-{run_id}-{index}@example.com'
+        status, data = client.json(
+            'POST', '/user/create/', {'email': email, 'password': PASSWORD, 'name': 'Load Test'},
+        )
+        if status != 201:
+            raise CommandError(f'Creating user failed with {status}: {data}')
+        status, data = client.json('POST', '/user/token/', {'email': email, 'password': PASSWORD})
+        if status != 200:
+            raise CommandError(f'Creating token failed with {status}: {data}')
+        context = {'email': email, 'token': data['token']}
+
+        payload = [recipe_payload(rng) for _ in range(options['recipes_per_user'])]
+        request = json_request('POST', '/recipe/recipes/bulk/', context, payload)
+        response, content = client.send(request)
+        if response.status != 201:
+            raise CommandError(f'Creating recipes failed with {response.status}: {content[:200]}')
+        recipes = json.loads(content)['results']
+        context['recipe_ids'] = [recipe['id'] for recipe in recipes]
+        context['tag_ids'] = sorted({tag['id'] for recipe in recipes for tag in recipe['tags']})
+
+        return context
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        operations = self._parse_mix(options['mix'])
+        run_id = uuid.uuid4().hex[:8]
+        image = io.BytesIO()
+        Image.new('RGB', (640, 480), (200, 120, 40)).save(image, format='JPEG')
+
+        setup_start = time.perf_counter()
+        client = Client(options['base_url'])
+        contexts = []
+        for index in range(options['users']):
+            context = self._setup_user(client, index, run_id, options)
+            context['image'] = image.getvalue()
+            contexts.append(context)
+        client.close()
+        check_contexts(operations, contexts)
+        setup_seconds = time.perf_counter() - setup_start
+
+        results = run_mix(
+            options['base_url'],
+            operations,
+            contexts,
+            options['concurrency'],
+            options['duration'],
+            options['seed'],
+        )
+        report = json.dumps({
+            'options': {
+                key: options[key] for key in (
+                    'base_url', 'concurrency', 'duration', 'mix', 'users',
+                    'recipes_per_user', 'seed',
+                )
+            },
+            'cpu_count': os.cpu_count(),
+            'setup_s': round(setup_seconds, 2),
+            'results': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report)
+        self.stdout.write(report)
@@ -0,0 +1,262 @@
+"""
+Django command to seed the database with a synthetic dataset
+"""
+import hashlib
+import itertools
+import io
+import math
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.models import Ingredient, Recipe, Tag
+
+TAGS = [
+    'Breakfast', 'Lunch', 'Dinner', 'Dessert', 'Snack', 'Vegan', 'Vegetarian', 'Gluten Free',
+    'Quick', 'Healthy', 'Comfort Food', 'Spicy', 'Italian', 'Mexican', 'Indian', 'Thai',
+    'Chinese', 'Japanese', 'French', 'Greek', 'Baking', 'Grilling', 'Slow Cooker', 'Party',
+    'Kids', 'Low Carb', 'High Protein', 'Budget', 'Summer', 'Winter',
+]
+INGREDIENTS = [
+    'Salt', 'Pepper', 'Olive Oil', 'Garlic', 'Onion', 'Butter', 'Sugar', 'Flour', 'Eggs', 'Milk',
+    'Tomato', 'Lemon', 'Chicken', 'Beef', 'Rice', 'Pasta', 'Cheese', 'Potato', 'Carrot', 'Ginger',
+    'Basil', 'Parsley', 'Cumin', 'Paprika', 'Chili', 'Honey', 'Soy Sauce', 'Coconut Milk',
+    'Spinach', 'Mushroom', 'Bell Pepper', 'Lentils', 'Chickpeas', 'Tofu', 'Yogurt', 'Cream',
+    'Bread', 'Beans', 'Cinnamon', 'Vanilla', 'Apple', 'Banana', 'Shrimp', 'Salmon', 'Bacon',
+    'Oats', 'Almonds', 'Avocado', 'Lime', 'Cilantro',
+]
+WORDS = [
+    'chicken', 'beef', 'tofu', 'lentil', 'tomato', 'garlic', 'onion', 'curry', 'soup', 'salad',
+    'roasted', 'spicy', 'creamy', 'baked', 'grilled', 'fresh', 'quick', 'vegan', 'lemon', 'herb',
+    'rice', 'pasta', 'noodle', 'bread', 'cheese', 'mushroom', 'pepper', 'ginger', 'honey', 'chili',
+    'potato', 'carrot', 'spinach', 'bean', 'coconut', 'basil', 'mint', 'yogurt', 'apple', 'pear',
+]
+
+
+def vocabulary(names, size):
+    """Return size distinct names, numbering repeats of names once they run out."""
+    return [
+        name if round_ == 0 else f'{name} {round_ + 1}'
+        for round_ in range(math.ceil(size / len(names)))
+        for name in names
+    ][:size]
+
+
+def zipf_cum_weights(size):
+    """Return cumulative weights picking rank r with probability ~ 1 / r."""
+    return list(itertools.accumulate(1 / rank for rank in range(1, size + 1)))
+
+
+def copy_value(value):
+    """Return value in Postgres COPY text format."""
+    if value is None:
+        return '\\N'
+    return (
+        str(value).replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+class CopyLoader:
+    """
+    Buffer rows for a table and COPY them in chunks
+
+    Ids are reserved from the table's sequence in blocks, so rows referencing
+    them can be generated before the referenced rows are loaded.
+    """
+
+    def __init__(self, cursor, model, columns, chunk_size):
+        self.cursor = cursor
+        self.table = model._meta.db_table
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.rows = []
+        self.ids = iter(())
+        self.count = 0
+
+    def next_id(self):
+        """Return an id reserved from the table's sequence."""
+        try:
+            return next(self.ids)
+        except StopIteration:
+            self.cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [self.table, self.chunk_size],
+            )
+            self.ids = iter([row[0] for row in self.cursor.fetchall()])
+            return next(self.ids)
+
+    def add(self, *row):
+        """Add a row, loading the buffered rows once a chunk is full."""
+        self.rows.append(row)
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """COPY the buffered rows into the table."""
+        if not self.rows:
+            return
+        data = io.StringIO(''.join(
+            '\t'.join(copy_value(value) for value in row) + '\n' for row in self.rows
+        ))
+        self.cursor.copy_expert(
+            f'COPY {self.table} ({", ".join(self.columns)}) FROM STDIN', data,
+        )
+        self.count += len(self.rows)
+        self.rows = []
+
+
+class Command(BaseCommand):
+    """
+    Seed a reproducible synthetic dataset for benchmarks: users with API
+    tokens, tags, ingredients and recipes linked to them.
+
+    Rows are generated from --seed and loaded with COPY in chunks, in one
+    transaction. Every user gets the same pre-hashed password, so no time is
+    spent hashing. Recipes per user follow a long-tailed distribution and
+    tags and ingredients are used with Zipf-like popularity. Token keys are
+    random; --tokens-file saves them for load tests.
+    """
+    help = 'Seed a reproducible synthetic dataset for benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes-per-user', type=int, default=100, help='Average')
+        parser.add_argument('--tags-per-user', type=int, default=20)
+        parser.add_argument('--ingredients-per-user', type=int, default=50)
+        parser.add_argument('--tags-per-recipe', type=int, default=3, help='Average')
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8, help='Average')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--email-prefix', default='seed')
+        parser.add_argument('--password', default='seed-pass-123')
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument('--tokens-file', help='Write the users\' API tokens to this file')
+
+    def _recipes_for(self, rng, mean):
+        """Return a long-tailed (lognormal) number of recipes averaging mean."""
+        if mean <= 0:
+            return 0
+        return round(rng.lognormvariate(math.log(mean) - 0.5, 1.0))
+
+    def _pick(self, rng, ids, cum_weights, mean):
+        """Return distinct ids, about mean of them, favouring the first ones."""
+        if not ids or mean <= 0:
+            return []
+        count = rng.randint(max(0, mean - 2), mean + 2)
+        return list(dict.fromkeys(rng.choices(ids, cum_weights=cum_weights, k=count)))
+
+    def _seed(self, cursor, options):
+        """Generate and load the dataset, returning row counts and tokens."""
+        rng = random.Random(options['seed'])
+        chunk_size = options['chunk_size']
+        now = timezone.now()
+        salt = hashlib.sha256(f'seed-data-{options["seed"]}'.encode()).hexdigest()[:22]
+        password = make_password(options['password'], salt=salt)
+
+        users = CopyLoader(cursor, get_user_model(), [
+            'id', 'password', 'is_superuser', 'email', 'name', 'is_active', 'is_staff',
+        ], chunk_size)
+        tokens = CopyLoader(cursor, Token, ['key', 'user_id', 'created'], chunk_size)
+        tags = CopyLoader(cursor, Tag, ['id', 'user_id', 'name'], chunk_size)
+        ingredients = CopyLoader(cursor, Ingredient, ['id', 'user_id', 'name'], chunk_size)
+        recipes = CopyLoader(cursor, Recipe, [
+            'id', 'user_id', 'title', 'time_minutes', 'price', 'description', 'link', 'image',
+        ], chunk_size)
+        recipe_tags = CopyLoader(
+            cursor, Recipe.tags.through, ['recipe_id', 'tag_id'], chunk_size,
+        )
+        recipe_ingredients = CopyLoader(
+            cursor, Recipe.ingredients.through, ['recipe_id', 'ingredient_id'], chunk_size,
+        )
+        tag_names = vocabulary(TAGS, options['tags_per_user'])
+        ingredient_names = vocabulary(INGREDIENTS, options['ingredients_per_user'])
+        tag_weights = zipf_cum_weights(len(tag_names))
+        ingredient_weights = zipf_cum_weights(len(ingredient_names))
+        token_keys = []
+
+        for index in range(options['users']):
+            user_id = users.next_id()
+            email = f'{options["email_prefix"]}-{index}@example.com'
+            users.add(user_id, password, False, email, f'Seed User {index}', True, False)
+            key = Token.generate_key()
+            tokens.add(key, user_id, now)
+            token_keys.append(key)
+
+            # Users share the popular tags and ingredients in a shuffled order.
+            tag_ids = []
+            for name in rng.sample(tag_names, len(tag_names)):
+                tag_ids.append(tags.next_id())
+                tags.add(tag_ids[-1], user_id, name)
+            ingredient_ids = []
+            for name in rng.sample(ingredient_names, len(ingredient_names)):
+                ingredient_ids.append(ingredients.next_id())
+                ingredients.add(ingredient_ids[-1], user_id, name)
+
+            for _ in range(self._recipes_for(rng, options['recipes_per_user'])):
+                recipe_id = recipes.next_id()
+                recipes.add(
+                    recipe_id,
+                    user_id,
+                    ' '.join(rng.choices(WORDS, k=3)).capitalize(),
+                    rng.randint(5, 180),
+                    f'{rng.randint(100, 9999) / 100:.2f}',
+                    ' '.join(rng.choices(WORDS, k=rng.randint(10, 60))).capitalize() + '.',
+                    '',
+                    None,
+                )
+                for tag_id in self._pick(rng, tag_ids, tag_weights, options['tags_per_recipe']):
+                    recipe_tags.add(recipe_id, tag_id)
+                for ingredient_id in self._pick(
+                    rng, ingredient_ids, ingredient_weights, options['ingredients_per_recipe'],
+                ):
+                    recipe_ingredients.add(recipe_id, ingredient_id)
+
+        # Referenced rows are loaded first.
+        loaders = {
+            'users': users,
+            'tokens': tokens,
+            'tags': tags,
+            'ingredients': ingredients,
+            'recipes': recipes,
+            'recipe_tags': recipe_tags,
+            'recipe_ingredients': recipe_ingredients,
+        }
+        for loader in loaders.values():
+            loader.flush()
+        cursor.execute(f'ANALYZE {", ".join(loader.table for loader in loaders.values())}')
+
+        return {name: loader.count for name, loader in loaders.items()}, token_keys
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        if get_user_model().objects.filter(
+            email__startswith=f'{options["email_prefix"]}-', email__endswith='@example.com',
+        ).exists():
+            raise CommandError(
+                f'Users with the email prefix "{options["email_prefix"]}" already exist, '
+                'pick another --email-prefix'
+            )
+
+        self.stdout.write('Seeding data...')
+        start = time.perf_counter()
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Loaded rows reference rows in later chunks until the end.
+            cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+            counts, token_keys = self._seed(cursor, options)
+
+        if options['tokens_file']:
+            with open(options['tokens_file'], 'w') as tokens_file:
+                tokens_file.write(''.join(f'{key}\n' for key in token_keys))
+        for name, count in counts.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded data in {time.perf_counter() - start:.1f}s'
+        ))
@@ -0,0 +1,46 @@
+"""
+Django command to serve the ASGI application in one uvicorn process
+"""
+import socket
+
+from django.core.management.base import BaseCommand
+
+from core import metrics
+
+
+class Command(BaseCommand):
+    """
+    Serve config.asgi with a single uvicorn process
+
+    The port is bound with SO_REUSEPORT, so several of these processes can
+    serve it side by side, with the kernel spreading connections between
+    them. scripts/run.sh runs each one as a uWSGI daemon, which the uWSGI
+    master restarts if it dies and stops on shutdown; uvicorn's own
+    --workers supervisor does neither.
+    """
+    help = 'Serve the ASGI application in this process, sharing the port.'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='0.0.0.0')
+        parser.add_argument('--port', type=int, default=8086)
+
+    def bind(self, host, port):
+        """Return a socket bound to the address, which other processes may bind too."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((host, port))
+        return sock
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        # A production dependency only
+        import uvicorn
+
+        sock = self.bind(options['host'], options['port'])
+        server = uvicorn.Server(uvicorn.Config('config.asgi:application'))
+        try:
+            server.run(sockets=[sock])
+        finally:
+            metrics.mark_process_dead()
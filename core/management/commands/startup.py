@@ -0,0 +1,125 @@
+"""
+Django command to run the container startup steps
+"""
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+# File in STATIC_ROOT holding the hash of the last collected static files
+STATIC_HASH_FILE = '.static-hash'
+# Files collectstatic ignores by default
+STATIC_IGNORE_PATTERNS = ['CVS', '.*', '*~']
+
+
+class Command(BaseCommand):
+    """
+    Collect static files, wait for the database and migrate it in one
+    process, skipping the steps with nothing to do
+
+    Static files are only collected when the hash of their contents differs
+    from the one stamped in STATIC_ROOT by the last collection, and migrate
+    only runs when migrations are unapplied. Logs the time of each phase.
+    """
+    help = 'Run the startup steps of a container, skipping unchanged ones.'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--db-timeout', type=float, default=60.0,
+            help='Seconds to wait for the database',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Collect static files and migrate even if unchanged',
+        )
+
+    def static_hash(self):
+        """Return the hash of the paths and contents of the static files to collect."""
+        files = {}
+        for finder in finders.get_finders():
+            for path, storage in finder.list(STATIC_IGNORE_PATTERNS):
+                prefix = getattr(storage, 'prefix', None)
+                # The first file found for a path is the one collected
+                files.setdefault(os.path.join(prefix, path) if prefix else path, (storage, path))
+
+        digest = hashlib.sha256()
+        for prefixed_path in sorted(files):
+            storage, path = files[prefixed_path]
+            digest.update(prefixed_path.encode() + b'\0')
+            with storage.open(path) as source:
+                for chunk in source.chunks():
+                    digest.update(chunk)
+            digest.update(b'\0')
+
+        return digest.hexdigest()
+
+    def pending_migrations(self, database):
+        """Return whether the database has unapplied migrations."""
+        executor = MigrationExecutor(connections[database])
+        return bool(executor.migration_plan(executor.loader.graph.leaf_nodes()))
+
+    def collectstatic(self, force):
+        """Collect static files if they changed, returning whether they did."""
+        stamp = os.path.join(settings.STATIC_ROOT, STATIC_HASH_FILE)
+        static_hash = self.static_hash()
+        if not force and os.path.exists(stamp):
+            with open(stamp) as stamp_file:
+                if stamp_file.read().strip() == static_hash:
+                    return False
+
+        call_command('collectstatic', interactive=False, stdout=self.stdout, stderr=self.stderr)
+        with open(stamp, 'w') as stamp_file:
+            stamp_file.write(static_hash)
+        return True
+
+    def migrate(self, database, force):
+        """Migrate the database if migrations are unapplied, returning whether they were."""
+        if not force and not self.pending_migrations(database):
+            return False
+
+        call_command(
+            'migrate', database=database, interactive=False,
+            stdout=self.stdout, stderr=self.stderr,
+        )
+        return True
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        timings = []
+
+        @contextmanager
+        def phase(name):
+            start = time.monotonic()
+            outcome = {'ran': True}
+            yield outcome
+            seconds = time.monotonic() - start
+            timings.append(f'{name}={seconds:.2f}s' + ('' if outcome['ran'] else ' (skipped)'))
+            self.stdout.write(
+                f'{name}: {"done" if outcome["ran"] else "unchanged, skipped"} '
+                f'in {seconds:.2f} seconds',
+            )
+
+        start = time.monotonic()
+        # Static files do not need the database, which may still be starting
+        with phase('collectstatic') as outcome:
+            outcome['ran'] = self.collectstatic(options['force'])
+        with phase('wait_for_db'):
+            call_command(
+                'wait_for_db', database=options['database'], timeout=options['db_timeout'],
+                stdout=self.stdout, stderr=self.stderr,
+            )
+        with phase('migrate') as outcome:
+            outcome['ran'] = self.migrate(options['database'], options['force'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Startup phases: {" ".join(timings)} total={time.monotonic() - start:.2f}s',
+        ))
@@ -1,26 +1,64 @@
 """
 Django command to pause execution until database is available
 """
+import random
 import time
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.utils import OperationalError
 from psycopg2 import OperationalError as Psycopg2OperationalError
 
 
 class Command(BaseCommand):
-    """Django command to pause execution until database is available"""
+    """
+    Django command to pause execution until database is available
+
+    Probes by opening a connection, retrying with jittered exponential
+    backoff: each delay doubles up to --max-delay and a random part of it is
+    dropped, so containers started together do not retry in lockstep.
+    """
+    help = 'Wait until the database accepts connections.'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--timeout', type=float, default=60.0,
+            help='Seconds to wait before failing',
+        )
+        parser.add_argument('--initial-delay', type=float, default=0.1)
+        parser.add_argument('--max-delay', type=float, default=5.0)
+
+    def probe(self, database):
+        """Open a connection to the database, raising OperationalError if it is down."""
+        connection = connections[database]
+        try:
+            connection.ensure_connection()
+        finally:
+            connection.close()
 
     def handle(self, *args, **options):
         """Handle the command"""
         self.stdout.write('Waiting for database...')
-        db_up = False
-        while db_up is False:
+        start = time.monotonic()
+        deadline = start + options['timeout']
+        delay = options['initial_delay']
+        while True:
             try:
-                self.check(databases=['default'])
-                db_up = True
-            except (Psycopg2OperationalError, OperationalError):
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
+                self.probe(options['database'])
+                break
+            except (Psycopg2OperationalError, OperationalError) as exc:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f'Database unavailable after {options["timeout"]} seconds: {exc}',
+                    )
+                pause = min(random.uniform(delay / 2, delay), remaining)
+                self.stdout.write(f'Database unavailable, waiting {pause:.2f} seconds...')
+                time.sleep(pause)
+                delay = min(delay * 2, options['max_delay'])
 
-        self.stdout.write(self.style.SUCCESS('Database available!'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Database available! ({time.monotonic() - start:.2f} seconds)',
+        ))
@@ -0,0 +1,189 @@
+"""
+Prometheus metrics for the APIs.
+
+With PROMETHEUS_MULTIPROC_DIR set, prometheus_client keeps every metric
+in memory-mapped files in that directory, one per process, and the
+metrics view adds up the files of all processes. Scraping any uWSGI or
+uvicorn worker of a node then returns the totals of the node. The
+directory must be emptied before the workers start (see scripts/run.sh).
+"""
+import contextvars
+import os
+import time
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+# Route label for requests not matching any URL pattern, to bound the labels.
+UNMATCHED_ROUTE = '<unmatched>'
+
+REQUESTS = Counter(
+    'http_requests',
+    'Requests handled, by route, method and status code',
+    ['route', 'method', 'status'],
+)
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds',
+    'Time spent handling requests',
+    ['route', 'method'],
+)
+RESPONSE_BYTES = Histogram(
+    'http_response_size_bytes',
+    'Size of response bodies; streamed responses are not counted',
+    ['route', 'method'],
+    buckets=(100, 1000, 10000, 100000, 1000000, 10000000),
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries',
+    'DB queries run per request',
+    ['route', 'method'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_SECONDS = Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent on DB queries per request',
+    ['route', 'method'],
+)
+
+# Gauges of all live processes are added up in multiprocess mode; the pool
+# saturation of a node is db_pool_connections{state="in_use"} / db_pool_max_size.
+DB_POOL_CONNECTIONS = Gauge(
+    'db_pool_connections',
+    'Pooled DB connections, by state',
+    ['database', 'state'],
+    multiprocess_mode='livesum',
+)
+DB_POOL_MAX_SIZE = Gauge(
+    'db_pool_max_size',
+    'DB connections the pools may open',
+    ['database'],
+    multiprocess_mode='livesum',
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    'db_pool_wait_seconds',
+    'Time spent checking out a pooled DB connection, including opening it',
+    ['database'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_POOL_TIMEOUTS = Counter(
+    'db_pool_timeouts',
+    'Checkouts that gave up waiting for a pooled DB connection',
+    ['database'],
+)
+DB_POOL_CONNECTS = Counter(
+    'db_pool_connects',
+    'DB connections opened by the pools',
+    ['database'],
+)
+
+AUTH_TOKEN_CACHE = Counter(
+    'auth_token_cache',
+    'Auth token lookups in the shared cache, by result (hit, miss or revoked)',
+    ['result'],
+)
+
+# Password hashing for the token endpoint, see core.passwords
+PASSWORD_HASH_QUEUE_SECONDS = Histogram(
+    'password_hash_queue_seconds',
+    'Time password hashes waited for a hashing thread',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    'password_hash_duration_seconds',
+    'Time spent hashing passwords',
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+PASSWORD_HASHES_IN_FLIGHT = Gauge(
+    'password_hashes_in_flight',
+    'Password hashes running or waiting for a hashing thread',
+    multiprocess_mode='livesum',
+)
+PASSWORD_HASH_REJECTIONS = Counter(
+    'password_hash_rejections',
+    'Logins answered 503 right away as every admission slot was taken',
+)
+PASSWORD_HASH_TIMEOUTS = Counter(
+    'password_hash_timeouts',
+    'Logins answered 503 after waiting PASSWORD_HASH_TIMEOUT for their hash',
+)
+
+# DB usage of the current request. A context variable, unlike the thread
+# local DB connections, follows async views into sync_to_async threads.
+_db_usage = contextvars.ContextVar('db_usage', default=None)
+
+
+class DBUsage:
+    """Queries run and seconds spent on them during a request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+def record_db_usage(execute, sql, params, many, context):
+    """DB execute wrapper adding queries to the current request's usage."""
+    usage = _db_usage.get()
+    if usage is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        usage.queries += 1
+        usage.seconds += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def install_db_wrapper(sender, connection, **kwargs):
+    """Install record_db_usage on new DB connections."""
+    if record_db_usage not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_db_usage)
+
+
+def start_request():
+    """Start tracking a request, returning the state to pass to finish_request."""
+    usage = DBUsage()
+    return usage, _db_usage.set(usage), time.perf_counter()
+
+
+def finish_request(state, request, response):
+    """Record the metrics of a request started with start_request."""
+    usage, token, start = state
+    seconds = time.perf_counter() - start
+    _db_usage.reset(token)
+
+    match = request.resolver_match
+    route = match.route if match is not None else UNMATCHED_ROUTE
+    method = request.method
+    REQUESTS.labels(route, method, response.status_code).inc()
+    REQUEST_SECONDS.labels(route, method).observe(seconds)
+    if not response.streaming:
+        RESPONSE_BYTES.labels(route, method).observe(len(response.content))
+    DB_QUERIES.labels(route, method).observe(usage.queries)
+    DB_SECONDS.labels(route, method).observe(usage.seconds)
+
+
+def render_metrics():
+    """Return the metrics of the node, or of this process outside multiprocess mode."""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return generate_latest(REGISTRY)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def mark_process_dead():
+    """Drop the live gauges of this process as it exits, in multiprocess mode."""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
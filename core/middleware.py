@@ -0,0 +1,155 @@
+"""
+Middleware for the APIs.
+"""
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+
+from core import db_router, metrics, profiling
+from core.benchmarking import QUERY_COUNT_HEADER
+from core.caching import is_shared_cache
+
+
+class QueryCountHeaderMiddleware:
+    """
+    Report the number of DB queries a request ran in the X-DB-Queries header
+
+    Used by the load tests to report queries per request. Enabled with the
+    DB_QUERY_COUNT_HEADER setting; otherwise Django drops it at startup and
+    it costs nothing.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DB_QUERY_COUNT_HEADER:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        count = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal count
+            count += 1
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+
+        response[QUERY_COUNT_HEADER] = str(count)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record request counts, latency, response size and DB usage per route
+
+    Works in sync and async mode, so async views stay on the event loop.
+    Enabled with the METRICS_ENABLED setting.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state = metrics.start_request()
+        response = self.get_response(request)
+        metrics.finish_request(state, request, response)
+        return response
+
+    async def __acall__(self, request):
+        state = metrics.start_request()
+        response = await self.get_response(request)
+        metrics.finish_request(state, request, response)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile staff requests sending an X-Profile header
+
+    Works in sync and async mode. Enabled with the REQUEST_PROFILING setting.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state = profiling.start_profile(request)
+        if state is None:
+            return self.get_response(request)
+        response = self.get_response(request)
+        return profiling.finish_profile(state, request, response)
+
+    async def __acall__(self, request):
+        state = await profiling.astart_profile(request)
+        if state is None:
+            return await self.get_response(request)
+        response = await self.get_response(request)
+        return profiling.finish_profile(state, request, response)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route the reads of safe requests to a read replica
+
+    Clients stick to the primary for a while after writing, see
+    core.db_router. Works in sync and async mode. Enabled by configuring
+    DB_REPLICA_HOSTS, which needs a cache shared by every worker to keep
+    the pins in.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DB_REPLICAS:
+            raise MiddlewareNotUsed()
+        if not is_shared_cache():
+            raise ImproperlyConfigured(
+                'Routing reads to DB_REPLICA_HOSTS needs a cache shared by every '
+                'worker; with a process-local cache, clients would not see their '
+                'writes when their next request reaches another worker. Set '
+                'CACHE_URL, e.g. to rediscache://.'
+            )
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state = db_router.start_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            db_router.finish_request(state, request)
+
+    async def __acall__(self, request):
+        state = db_router.start_request(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            db_router.finish_request(state, request)
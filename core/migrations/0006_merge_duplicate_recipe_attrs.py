@@ -0,0 +1,46 @@
+# Generated by Django 4.2.4 on 2026-10-18 02:47
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, model_name, field_name):
+    """Merge objects sharing (user, name) into the oldest one."""
+    model = apps.get_model('core', model_name)
+    through = apps.get_model('core', 'Recipe')._meta.get_field(field_name).remote_field.through
+    target = f'{model_name.lower()}_id'
+
+    groups = model.objects.values('user_id', 'name').annotate(
+        keep_id=Min('id'),
+        total=Count('id'),
+    ).filter(total__gt=1)
+    for group in groups:
+        duplicate_ids = list(model.objects.filter(
+            user_id=group['user_id'],
+            name=group['name'],
+        ).exclude(id=group['keep_id']).values_list('id', flat=True))
+        recipe_ids = through.objects.filter(
+            **{f'{target}__in': duplicate_ids},
+        ).values_list('recipe_id', flat=True)
+        through.objects.bulk_create(
+            [through(recipe_id=recipe_id, **{target: group['keep_id']}) for recipe_id in recipe_ids],
+            ignore_conflicts=True,
+        )
+        model.objects.filter(id__in=duplicate_ids).delete()
+
+
+def merge_duplicate_recipe_attrs(apps, schema_editor):
+    """Merge duplicate tags and ingredients before adding unique constraints."""
+    merge_duplicates(apps, 'Tag', 'tags')
+    merge_duplicates(apps, 'Ingredient', 'ingredients')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_recipe_attrs, migrations.RunPython.noop),
+    ]
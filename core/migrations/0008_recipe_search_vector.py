@@ -0,0 +1,32 @@
+# Generated by Django 4.2.4 on 2026-10-18 09:12
+#
+# The search vector is a stored generated column maintained by Postgres, so
+# it is not declared on the model and never written by the ORM.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_attr_indexes_constraints'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                """
+                ALTER TABLE core_recipe ADD COLUMN search_vector tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', coalesce(title, '')), 'A')
+                    || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+                ) STORED
+                """,
+                'CREATE INDEX recipe_search_vector_idx ON core_recipe USING gin (search_vector)',
+            ],
+            reverse_sql=[
+                'DROP INDEX recipe_search_vector_idx',
+                'ALTER TABLE core_recipe DROP COLUMN search_vector',
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.4 on 2026-10-18 10:05
+#
+# Trigram indexes back tag and ingredient name autocomplete. They need the
+# pg_trgm extension (shipped with the official Postgres images); where it
+# is not available they are skipped and autocomplete falls back to plain
+# substring matching.
+
+from django.db import migrations
+
+TABLES = ('core_tag', 'core_ingredient')
+
+FORWARD = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        {indexes}
+    END IF;
+END
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=FORWARD.format(indexes='\n        '.join(
+                f'CREATE INDEX IF NOT EXISTS {table}_name_trgm_idx '
+                f'ON {table} USING gin (name gin_trgm_ops);'
+                for table in TABLES
+            )),
+            reverse_sql=[f'DROP INDEX IF EXISTS {table}_name_trgm_idx' for table in TABLES],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:24
+#
+# Variants rendered before this migration are found in the storage once, so
+# serializing recipes no longer has to look for them.
+
+import os
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+# Variant names when this migration was written, see recipe.images.VARIANTS
+VARIANTS = ('main', 'medium', 'thumbnail')
+
+
+def record_rendered_variants(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    for recipe in Recipe.objects.exclude(image='').exclude(image=None).only('image'):
+        root, _ = os.path.splitext(recipe.image.name)
+        names = {variant: f'{root}_{variant}.jpg' for variant in VARIANTS}
+        recipe.image_variants = {
+            variant: name for variant, name in names.items() if default_storage.exists(name)
+        }
+        recipe.save(update_fields=['image_variants'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_attr_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(record_rendered_variants, migrations.RunPython.noop),
+    ]
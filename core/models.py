@@ -10,7 +10,7 @@ from django.contrib.auth.models import (
     AbstractBaseUser,
     PermissionsMixin
 )
-from django.db import models
+from django.db import connections, models, router
 
 from config import settings
 
@@ -49,6 +49,53 @@ class UserManager(BaseUserManager):
         return user
 
 
+class RecipeAttrManager(models.Manager):
+    """
+    Manager for per-user recipe attributes identified by name
+    """
+    def get_or_create_by_names(self, user, names):
+        """
+        Return the user's objects for names, creating the missing ones
+
+        Runs a single INSERT ... ON CONFLICT DO NOTHING statement that also
+        returns the rows which already existed, relying on the unique
+        (user, name) constraint. Rows committed concurrently after the
+        statement's snapshot are picked up by one retry.
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+
+        # The statement writes, so it must not follow the read routing
+        using = self._db or router.db_for_write(self.model, **self._hints)
+        objs = self._insert_missing_names(user, names, using)
+        if len(objs) < len(names):
+            missing = [n for n in names if n not in objs]
+            objs.update(self._insert_missing_names(user, missing, using))
+
+        return objs
+
+    def _insert_missing_names(self, user, names, using):
+        """Insert missing names and return all matching objects by name."""
+        quote = connections[using].ops.quote_name
+        table = quote(self.model._meta.db_table)
+        sql = f"""
+            WITH input (name) AS (SELECT unnest(%s::varchar[])),
+            inserted AS (
+                INSERT INTO {table} ({quote('user_id')}, {quote('name')})
+                SELECT %s, name FROM input
+                ON CONFLICT ({quote('user_id')}, {quote('name')}) DO NOTHING
+                RETURNING id, user_id, name
+            )
+            SELECT id, user_id, name FROM inserted
+            UNION ALL
+            SELECT t.id, t.user_id, t.name FROM {table} t
+            JOIN input ON t.name = input.name
+            WHERE t.user_id = %s
+        """
+        return {obj.name: obj for obj in self.raw(sql, [names, user.pk, user.pk]).using(using)}
+
+
 class User(AbstractBaseUser, PermissionsMixin):
     """
     Custom user model that supports using email instead of username
@@ -82,6 +129,13 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Storage names of the rendered image variants, empty while rendering
+    image_variants = models.JSONField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='recipe_user_id_desc_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -97,6 +151,16 @@ class Tag(models.Model):
     )
     name = models.CharField(max_length=255)
 
+    objects = RecipeAttrManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='tag_user_id_desc_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='unique_tag_user_name'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -109,5 +173,15 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = RecipeAttrManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='ingredient_user_id_desc_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='unique_ingredient_user_name'),
+        ]
+
     def __str__(self):
         return self.name
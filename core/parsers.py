@@ -0,0 +1,41 @@
+"""
+Parsers for the APIs
+"""
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from core.renderers import FastJSONRenderer, orjson
+
+
+def loads(content):
+    """Parse a JSON document from bytes or str, with orjson when available."""
+    if orjson is None:
+        return json.loads(content)
+
+    return orjson.loads(content)
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSON parser deserializing with orjson
+
+    orjson rejects NaN and Infinity like the strict JSONParser does. Request
+    bodies in encodings other than UTF-8 and a missing orjson fall back to
+    JSONParser.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
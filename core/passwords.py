@@ -0,0 +1,152 @@
+"""
+Password hashing off the request thread.
+
+Password hashes are deliberately expensive. The token view runs them on a
+small dedicated thread pool, which caps how much CPU logins can take on a
+node, and turns login bursts into quick 503 responses instead of workers
+stuck waiting to hash, leaving room for the rest of the API. The hashers
+release the GIL while hashing, so threads hash in parallel.
+
+Other logins, like the admin's, keep Django's ModelBackend. Queue waits,
+hash durations, rejections and timeouts are exported as password_hash_*
+metrics (see core/metrics.py).
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from core import metrics
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = None
+
+
+class PasswordVerificationBusy(APIException):
+    """Raised when the password executor cannot take more work."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-in attempts right now, please retry shortly.'
+    default_code = 'password_verification_busy'
+    wait = 1
+
+
+def get_server_size():
+    """Return the number of processes and of request threads per process."""
+    try:
+        import uwsgi
+    except ImportError:
+        return 1, 1
+
+    return uwsgi.numproc, int(uwsgi.opt.get('threads', 1))
+
+
+def get_pool_size():
+    """
+    Return the number of hashing threads and of admitted requests per process.
+
+    PASSWORD_HASH_WORKERS threads hash on the whole node, shared out between
+    its processes. All but one request thread of a process may hash or wait
+    for a hash, so a burst of logins always leaves a thread for the rest of
+    the API.
+    """
+    processes, threads = get_server_size()
+    admitted = max(threads - 1, 1)
+    workers = max(settings.PASSWORD_HASH_WORKERS // processes, 1)
+
+    return min(workers, admitted), admitted
+
+
+def get_executor():
+    """Return this process's password executor and its admission slots."""
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            workers, admitted = get_pool_size()
+            _executor = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix='password-hash',
+            )
+            _slots = threading.BoundedSemaphore(admitted)
+
+    return _executor, _slots
+
+
+def run_hasher(func, *args):
+    """
+    Run func(*args) on the password executor and return its result.
+
+    Raises PasswordVerificationBusy right away when every admission slot is
+    taken, or once the result took PASSWORD_HASH_TIMEOUT seconds.
+    """
+    executor, slots = get_executor()
+    if not slots.acquire(blocking=False):
+        metrics.PASSWORD_HASH_REJECTIONS.inc()
+        raise PasswordVerificationBusy()
+
+    submitted_at = time.perf_counter()
+
+    def job():
+        started_at = time.perf_counter()
+        metrics.PASSWORD_HASH_QUEUE_SECONDS.observe(started_at - submitted_at)
+        try:
+            return func(*args)
+        finally:
+            metrics.PASSWORD_HASH_SECONDS.observe(time.perf_counter() - started_at)
+            metrics.PASSWORD_HASHES_IN_FLIGHT.dec()
+            slots.release()
+
+    metrics.PASSWORD_HASHES_IN_FLIGHT.inc()
+    future = executor.submit(job)
+    try:
+        return future.result(timeout=settings.PASSWORD_HASH_TIMEOUT)
+    except FutureTimeoutError:
+        metrics.PASSWORD_HASH_TIMEOUTS.inc()
+        raise PasswordVerificationBusy()
+
+
+def check_password(user, raw_password):
+    """
+    Return whether raw_password is the user's password, hashing on the executor.
+
+    Like user.check_password, the stored hash is upgraded when the hasher
+    settings changed; the new hash is computed on the executor too and only
+    saved from the calling thread.
+    """
+    encoded = user.password
+    if not run_hasher(hashers.check_password, raw_password, encoded):
+        return False
+
+    preferred = hashers.get_hasher()
+    hasher = hashers.identify_hasher(encoded)
+    if hasher.algorithm != preferred.algorithm or preferred.must_update(encoded):
+        user.password = run_hasher(hashers.make_password, raw_password)
+        user.save(update_fields=['password'])
+
+    return True
+
+
+def authenticate(email, password):
+    """
+    Return the active user with these credentials, or None, hashing on the executor.
+
+    Does what ModelBackend.authenticate does, for the token view only; the
+    user lookup stays on the request thread.
+    """
+    UserModel = get_user_model()
+    try:
+        user = UserModel._default_manager.get_by_natural_key(email)
+    except UserModel.DoesNotExist:
+        # Hash anyway so unknown users take as long as wrong passwords.
+        run_hasher(hashers.make_password, password)
+        return None
+
+    if check_password(user, password) and user.is_active:
+        return user
+
+    return None
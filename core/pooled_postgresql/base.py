@@ -0,0 +1,41 @@
+"""
+PostgreSQL backend handing out connections from a per-process pool.
+
+Configured with the POOL dictionary of the database settings: MAX_SIZE,
+TIMEOUT, MAX_LIFETIME and CHECK_IDLE (see ConnectionPool). Keep
+CONN_MAX_AGE at 0: Django then returns the connection to the pool at
+the end of every request instead of keeping it for its thread.
+"""
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation as BaseDatabaseCreation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from core.pooled_postgresql.pool import close_pools, get_pool
+
+
+class DatabaseCreation(BaseDatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections would keep the test database from being dropped.
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(self.alias, conn_params, self.settings_dict.get('POOL', {}))
+        connection = self.pool.getconn(lambda: super(DatabaseWrapper, self).get_new_connection(
+            conn_params,
+        ))
+        # Set by the parent for new connections only.
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED),
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
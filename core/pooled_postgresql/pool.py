@@ -0,0 +1,254 @@
+"""
+Bounded pool of psycopg2 connections.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+from core import metrics
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Entry handed out for a free slot to open a new connection in
+NEW_CONNECTION = object()
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no pooled connection became available in time."""
+
+
+class _Waiter:
+    """A checkout waiting for a connection or a free slot."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.entry = None
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool holding at most max_size connections
+
+    Connections are handed out most recently used first. On checkout they
+    are discarded once older than max_lifetime seconds, and pinged when
+    idle for check_idle seconds or more. When every connection is in use,
+    checkouts queue for up to timeout seconds and then raise PoolTimeout;
+    returned connections and freed slots go to the longest waiting one, so
+    busy threads cannot starve others. Returned connections are rolled back
+    if a transaction was left open.
+    """
+
+    def __init__(self, database, max_size, timeout, max_lifetime, check_idle):
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_idle = check_idle
+        self._lock = threading.Lock()
+        self._idle = []
+        self._waiters = deque()
+        self._in_use = {}
+        self._size = 0
+        self._stats = {
+            'checkouts': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'timeouts': 0,
+            'connects': 0,
+            'discarded': 0,
+        }
+        metrics.DB_POOL_MAX_SIZE.labels(database).set(max_size)
+
+    def stats(self):
+        """Return the pool's counters, wait times and current connections."""
+        with self._lock:
+            return {
+                **self._stats,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'max_size': self.max_size,
+            }
+
+    def getconn(self, connect):
+        """Check out a connection, opening one with connect() if allowed."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            entry = self._reserve(deadline)
+            if entry is NEW_CONNECTION:
+                connection, created_at = self._connect(connect), time.monotonic()
+            else:
+                connection, created_at, returned_at = entry
+                if not self._usable(connection, created_at, returned_at):
+                    self._discard(connection)
+                    continue
+            break
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self._in_use[id(connection)] = created_at
+            self._stats['checkouts'] += 1
+            self._stats['wait_seconds_total'] += waited
+            self._stats['wait_seconds_max'] = max(self._stats['wait_seconds_max'], waited)
+            self._update_gauges()
+        metrics.DB_POOL_WAIT_SECONDS.labels(self.database).observe(waited)
+
+        return connection
+
+    def putconn(self, connection):
+        """Return a checked out connection, closing it if it cannot be reused."""
+        with self._lock:
+            created_at = self._in_use.pop(id(connection), None)
+        if created_at is None:
+            connection.close()
+            return
+
+        reuse = (
+            not connection.closed
+            and time.monotonic() - created_at < self.max_lifetime
+        )
+        if reuse and connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                reuse = False
+            reuse = reuse and (
+                connection.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+            )
+
+        if not reuse:
+            self._discard(connection)
+            return
+        with self._lock:
+            entry = (connection, created_at, time.monotonic())
+            if self._waiters:
+                self._hand_over(entry)
+            else:
+                self._idle.append(entry)
+            self._update_gauges()
+
+    def close_idle(self):
+        """Close the idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _, _ in idle:
+            self._discard(connection)
+
+    def _reserve(self, deadline):
+        """Return an idle connection entry, or NEW_CONNECTION for a free slot."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            if self._size < self.max_size:
+                self._size += 1
+                return NEW_CONNECTION
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+
+        if waiter.event.wait(max(deadline - time.monotonic(), 0)):
+            return waiter.entry
+        with self._lock:
+            # Handed an entry right after timing out
+            if waiter.entry is not None:
+                return waiter.entry
+            self._waiters.remove(waiter)
+            self._stats['timeouts'] += 1
+        metrics.DB_POOL_TIMEOUTS.labels(self.database).inc()
+        raise PoolTimeout(
+            f'No connection available in the {self.database} pool within {self.timeout} seconds'
+        )
+
+    def _hand_over(self, entry):
+        """Give an entry to the longest waiting checkout; call with the lock held."""
+        waiter = self._waiters.popleft()
+        waiter.entry = entry
+        waiter.event.set()
+
+    def _release_slot(self):
+        """Free a connection slot, or hand it to a waiting checkout; call with the lock held."""
+        if self._waiters:
+            self._hand_over(NEW_CONNECTION)
+        else:
+            self._size -= 1
+
+    def _connect(self, connect):
+        """Open a connection in a reserved slot, releasing the slot on failure."""
+        try:
+            connection = connect()
+        except BaseException:
+            with self._lock:
+                self._release_slot()
+            raise
+
+        with self._lock:
+            self._stats['connects'] += 1
+        metrics.DB_POOL_CONNECTS.labels(self.database).inc()
+        return connection
+
+    def _usable(self, connection, created_at, returned_at):
+        """Return whether an idle connection can be handed out."""
+        now = time.monotonic()
+        if connection.closed or now - created_at >= self.max_lifetime:
+            return False
+        if now - returned_at < self.check_idle:
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not connection.autocommit:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _discard(self, connection):
+        """Close a connection and free its slot."""
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        with self._lock:
+            self._release_slot()
+            self._stats['discarded'] += 1
+            self._update_gauges()
+
+    def _update_gauges(self):
+        metrics.DB_POOL_CONNECTIONS.labels(self.database, 'in_use').set(len(self._in_use))
+        metrics.DB_POOL_CONNECTIONS.labels(self.database, 'idle').set(len(self._idle))
+
+
+def get_pool(database, conn_params, options):
+    """
+    Return this process's pool for a database and its connection parameters.
+
+    Pools are per process: connections inherited over a fork are never
+    handed out, as their sockets are shared with the parent.
+    """
+    key = (os.getpid(), database, tuple(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(
+                database,
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 5.0),
+                max_lifetime=options.get('MAX_LIFETIME', 1800.0),
+                check_idle=options.get('CHECK_IDLE', 10.0),
+            )
+
+    return pool
+
+
+def close_pools():
+    """Close the idle connections of every pool of this process."""
+    pid = os.getpid()
+    with _pools_lock:
+        pools = [pool for key, pool in _pools.items() if key[0] == pid]
+    for pool in pools:
+        pool.close_idle()
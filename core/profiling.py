@@ -0,0 +1,246 @@
+"""
+Opt-in request profiling for staff.
+
+Requests of staff users sending an X-Profile header are profiled: their
+DB queries are recorded and the auth, serialize and render phases of DRF
+views timed. The results are returned in a Server-Timing header, and with
+X-Profile: json the response body is replaced by a JSON debug payload
+wrapping the original response. The staff user is found from the request's
+token, through the token cache, before profiling starts, so other clients
+cannot turn it on. Other requests only pay for one header lookup and one
+context variable lookup per query and phase.
+
+ProfilingMiddleware profiles requests and ProfiledViewMixin times the
+phases of DRF views.
+"""
+import contextvars
+import time
+from contextlib import contextmanager, nullcontext
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import CachedTokenAuthentication, aauthenticate
+from core.parsers import loads
+
+# Request header turning profiling on, as found in request.META
+PROFILE_META_KEY = 'HTTP_X_PROFILE'
+# X-Profile value asking for the JSON debug payload instead of the response
+PROFILE_JSON = 'json'
+# Longest SQL text included per query in the JSON debug payload
+MAX_SQL_LENGTH = 2000
+
+_profile = contextvars.ContextVar('profile', default=None)
+_no_phase = nullcontext()
+
+
+class Profile:
+    """Queries and phase timings of a profiled request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.end = None
+        self.phases = {}
+        self.nested = []
+        self.queries = []
+
+    @property
+    def total(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    def duplicates(self):
+        """Return the queries run more than once, most repeated first."""
+        groups = {}
+        for sql, seconds in self.queries:
+            count, total = groups.get(sql, (0, 0.0))
+            groups[sql] = (count + 1, total + seconds)
+
+        return sorted(
+            (
+                {'sql': sql[:MAX_SQL_LENGTH], 'count': count, 'duration_ms': to_ms(total)}
+                for sql, (count, total) in groups.items() if count > 1
+            ),
+            key=lambda group: (-group['count'], -group['duration_ms']),
+        )
+
+    def server_timing(self):
+        """Return the profile as a Server-Timing header value."""
+        db_seconds = sum(seconds for _, seconds in self.queries)
+        duplicates = sum(group['count'] - 1 for group in self.duplicates())
+        view = self.total - sum(self.phases.values())
+        metrics = [f'{name};dur={to_ms(seconds)}' for name, seconds in self.phases.items()]
+        metrics += [
+            f'view;dur={to_ms(view)}',
+            f'db;dur={to_ms(db_seconds)};desc="{len(self.queries)} queries '
+            f'({duplicates} duplicates)"',
+            f'total;dur={to_ms(self.total)}',
+        ]
+        return ', '.join(metrics)
+
+    def as_dict(self):
+        """Return the profile as the JSON debug payload."""
+        return {
+            'total_ms': to_ms(self.total),
+            'phases_ms': {
+                **{name: to_ms(seconds) for name, seconds in self.phases.items()},
+                'view': to_ms(self.total - sum(self.phases.values())),
+            },
+            'db': {
+                'queries': len(self.queries),
+                'duration_ms': to_ms(sum(seconds for _, seconds in self.queries)),
+                'duplicates': self.duplicates(),
+            },
+            'queries': [
+                {'sql': sql[:MAX_SQL_LENGTH], 'duration_ms': to_ms(seconds)}
+                for sql, seconds in self.queries
+            ],
+        }
+
+
+def to_ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+@contextmanager
+def _timed_phase(profile, name):
+    start = time.perf_counter()
+    profile.nested.append(0.0)
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        nested = profile.nested.pop()
+        profile.phases[name] = profile.phases.get(name, 0.0) + seconds - nested
+        if profile.nested:
+            profile.nested[-1] += seconds
+
+
+def phase(name):
+    """
+    Context manager timing a phase of the current request when profiling.
+
+    Time spent in nested phases only counts for the nested phase.
+    """
+    profile = _profile.get()
+    if profile is None:
+        return _no_phase
+
+    return _timed_phase(profile, name)
+
+
+def record_query(execute, sql, params, many, context):
+    """DB execute wrapper recording queries of profiled requests."""
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries.append((sql, time.perf_counter() - start))
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """Install record_query on new DB connections."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class ProfiledViewMixin:
+    """Time the auth, serialize and render phases of a DRF view when profiling."""
+
+    def perform_authentication(self, request):
+        with phase('auth'):
+            super().perform_authentication(request)
+
+    def get_serializer(self, *args, **kwargs):
+        """Serialize read results right away when profiling, to time it."""
+        serializer = super().get_serializer(*args, **kwargs)
+        if _profile.get() is not None and args and 'data' not in kwargs:
+            with phase('serialize'):
+                serializer.data
+
+        return serializer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Render right away when profiling, to time it."""
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if _profile.get() is not None and not response.is_rendered:
+            with phase('render'):
+                response.render()
+
+        return response
+
+
+def get_staff_user(request):
+    """Return the user of the request's token if it is staff, or None."""
+    try:
+        credentials = CachedTokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    if credentials is None or not credentials[0].is_staff:
+        return None
+
+    return credentials[0]
+
+
+async def aget_staff_user(request):
+    """Async counterpart of get_staff_user."""
+    user = await aauthenticate(request)
+    return user if user is not None and user.is_staff else None
+
+
+def _start():
+    profile = Profile()
+    return profile, _profile.set(profile)
+
+
+def start_profile(request):
+    """
+    Start profiling a staff request sending the X-Profile header.
+
+    Returns the state to pass to finish_profile, or None when the request
+    is not profiled.
+    """
+    if PROFILE_META_KEY not in request.META:
+        return None
+
+    if get_staff_user(request) is None:
+        return None
+
+    return _start()
+
+
+async def astart_profile(request):
+    """Async counterpart of start_profile, for requests served under ASGI."""
+    if PROFILE_META_KEY not in request.META:
+        return None
+
+    if await aget_staff_user(request) is None:
+        return None
+
+    return _start()
+
+
+def finish_profile(state, request, response):
+    """Stop profiling and return the response with the profile."""
+    profile, token = state
+    profile.end = time.perf_counter()
+    _profile.reset(token)
+
+    if request.META[PROFILE_META_KEY].strip().lower() == PROFILE_JSON:
+        original = response
+        content = None
+        if not original.streaming and 'json' in original.get('Content-Type', ''):
+            content = loads(original.content) if original.content else None
+        response = JsonResponse({
+            'status': original.status_code,
+            'response': content,
+            'profile': profile.as_dict(),
+        })
+    response['Server-Timing'] = profile.server_timing()
+    return response
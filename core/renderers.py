@@ -0,0 +1,40 @@
+"""
+Renderers for the APIs
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer serializing with orjson
+
+    Produces the same bytes as JSONRenderer for the compact, UTF-8 output the
+    APIs return. Types orjson does not handle natively (Decimal, lazy
+    strings, datetimes, ...) are converted by DRF's JSONEncoder. Indented
+    output, non-default JSON settings and a missing orjson fall back to
+    JSONRenderer.
+    """
+    options = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if orjson is not None else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or not self.strict or data is None):
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+
+        # Escape \u2028 and \u2029 like JSONRenderer, keeping the output a
+        # strict javascript subset.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
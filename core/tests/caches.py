@@ -0,0 +1,15 @@
+"""
+Cache settings for tests of features needing a cache shared by processes.
+"""
+import os
+import tempfile
+
+from django.test import override_settings
+
+# Unlike the local memory cache, seen by every process on the machine
+use_shared_cache = override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'recipe-app-test-cache'),
+    },
+})
@@ -0,0 +1,189 @@
+"""
+Tests for the cached token authentication.
+"""
+import pickle
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.authentication import get_cache_key
+from core.caching import is_shared_cache
+from core.tests.caches import use_shared_cache
+
+ME_URL = reverse('user:me')
+ASYNC_RECIPES_URL = reverse('recipe-async:recipe-list')
+CACHE_RESULTS = ('hit', 'miss', 'revoked')
+
+
+def cache_lookups():
+    """Return the token cache lookups counted so far, by result."""
+    return {
+        result: REGISTRY.get_sample_value('auth_token_cache_total', {'result': result}) or 0
+        for result in CACHE_RESULTS
+    }
+
+
+class CacheLookupsMixin:
+    """Count the token cache lookups of a test."""
+
+    def setUp(self):
+        super().setUp()
+        self.initial_lookups = cache_lookups()
+
+    def lookups(self):
+        """Return the lookups since the test started, by result."""
+        current = cache_lookups()
+        return {result: current[result] - self.initial_lookups[result] for result in CACHE_RESULTS}
+
+    def assertLookups(self, hit=0, miss=0, revoked=0):
+        self.assertEqual(self.lookups(), {'hit': hit, 'miss': miss, 'revoked': revoked})
+
+
+@use_shared_cache
+class CachedTokenAuthenticationTests(CacheLookupsMixin, TestCase):
+    """Test the cached token authentication."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123pass',
+            name='Test User',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_cached_after_first_request(self):
+        """Test the token lookup query only runs on the first request."""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertLookups(hit=1, miss=1)
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token is rejected and not cached."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertLookups(miss=1)
+
+    def test_deleted_token_evicted(self):
+        """Test a deleted token stops authenticating immediately."""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertLookups(miss=1, revoked=1)
+
+    def test_deleted_token_not_cached_again(self):
+        """Test a request that read a token before its deletion cannot cache it again."""
+        self.token.delete()
+
+        cache.add(get_cache_key(self.token.key), self.token)
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_cached_token_rejected(self):
+        """Test deactivating a user rejects their already cached token."""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertLookups(hit=1, miss=1)
+
+    async def test_async_deactivated_user_cached_token_rejected(self):
+        """Test async views reject the cached token of a deactivated user."""
+        client = AsyncClient()
+        headers = {'Authorization': f'Token {self.token.key}'}
+        await client.get(ASYNC_RECIPES_URL, headers=headers)
+        self.user.is_active = False
+        await self.user.asave()
+
+        res = await client.get(ASYNC_RECIPES_URL, headers=headers)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertLookups(hit=1, miss=1)
+
+    def test_profile_update_refreshes_cached_user(self):
+        """Test updating the profile is reflected on the next request."""
+        self.client.get(ME_URL)
+        res = self.client.patch(ME_URL, {'name': 'New Name', 'password': 'new_pass12345'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')
+        self.assertEqual(self.lookups()['miss'], 1)
+
+    def test_cached_user_has_no_raw_password(self):
+        """Test the raw password a user was saved with is not cached."""
+        self.user.set_password('new_pass12345')
+        self.user.save()
+
+        token = cache.get(get_cache_key(self.token.key))
+
+        self.assertIsNone(token.user._password)
+
+    def test_cached_user_has_no_password_hash(self):
+        """Test the password hash is kept out of the cache, but loaded when read."""
+        self.client.get(ME_URL)
+
+        token = cache.get(get_cache_key(self.token.key))
+
+        self.assertNotIn(b'pbkdf2_sha256', pickle.dumps(token))
+        self.assertTrue(token.user.check_password('test123pass'))
+
+    def test_lookups_exported(self):
+        """Test the lookups are served as Prometheus metrics."""
+        self.client.get(ME_URL)
+        self.client.get(ME_URL)
+
+        rendered = metrics.render_metrics().decode()
+
+        self.assertIn('auth_token_cache_total{result="hit"}', rendered)
+        self.assertIn('auth_token_cache_total{result="miss"}', rendered)
+
+
+class ProcessLocalCacheTests(CacheLookupsMixin, TestCase):
+    """Test token authentication with a process-local cache."""
+
+    def setUp(self):
+        super().setUp()
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123pass',
+            name='Test User',
+        )
+        token = Token.objects.create(user=user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_tokens_not_cached(self):
+        """Test tokens are looked up on every request."""
+        self.assertFalse(is_shared_cache())
+        self.client.get(ME_URL)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertLookups()
@@ -0,0 +1,45 @@
+"""
+Tests for the benchmark helpers.
+"""
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from core import benchmarking
+
+
+class BenchmarkHelperTests(TestCase):
+    """Test timing code on a throwaway dataset."""
+
+    def test_rolled_back(self):
+        """Test data created in the block is discarded."""
+        with benchmarking.rolled_back():
+            get_user_model().objects.create_user(email='seed@example.com', password='pass')
+            self.assertTrue(get_user_model().objects.exists())
+
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_time_first_page(self):
+        """Test the first page is fetched and timed."""
+        for i in range(3):
+            get_user_model().objects.create_user(email=f'user{i}@example.com', password='pass')
+
+        result = benchmarking.time_first_page(get_user_model().objects.all(), 2, repeat=3)
+
+        self.assertEqual(result['rows'], 2)
+        self.assertLessEqual(result['min_ms'], result['median_ms'])
+
+
+class RunMixTests(SimpleTestCase):
+    """Test running a request mix."""
+
+    def test_unbuildable_requests_counted_as_errors(self):
+        """Test a request that cannot be built is an error, not a dead worker."""
+        operations = {'detail': (1, lambda context, rng: rng.choice(context['recipe_ids']))}
+
+        results = benchmarking.run_mix(
+            'http://localhost:1/api', operations, [{'recipe_ids': []}],
+            concurrency=2, duration=0.05,
+        )
+
+        self.assertGreater(results['operations']['detail']['errors'], 0)
+        self.assertEqual(results['total']['requests'], 0)
@@ -1,34 +1,223 @@
 """
 Test custom Django management commands
 """
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connections
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
 from psycopg2 import OperationalError as Psycopg2OperationalError
+from rest_framework.authtoken.models import Token
 
+from core.management.commands.serve_asgi import Command as ServeAsgiCommand
+from core.management.commands.startup import Command as StartupCommand
+from core.management.commands.wait_for_db import Command as WaitForDbCommand
+from core.models import Recipe, Tag
 
-@patch('core.management.commands.wait_for_db.Command.check')
+
+@patch('core.management.commands.wait_for_db.Command.probe')
 class CommandTests(TestCase):
     """
     Test custom Django management commands
     """
 
-    def test_wait_for_db_ready(self, patched_check):
+    def test_wait_for_db_ready(self, patched_probe):
         """
         Test waiting for db when db is available
         """
-        patched_check.return_value = True
-        call_command('wait_for_db')
-        patched_check.asert_called_once_with(databases=['default'])
+        patched_probe.return_value = None
+        call_command('wait_for_db', stdout=StringIO())
+        patched_probe.assert_called_once_with('default')
 
     @patch('time.sleep')
-    def test_wait_for_db_delay(self, patched_sleep, patched_check):
+    def test_wait_for_db_delay(self, patched_sleep, patched_probe):
         """
         Test waiting for db
         """
-        patched_check.side_effect = [Psycopg2OperationalError] * 5 + [OperationalError] * 3 + [True]
-        call_command('wait_for_db')
-        self.assertEqual(patched_check.call_count, 9)
-        patched_check.asert_called_with(databases=['default'])
+        patched_probe.side_effect = [Psycopg2OperationalError] * 5 + [OperationalError] * 3 + [None]
+        call_command('wait_for_db', initial_delay=0.1, max_delay=1.0, stdout=StringIO())
+        self.assertEqual(patched_probe.call_count, 9)
+        patched_probe.assert_called_with('default')
+        delays = [call.args[0] for call in patched_sleep.call_args_list]
+        self.assertEqual(len(delays), 8)
+        for attempt, delay in enumerate(delays):
+            backoff = min(0.1 * 2 ** attempt, 1.0)
+            self.assertGreaterEqual(delay, backoff / 2)
+            self.assertLessEqual(delay, backoff)
+
+    @patch('time.sleep')
+    def test_wait_for_db_timeout(self, patched_sleep, patched_probe):
+        """
+        Test giving up once the timeout passed
+        """
+        patched_probe.side_effect = OperationalError
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=0, stdout=StringIO())
+        patched_sleep.assert_not_called()
+
+
+class WaitForDbProbeTests(SimpleTestCase):
+    """Test probing the database."""
+    databases = {'default'}
+
+    def test_probe(self):
+        """Test the probe connects and leaves no connection open."""
+        WaitForDbCommand().probe('default')
+
+        self.assertIsNone(connections['default'].connection)
+
+
+@patch('core.management.commands.startup.call_command')
+class StartupTests(TestCase):
+    """Test the startup command."""
+
+    def setUp(self):
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        self.settings_override = override_settings(STATIC_ROOT=static_root.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def run_startup(self, **options):
+        out = StringIO()
+        call_command('startup', stdout=out, **options)
+        return out.getvalue()
+
+    def called(self, patched_call_command):
+        return [call.args[0] for call in patched_call_command.call_args_list]
+
+    def test_unchanged_steps_skipped(self, patched_call_command):
+        """Test static files are only collected again when they change."""
+        output = self.run_startup()
+        self.assertEqual(self.called(patched_call_command), ['collectstatic', 'wait_for_db'])
+        self.assertIn('migrate=', output)
+        self.assertIn('total=', output)
+
+        patched_call_command.reset_mock()
+        output = self.run_startup()
+        self.assertEqual(self.called(patched_call_command), ['wait_for_db'])
+        self.assertIn('collectstatic: unchanged, skipped', output)
+
+        with patch.object(StartupCommand, 'static_hash', return_value='changed'):
+            patched_call_command.reset_mock()
+            self.run_startup()
+        self.assertEqual(self.called(patched_call_command), ['collectstatic', 'wait_for_db'])
+
+    def test_pending_migrations_applied(self, patched_call_command):
+        """Test migrate runs when migrations are unapplied."""
+        self.assertFalse(StartupCommand().pending_migrations('default'))
+
+        with patch.object(StartupCommand, 'pending_migrations', return_value=True):
+            self.run_startup()
+
+        self.assertEqual(
+            self.called(patched_call_command), ['collectstatic', 'wait_for_db', 'migrate'],
+        )
+
+    def test_force(self, patched_call_command):
+        """Test --force runs every step."""
+        self.run_startup()
+        patched_call_command.reset_mock()
+
+        self.run_startup(force=True)
+
+        self.assertEqual(
+            self.called(patched_call_command), ['collectstatic', 'wait_for_db', 'migrate'],
+        )
+
+
+class ServeAsgiTests(SimpleTestCase):
+    """Test serving the ASGI application in one process."""
+
+    def test_processes_share_port(self):
+        """Test several processes can bind the port."""
+        command = ServeAsgiCommand()
+        first = command.bind('127.0.0.1', 0)
+        self.addCleanup(first.close)
+
+        second = command.bind('127.0.0.1', first.getsockname()[1])
+        self.addCleanup(second.close)
+
+    @patch('uvicorn.Server')
+    def test_serves_on_bound_socket(self, mock_server):
+        """Test uvicorn serves the socket bound by the command."""
+        call_command('serve_asgi', host='127.0.0.1', port=0)
+
+        sock = mock_server.return_value.run.call_args.kwargs['sockets'][0]
+        self.addCleanup(sock.close)
+        self.assertEqual(sock.getsockname()[0], '127.0.0.1')
+        self.assertEqual(
+            mock_server.call_args.args[0].app, 'config.asgi:application',
+        )
+
+
+class SeedDataTests(TestCase):
+    """Test seeding a synthetic dataset."""
+
+    def seed(self, email_prefix):
+        call_command(
+            'seed_data', users=3, recipes_per_user=10, tags_per_user=4,
+            ingredients_per_user=6, chunk_size=7, email_prefix=email_prefix, stdout=StringIO(),
+        )
+        return get_user_model().objects.filter(email__startswith=f'{email_prefix}-')
+
+    def test_seed_data(self):
+        """Test users, tokens and linked recipes are loaded."""
+        users = self.seed('a')
+
+        self.assertEqual(users.count(), 3)
+        self.assertEqual(Token.objects.filter(user__in=users).count(), 3)
+        self.assertEqual(Tag.objects.filter(user__in=users).count(), 12)
+        self.assertTrue(users[0].check_password('seed-pass-123'))
+        recipes = Recipe.objects.filter(user__in=users)
+        self.assertTrue(recipes.exists())
+        for recipe in recipes.prefetch_related('tags', 'ingredients'):
+            self.assertTrue(all(tag.user_id == recipe.user_id for tag in recipe.tags.all()))
+            self.assertTrue(all(
+                ingredient.user_id == recipe.user_id for ingredient in recipe.ingredients.all()
+            ))
+
+    def test_seed_data_deterministic(self):
+        """Test the same seed generates the same dataset."""
+        datasets = []
+        for email_prefix in ('a', 'b'):
+            recipes = Recipe.objects.filter(user__in=self.seed(email_prefix)).order_by('id')
+            datasets.append([
+                (recipe.title, recipe.price, sorted(tag.name for tag in recipe.tags.all()))
+                for recipe in recipes.prefetch_related('tags')
+            ])
+
+        self.assertEqual(datasets[0], datasets[1])
+
+    def test_seed_data_existing_prefix(self):
+        """Test seeding refuses to reuse the emails of existing users."""
+        self.seed('a')
+
+        with self.assertRaises(CommandError):
+            self.seed('a')
+
+
+class LoadTestTests(SimpleTestCase):
+    """Test setting up the load test users."""
+
+    @patch('core.management.commands.load_test.run_mix')
+    @patch('core.management.commands.load_test.Command._setup_user')
+    def test_users_without_enough_ids_rejected(self, setup_user, run_mix):
+        """Test the mix is refused when users lack the ids its operations pick from."""
+        run_mix.return_value = {}
+        setup_user.return_value = {
+            'email': 'loadtest@example.com', 'token': 'token', 'recipe_ids': [1], 'tag_ids': [2],
+        }
+
+        with self.assertRaisesMessage(CommandError, 'recipe_filter needs 2 tag_ids'):
+            call_command('load_test', '--users', '1', '--mix', 'recipe_filter=1,recipe_list=1')
+
+        run_mix.assert_not_called()
+        call_command(
+            'load_test', '--users', '1', '--mix', 'recipe_detail=1,tag_update=1', stdout=StringIO(),
+        )
+        run_mix.assert_called_once()
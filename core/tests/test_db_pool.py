@@ -0,0 +1,132 @@
+"""
+Tests for the pooled PostgreSQL backend.
+"""
+import threading
+import time
+
+import psycopg2
+from django.db import connection, connections
+from django.test import TestCase
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+
+from core.pooled_postgresql.pool import ConnectionPool, PoolTimeout
+
+
+class ConnectionPoolTests(TestCase):
+    """Test the connection pool."""
+
+    def create_pool(self, **options):
+        options = {
+            'max_size': 2, 'timeout': 1.0, 'max_lifetime': 60.0, 'check_idle': 10.0,
+            **options,
+        }
+        pool = ConnectionPool('test', **options)
+        self.addCleanup(pool.close_idle)
+        return pool
+
+    def connect(self):
+        return psycopg2.connect(**connection.get_connection_params())
+
+    def test_connections_reused(self):
+        """Test returned connections are handed out again."""
+        pool = self.create_pool()
+
+        first = pool.getconn(self.connect)
+        pool.putconn(first)
+        second = pool.getconn(self.connect)
+        pool.putconn(second)
+
+        self.assertIs(first, second)
+        stats = pool.stats()
+        self.assertEqual(stats['connects'], 1)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual((stats['in_use'], stats['idle']), (0, 1))
+
+    def test_size_bounded(self):
+        """Test checkouts time out while every connection is in use."""
+        pool = self.create_pool(max_size=1, timeout=0.05)
+        held = pool.getconn(self.connect)
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(self.connect)
+
+        pool.putconn(held)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+        self.assertEqual(pool.stats()['connects'], 1)
+
+    def test_waits_for_returned_connection(self):
+        """Test a checkout waits for a connection returned by another thread."""
+        pool = self.create_pool(max_size=1)
+        held = pool.getconn(self.connect)
+        timer = threading.Timer(0.05, pool.putconn, [held])
+        timer.start()
+        self.addCleanup(timer.join)
+
+        conn = pool.getconn(self.connect)
+        pool.putconn(conn)
+
+        self.assertIs(conn, held)
+        self.assertGreaterEqual(pool.stats()['wait_seconds_max'], 0.04)
+
+    def test_expired_connections_replaced(self):
+        """Test connections past their max lifetime are closed."""
+        pool = self.create_pool(max_lifetime=0.01)
+        first = pool.getconn(self.connect)
+        time.sleep(0.02)
+        pool.putconn(first)
+
+        second = pool.getconn(self.connect)
+        pool.putconn(second)
+
+        self.assertIsNot(first, second)
+        self.assertTrue(first.closed)
+
+    def test_broken_connection_discarded_on_checkout(self):
+        """Test idle connections failing their health check are replaced."""
+        pool = self.create_pool(check_idle=0)
+        first = pool.getconn(self.connect)
+        pool.putconn(first)
+        with self.connect() as admin, admin.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [first.get_backend_pid()])
+
+        second = pool.getconn(self.connect)
+        with second.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        pool.putconn(second)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def test_open_transaction_rolled_back(self):
+        """Test connections are returned without an open transaction."""
+        pool = self.create_pool()
+        conn = pool.getconn(self.connect)
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertEqual(conn.get_transaction_status(), TRANSACTION_STATUS_INTRANS)
+
+        pool.putconn(conn)
+
+        self.assertEqual(conn.get_transaction_status(), TRANSACTION_STATUS_IDLE)
+        self.assertIs(pool.getconn(self.connect), conn)
+        pool.putconn(conn)
+
+
+class PooledBackendTests(TestCase):
+    """Test Django connections using the pool."""
+
+    def test_close_returns_connection_to_pool(self):
+        """Test closing a Django connection keeps its DB connection for reuse."""
+        wrapper = connections.create_connection('default')
+        self.addCleanup(wrapper.close)
+
+        wrapper.ensure_connection()
+        first = wrapper.connection
+        wrapper.close()
+        self.assertFalse(first.closed)
+        wrapper.ensure_connection()
+
+        self.assertIs(wrapper.connection, first)
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
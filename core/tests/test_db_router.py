@@ -0,0 +1,127 @@
+"""
+Tests for read replica routing.
+"""
+import multiprocessing
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Recipe
+from core.tests.caches import use_shared_cache
+
+
+def read_db_view(request):
+    """Return the alias recipes would be read from."""
+    return HttpResponse(router.db_for_read(Recipe))
+
+
+def write_in_other_worker(authorization):
+    """Send a write request through the middleware, as another worker would."""
+    request = RequestFactory().post('/', HTTP_AUTHORIZATION=authorization)
+    ReplicaRoutingMiddleware(read_db_view)(request)
+
+
+@use_shared_cache
+@override_settings(DB_REPLICAS=['replica_0', 'replica_1'], DB_REPLICA_PIN_SECONDS=60)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Test routing the reads of requests."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = ReplicaRoutingMiddleware(read_db_view)
+
+    def read_db(self, method='get', **extra):
+        return self.middleware(getattr(self.factory, method)('/', **extra)).content.decode()
+
+    def test_safe_requests_read_from_replica(self):
+        """Test GET, HEAD and OPTIONS requests read from a replica."""
+        self.assertIn(self.read_db(), ['replica_0', 'replica_1'])
+        self.assertIn(self.read_db('options'), ['replica_0', 'replica_1'])
+        self.assertIn(
+            self.read_db(HTTP_AUTHORIZATION='Token abc'), ['replica_0', 'replica_1'],
+        )
+        self.assertEqual(router.db_for_read(Recipe), 'default')
+
+    def test_writes_read_from_primary(self):
+        """Test other requests read from the primary."""
+        for method in ('post', 'put', 'patch', 'delete'):
+            self.assertEqual(self.read_db(method, HTTP_AUTHORIZATION='Token abc'), 'default')
+        self.assertEqual(router.db_for_write(Recipe), 'default')
+
+    def test_reads_after_write_stick_to_primary(self):
+        """Test a client reads from the primary for a while after writing."""
+        self.read_db('post', HTTP_AUTHORIZATION='Token abc')
+
+        self.assertEqual(self.read_db(HTTP_AUTHORIZATION='Token abc'), 'default')
+        self.assertIn(
+            self.read_db(HTTP_AUTHORIZATION='Token other'), ['replica_0', 'replica_1'],
+        )
+
+        cache.clear()
+        self.assertIn(
+            self.read_db(HTTP_AUTHORIZATION='Token abc'), ['replica_0', 'replica_1'],
+        )
+
+    def test_pin_seen_by_other_workers(self):
+        """Test a client writing through one worker is pinned in the others."""
+        worker = multiprocessing.get_context('fork').Process(
+            target=write_in_other_worker, args=('Token abc',),
+        )
+        worker.start()
+        worker.join()
+
+        self.assertEqual(worker.exitcode, 0)
+        self.assertEqual(self.read_db(HTTP_AUTHORIZATION='Token abc'), 'default')
+
+    def test_session_clients_pinned(self):
+        """Test clients authenticated by session are pinned by their cookie."""
+        self.factory.cookies['sessionid'] = 'session'
+        self.read_db('post')
+
+        self.assertEqual(self.read_db(), 'default')
+
+    def test_tokens_read_from_primary(self):
+        """Test auth tokens are always read from the primary."""
+        request = self.factory.get('/')
+        middleware = ReplicaRoutingMiddleware(
+            lambda request: HttpResponse(router.db_for_read(Token)),
+        )
+
+        self.assertEqual(middleware(request).content.decode(), 'default')
+
+
+@override_settings(DB_REPLICAS=['replica_0'])
+class ProcessLocalCacheTests(SimpleTestCase):
+    """Test replica routing needs a cache shared by the workers."""
+
+    def test_process_local_cache_rejected(self):
+        """Test the middleware refuses to start with a local memory or dummy cache."""
+        for backend in (
+            'django.core.cache.backends.locmem.LocMemCache',
+            'django.core.cache.backends.dummy.DummyCache',
+        ):
+            with self.subTest(backend=backend), \
+                    override_settings(CACHES={'default': {'BACKEND': backend}}):
+                with self.assertRaises(ImproperlyConfigured):
+                    ReplicaRoutingMiddleware(read_db_view)
+
+
+@use_shared_cache
+class ReplicaRoutingTransactionTests(TestCase):
+    """Test routing reads inside transactions."""
+
+    @override_settings(DB_REPLICAS=['replica_0'])
+    def test_reads_in_transaction_from_primary(self):
+        """Test reads in a transaction on the primary stay on the primary."""
+        middleware = ReplicaRoutingMiddleware(read_db_view)
+
+        with transaction.atomic():
+            res = middleware(RequestFactory().get('/'))
+
+        self.assertEqual(res.content.decode(), 'default')
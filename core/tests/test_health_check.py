@@ -19,3 +19,12 @@ class HealthCheckTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, {'health': 'ok'})
+
+    def test_health_check_async(self):
+        """Test async health check API."""
+        client = APIClient()
+        url = reverse('health-check-async')
+        res = client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {'health': 'ok'})
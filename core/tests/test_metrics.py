@@ -0,0 +1,106 @@
+"""
+Tests for the Prometheus metrics.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+METRICS_URL = reverse('metrics')
+RECIPES_ROUTE = 'api/recipe/recipes/$'
+
+
+def sample(name, **labels):
+    """Return the current value of a metric sample, 0 if not recorded yet."""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(METRICS_TOKEN='metrics-token')
+class MetricsTests(TestCase):
+    """Test recording and serving metrics."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123pass',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price='1.00', description='Hot',
+        )
+
+    def test_request_metrics_recorded(self):
+        """Test requests are counted and timed per route."""
+        labels = {'route': RECIPES_ROUTE, 'method': 'GET'}
+        requests = sample('http_requests_total', status='200', **labels)
+        queries = sample('http_request_db_queries_sum', **labels)
+        sizes = sample('http_response_size_bytes_count', **labels)
+
+        res = self.client.get(reverse('recipe:recipe-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sample('http_requests_total', status='200', **labels), requests + 1)
+        self.assertGreater(sample('http_request_db_queries_sum', **labels), queries)
+        self.assertEqual(sample('http_response_size_bytes_count', **labels), sizes + 1)
+        self.assertGreater(sample('http_request_duration_seconds_sum', **labels), 0)
+        self.assertGreater(sample('http_request_db_duration_seconds_sum', **labels), 0)
+
+    def test_unmatched_routes_share_label(self):
+        """Test requests to unknown URLs are counted under one route."""
+        labels = {'route': '<unmatched>', 'method': 'GET', 'status': '404'}
+        requests = sample('http_requests_total', **labels)
+
+        self.client.get('/api/nope/1/')
+        self.client.get('/api/nope/2/')
+
+        self.assertEqual(sample('http_requests_total', **labels), requests + 2)
+
+    async def test_async_view_metrics_recorded(self):
+        """Test async views are recorded, including their DB queries."""
+        labels = {'route': 'api/async/recipe/recipes/', 'method': 'GET'}
+        requests = sample('http_requests_total', status='200', **labels)
+        queries = sample('http_request_db_queries_sum', **labels)
+
+        res = await AsyncClient().get(
+            reverse('recipe-async:recipe-list'),
+            headers={'Authorization': f'Token {self.token.key}'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sample('http_requests_total', status='200', **labels), requests + 1)
+        self.assertGreater(sample('http_request_db_queries_sum', **labels), queries)
+
+    def test_metrics_endpoint(self):
+        """Test the metrics are served in the Prometheus text format."""
+        self.client.get(reverse('recipe:recipe-list'))
+
+        res = APIClient().get(METRICS_URL, HTTP_AUTHORIZATION='Bearer metrics-token')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'http_requests_total{', res.content)
+        self.assertIn(b'http_request_db_queries_bucket{', res.content)
+
+    def test_metrics_endpoint_requires_token(self):
+        """Test the metrics need the configured bearer token."""
+        for header in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+            with self.subTest(header=header):
+                res = APIClient().get(METRICS_URL, **header)
+
+                self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_metrics_endpoint_hidden_without_token(self):
+        """Test the metrics are not served without a token outside DEBUG."""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,31 @@
+"""
+Tests for the API middleware.
+"""
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+
+from core.middleware import QueryCountHeaderMiddleware
+from core.models import Tag, User
+
+
+class QueryCountHeaderMiddlewareTests(TestCase):
+    """Test reporting DB queries per request."""
+
+    @override_settings(DB_QUERY_COUNT_HEADER=True)
+    def test_counts_queries(self):
+        """Test the header holds the number of queries the request ran."""
+        def view(request):
+            list(User.objects.all())
+            list(Tag.objects.all())
+            return HttpResponse()
+
+        res = QueryCountHeaderMiddleware(view)(None)
+
+        self.assertEqual(res['X-DB-Queries'], '2')
+
+    @override_settings(DB_QUERY_COUNT_HEADER=False)
+    def test_disabled_by_default(self):
+        """Test the middleware is dropped unless enabled."""
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryCountHeaderMiddleware(HttpResponse)
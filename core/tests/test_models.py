@@ -5,6 +5,7 @@ from decimal import Decimal
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from django.test import TestCase
 
 from core import models
@@ -102,6 +103,43 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(ingredient), ingredient.name)
 
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name."""
+        user = create_user()
+        models.Tag.objects.create(user=user, name='Vegan')
+        other_user = create_user(email='other@example.com')
+        models.Tag.objects.create(user=other_user, name='Vegan')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Vegan')
+
+    def test_get_or_create_by_names(self):
+        """Test resolving names returns existing objects and creates missing ones."""
+        user = create_user()
+        existing = models.Ingredient.objects.create(user=user, name='Salt')
+        models.Ingredient.objects.create(user=create_user(email='other@example.com'), name='Pepper')
+
+        with self.assertNumQueries(1):
+            objs = models.Ingredient.objects.get_or_create_by_names(
+                user,
+                ['Salt', 'Pepper', 'Pepper'],
+            )
+
+        self.assertEqual(objs['Salt'], existing)
+        self.assertEqual(objs['Pepper'].user_id, user.id)
+        self.assertEqual(models.Ingredient.objects.filter(user=user).count(), 2)
+
+    def test_get_or_create_by_names_writes_to_primary(self):
+        """Test names are inserted on the write database, even when reads go elsewhere."""
+        user = create_user()
+
+        # No such database is configured in the tests, so using it would fail
+        with patch('core.models.router.db_for_read', return_value='replica_0'):
+            objs = models.Tag.objects.get_or_create_by_names(user, ['Vegan'])
+
+        self.assertEqual(objs['Vegan'].user_id, user.id)
+        self.assertEqual(objs['Vegan']._state.db, 'default')
+
     @patch('core.models.uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         """Test generating image path."""
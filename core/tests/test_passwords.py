@@ -0,0 +1,152 @@
+"""
+Tests for password hashing on the password executor.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model, hashers
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics, passwords
+
+TOKEN_URL = reverse('user:token')
+
+
+def sample(name):
+    """Return the current value of a metric sample, 0 if not recorded yet."""
+    return REGISTRY.get_sample_value(name) or 0
+
+
+class PasswordExecutorTests(TestCase):
+    """Test verifying passwords on the password executor."""
+
+    def setUp(self):
+        self.hashes = sample('password_hash_duration_seconds_count')
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123pass',
+        )
+        self.payload = {'email': 'user@example.com', 'password': 'test123pass'}
+
+    def test_token_hashes_on_executor(self):
+        """Test creating a token hashes the password off the request thread."""
+        threads = []
+        check_password = hashers.check_password
+
+        def record_thread(*args):
+            threads.append(threading.current_thread().name)
+            return check_password(*args)
+
+        with patch('core.passwords.hashers.check_password', side_effect=record_thread):
+            res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', res.data)
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('password-hash'))
+        self.assertEqual(sample('password_hash_duration_seconds_count'), self.hashes + 1)
+        self.assertGreater(sample('password_hash_queue_seconds_count'), 0)
+        self.assertIn('password_hash_duration_seconds_bucket', metrics.render_metrics().decode())
+
+    def test_wrong_password_and_unknown_user(self):
+        """Test bad credentials are rejected after hashing on the executor."""
+        for payload in (
+            {'email': 'user@example.com', 'password': 'wrong'},
+            {'email': 'nobody@example.com', 'password': 'test123pass'},
+        ):
+            with self.subTest(payload=payload):
+                res = self.client.post(TOKEN_URL, payload)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(sample('password_hash_duration_seconds_count'), self.hashes + 2)
+
+    def test_busy_executor_rejects_quickly(self):
+        """Test logins get a 503 with Retry-After while every slot is taken."""
+        executor = ThreadPoolExecutor(max_workers=1)
+        slots = threading.BoundedSemaphore(1)
+        release = threading.Event()
+        self.addCleanup(executor.shutdown)
+        self.addCleanup(release.set)
+        rejections = sample('password_hash_rejections_total')
+
+        with patch('core.passwords.get_executor', return_value=(executor, slots)):
+            slots.acquire()
+            executor.submit(release.wait)
+            res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+        self.assertEqual(sample('password_hash_rejections_total'), rejections + 1)
+
+    def test_inactive_user_rejected(self):
+        """Test an inactive user gets no token."""
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_logins_hash_on_request_thread(self):
+        """Test logins outside the token view keep ModelBackend, even while busy."""
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+
+        with patch('core.passwords.get_executor', return_value=(None, slots)):
+            logged_in = self.client.login(email='user@example.com', password='test123pass')
+
+        self.assertTrue(logged_in)
+        self.assertEqual(sample('password_hash_duration_seconds_count'), self.hashes)
+
+    @override_settings(PASSWORD_HASH_TIMEOUT=0.01)
+    def test_slow_hash_times_out(self):
+        """Test a request gives up on a hash taking too long."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        timeouts = sample('password_hash_timeouts_total')
+        in_flight = sample('password_hashes_in_flight')
+
+        with patch('core.passwords.hashers.check_password', side_effect=lambda *a: release.wait()):
+            res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(sample('password_hash_timeouts_total'), timeouts + 1)
+        self.assertEqual(sample('password_hashes_in_flight'), in_flight + 1)
+
+    def test_outdated_hash_upgraded(self):
+        """Test a password hashed with an outdated hasher is rehashed on login."""
+        self.user.password = hashers.make_password('test123pass', hasher='pbkdf2_sha1')
+        self.user.save()
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(self.user.check_password('test123pass'))
+
+
+class PoolSizeTests(SimpleTestCase):
+    """Test sizing the password executor of a process."""
+
+    def test_pool_size(self):
+        """Test hashing threads are shared out per node and a request thread is kept free."""
+        cases = [
+            # (processes, threads, node workers), (workers, admitted)
+            ((4, 4, 8), (2, 3)),
+            ((8, 4, 4), (1, 3)),
+            ((2, 8, 16), (7, 7)),
+            ((1, 1, 4), (1, 1)),
+        ]
+        for (processes, threads, node_workers), expected in cases:
+            size = (processes, threads)
+            with self.subTest(processes=processes, threads=threads, node_workers=node_workers), \
+                    override_settings(PASSWORD_HASH_WORKERS=node_workers), \
+                    patch('core.passwords.get_server_size', return_value=size):
+                self.assertEqual(passwords.get_pool_size(), expected)
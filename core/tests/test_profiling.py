@@ -0,0 +1,181 @@
+"""
+Tests for opt-in request profiling.
+"""
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import profiling
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def timing_names(response):
+    """Return the metric names of a Server-Timing header."""
+    return [metric.split(';')[0] for metric in response['Server-Timing'].split(', ')]
+
+
+class ProfileTests(SimpleTestCase):
+    """Test collecting a profile."""
+
+    def test_nested_phases_exclusive(self):
+        """Test time in a nested phase only counts for the nested phase."""
+        request = RequestFactory().get('/', HTTP_X_PROFILE='1')
+        with patch('core.profiling.get_staff_user', return_value=object()):
+            state = profiling.start_profile(request)
+        with profiling.phase('outer'):
+            time.sleep(0.01)
+            with profiling.phase('inner'):
+                time.sleep(0.02)
+        profiling.finish_profile(state, request, HttpResponse())
+        profile = state[0]
+
+        self.assertGreaterEqual(profile.phases['inner'], 0.02)
+        self.assertGreaterEqual(profile.phases['outer'], 0.01)
+        self.assertLess(profile.phases['outer'], 0.02)
+        self.assertLessEqual(sum(profile.phases.values()), profile.total)
+
+    def test_phase_without_profile(self):
+        """Test phases are no-ops outside profiled requests."""
+        self.assertIsNone(profiling.start_profile(RequestFactory().get('/')))
+        with profiling.phase('render'):
+            pass
+
+    def test_duplicates(self):
+        """Test repeated queries are grouped, most repeated first."""
+        profile = profiling.Profile()
+        profile.queries = [('A', 0.001), ('B', 0.002), ('A', 0.001), ('B', 0.001),
+                           ('A', 0.001), ('C', 0.005)]
+
+        self.assertEqual(profile.duplicates(), [
+            {'sql': 'A', 'count': 3, 'duration_ms': 3.0},
+            {'sql': 'B', 'count': 2, 'duration_ms': 3.0},
+        ])
+        self.assertIn('db;dur=11.0;desc="6 queries (3 duplicates)"', profile.server_timing())
+
+
+class ProfilingApiTests(TestCase):
+    """Test profiling API requests."""
+
+    def setUp(self):
+        cache.clear()
+        self.staff = get_user_model().objects.create_user(
+            email='staff@example.com',
+            password='test123pass',
+            is_staff=True,
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.staff).key}',
+        )
+        tag = Tag.objects.create(user=self.staff, name='Vegan')
+        self.recipe = Recipe.objects.create(
+            user=self.staff, title='Soup', time_minutes=5, price='1.00', description='Hot',
+        )
+        self.recipe.tags.add(tag)
+
+    def test_server_timing_for_staff(self):
+        """Test staff get the phases and DB usage of the list in Server-Timing."""
+        res = self.client.get(RECIPES_URL, HTTP_X_PROFILE='1')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), self.client.get(RECIPES_URL).json())
+        self.assertEqual(
+            timing_names(res), ['auth', 'serialize', 'render', 'view', 'db', 'total'],
+        )
+        self.assertRegex(res['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries \(0 duplicates\)"')
+
+    def test_serializer_phase_on_detail(self):
+        """Test serializing is timed for regular serializers too."""
+        res = self.client.get(
+            reverse('recipe:recipe-detail', args=[self.recipe.id]), HTTP_X_PROFILE='1',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('serialize', timing_names(res))
+        self.assertEqual(res.data['title'], 'Soup')
+
+    def test_json_debug_payload(self):
+        """Test X-Profile: json wraps the response in the profile."""
+        expected = self.client.get(RECIPES_URL).json()
+        cache.clear()
+
+        res = self.client.get(RECIPES_URL, HTTP_X_PROFILE='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        payload = res.json()
+        self.assertEqual(payload['status'], 200)
+        self.assertEqual(payload['response'], expected)
+        profile = payload['profile']
+        self.assertEqual(profile['db']['queries'], len(profile['queries']))
+        self.assertGreater(profile['db']['queries'], 0)
+        self.assertTrue(any('core_recipe' in query['sql'] for query in profile['queries']))
+        self.assertEqual(
+            set(profile['phases_ms']), {'auth', 'serialize', 'render', 'view'},
+        )
+        self.assertIn('Server-Timing', res)
+
+    def test_not_returned_to_other_users(self):
+        """Test non-staff users and anonymous requests get the plain response."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123pass',
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+
+        for res in (
+            client.get(RECIPES_URL, HTTP_X_PROFILE='json'),
+            APIClient().get(RECIPES_URL, HTTP_X_PROFILE='json'),
+        ):
+            self.assertNotIn('Server-Timing', res)
+            self.assertNotIn('profile', res.json())
+
+    def test_only_staff_tokens_start_profiling(self):
+        """Test other clients cannot turn profiling on."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123pass',
+        )
+        factory = RequestFactory()
+
+        for authorization in (
+            f'Token {Token.objects.create(user=user).key}',
+            'Token invalid',
+            'Basic c3RhZmY6cGFzcw==',
+            '',
+        ):
+            with self.subTest(authorization=authorization):
+                request = factory.get('/', HTTP_X_PROFILE='1', HTTP_AUTHORIZATION=authorization)
+
+                self.assertIsNone(profiling.start_profile(request))
+        self.assertIsNone(profiling._profile.get())
+
+    async def test_async_view_profiled_for_staff(self):
+        """Test staff get the profile from views served natively under ASGI."""
+        token = await Token.objects.aget(user=self.staff)
+        client = AsyncClient()
+
+        res = await client.get(
+            reverse('recipe-async:recipe-list'),
+            headers={'Authorization': f'Token {token.key}', 'X-Profile': 'json'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('Server-Timing', res)
+        self.assertGreater(res.json()['profile']['db']['queries'], 0)
+
+    def test_not_profiled_without_header(self):
+        """Test requests without the header are not profiled."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
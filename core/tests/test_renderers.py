@@ -0,0 +1,81 @@
+"""
+Tests for the fast JSON renderer and parser.
+"""
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+DATA = {
+    'id': 1,
+    'price': Decimal('5.50'),
+    'ratio': 0.1,
+    'created': datetime(2023, 8, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+    'title': gettext_lazy('Crème brûlée\u2028'),
+    'image': 'http://testserver/static/media/uploads/recipe/a.jpg',
+    'tags': [{'id': 2, 'name': 'Dessert'}],
+    3: None,
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the fast JSON renderer."""
+
+    def test_render_matches_json_renderer(self):
+        """Test the output is byte-identical to JSONRenderer's."""
+        content = FastJSONRenderer().render(DATA, 'application/json')
+
+        self.assertEqual(content, JSONRenderer().render(DATA, 'application/json'))
+
+    def test_render_indent_falls_back(self):
+        """Test indented output is delegated to JSONRenderer."""
+        media_type = 'application/json; indent=4'
+        content = FastJSONRenderer().render(DATA, media_type)
+
+        self.assertEqual(content, JSONRenderer().render(DATA, media_type))
+
+    @patch('core.renderers.orjson', None)
+    def test_render_without_orjson(self):
+        """Test rendering falls back to JSONRenderer when orjson is missing."""
+        content = FastJSONRenderer().render(DATA, 'application/json')
+
+        self.assertEqual(content, JSONRenderer().render(DATA, 'application/json'))
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test the fast JSON parser."""
+
+    def parse(self, content, encoding='utf-8'):
+        return FastJSONParser().parse(io.BytesIO(content), parser_context={'encoding': encoding})
+
+    def test_parse(self):
+        """Test parsing a JSON body."""
+        data = self.parse('{"title": "Crème", "price": "5.50", "tags": []}'.encode())
+
+        self.assertEqual(data, {'title': 'Crème', 'price': '5.50', 'tags': []})
+
+    def test_parse_invalid(self):
+        """Test invalid JSON and non-finite numbers are rejected."""
+        for content in (b'{"title": ', b'{"price": NaN}'):
+            with self.subTest(content=content):
+                with self.assertRaises(ParseError):
+                    self.parse(content)
+
+    def test_parse_other_encoding(self):
+        """Test non UTF-8 bodies are decoded with their declared encoding."""
+        data = self.parse('{"title": "Crème"}'.encode('latin-1'), encoding='latin-1')
+
+        self.assertEqual(data, {'title': 'Crème'})
+
+    @patch('core.parsers.orjson', None)
+    def test_parse_without_orjson(self):
+        """Test parsing falls back to JSONParser when orjson is missing."""
+        self.assertEqual(self.parse(b'{"id": 1}'), {'id': 1})
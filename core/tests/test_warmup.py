@@ -0,0 +1,50 @@
+"""
+Tests for warming up application servers.
+"""
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import URLResolver, get_resolver
+
+from core import warmup
+
+
+class WarmUpTests(SimpleTestCase):
+    """Test warming up a process."""
+
+    def test_warm_up(self):
+        """Test routes, serializers and the schema are warmed up without the DB."""
+        summary = warmup.warm_up()
+
+        self.assertGreater(summary['routes'], 0)
+        self.assertGreater(summary['serializers'], 0)
+        self.assertGreater(summary['schema_paths'], 0)
+        self.assertIsNone(connections['default'].connection)
+
+    def test_routes_compiled(self):
+        """Test every URL pattern has its regular expression compiled."""
+        warmup.compile_routes()
+
+        resolvers = [get_resolver()]
+        while resolvers:
+            for pattern in resolvers.pop().url_patterns:
+                self.assertIn('regex', vars(pattern.pattern))
+                if isinstance(pattern, URLResolver):
+                    resolvers.append(pattern)
+
+
+class OpenDbConnectionsTests(TestCase):
+    """Test opening DB connections ahead of requests."""
+
+    def test_connections_pooled(self):
+        """Test the opened connections are left idle in the pool."""
+        self.assertEqual(warmup.open_db_connections(2), 2)
+
+        wrapper = connections.create_connection('default')
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+        self.assertGreaterEqual(wrapper.pool.stats()['idle'], 1)
+
+    @override_settings(DB_POOL_SIZE=0)
+    def test_without_pool(self):
+        """Test nothing is opened without the pooled backend."""
+        self.assertEqual(warmup.open_db_connections(2), 0)
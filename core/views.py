@@ -1,11 +1,41 @@
 """
 Core views for app.
 """
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+from prometheus_client import CONTENT_TYPE_LATEST
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
+from core.metrics import render_metrics
+
 
 @api_view(['GET'])
 def health_check(request):
     """Returns successful response."""
     return Response({'health': "ok"})
+
+
+async def health_check_async(request):
+    """Returns successful response without leaving the event loop."""
+    return JsonResponse({'health': 'ok'})
+
+
+def metrics(request):
+    """
+    Returns the Prometheus metrics of the node.
+
+    Requires the METRICS_TOKEN bearer token when one is set; without one
+    the endpoint is only served in DEBUG.
+    """
+    if not settings.METRICS_TOKEN:
+        if not settings.DEBUG:
+            raise Http404()
+    elif not hmac.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}',
+    ):
+        return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
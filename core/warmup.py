@@ -0,0 +1,170 @@
+"""
+Warming up application servers before they take traffic.
+
+warm_up() does the one-off work the first requests of a process would
+otherwise pay for: importing the cache, session and SQL compiler
+backends, compiling every URL pattern, building the fields of the API
+serializers, generating the OpenAPI schema (which imports and inspects
+every view) and loading the translation catalog. It needs no database and
+leaves no connection open.
+
+Under uWSGI, config.wsgi calls install_uwsgi_hooks(): the master warms up
+once before forking, so every worker, including ones respawned after
+max-requests or started by the cheaper subsystem, starts warm. Each worker
+then drops the DB connections it may have inherited and opens its own, and
+marks its metrics dead when it exits.
+"""
+import logging
+import random
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import DatabaseError
+from django.urls import URLResolver, get_resolver
+from django.utils import translation
+from django.utils.module_loading import import_string
+
+from core import metrics
+from core.pooled_postgresql.pool import close_pools
+
+logger = logging.getLogger(__name__)
+
+
+def compile_routes(resolver=None):
+    """Compile the regular expressions of every URL pattern, returning how many."""
+    resolver = resolver or get_resolver()
+    # Builds the reverse lookup tables
+    resolver.reverse_dict
+    count = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        count += 1
+        if isinstance(pattern, URLResolver):
+            count += compile_routes(pattern)
+
+    return count
+
+
+def build_serializers():
+    """Build the fields of the API serializers, returning how many were built."""
+    from recipe import serializers as recipe_serializers
+    from user import serializers as user_serializers
+
+    serializer_classes = [
+        recipe_serializers.RecipeSerializer,
+        recipe_serializers.RecipeDetailSerializer,
+        recipe_serializers.RecipeImageSerializer,
+        recipe_serializers.TagSerializer,
+        recipe_serializers.TagCountSerializer,
+        recipe_serializers.IngredientSerializer,
+        recipe_serializers.IngredientCountSerializer,
+        user_serializers.UserSerializer,
+        user_serializers.AuthTokenSerializer,
+    ]
+    for serializer_class in serializer_classes:
+        serializer_class(context={}).fields
+    recipe_serializers.FastReadSerializer(recipe_serializers.RecipeSerializer)
+
+    return len(serializer_classes)
+
+
+def compile_schema():
+    """Generate the OpenAPI schema, returning the number of paths."""
+    from drf_spectacular.drainage import GENERATOR_STATS
+    from drf_spectacular.generators import SchemaGenerator
+
+    # Its warnings are reported when the schema is served
+    with GENERATOR_STATS.silence():
+        return len(SchemaGenerator().get_schema(request=None, public=True)['paths'])
+
+
+def import_backends():
+    """Import the cache, session, message storage and SQL compiler backends."""
+    for database in settings.DATABASES:
+        connections[database].ops.compiler('SQLCompiler')
+    for alias in settings.CACHES:
+        # Creating the cache only imports its backend; clients connect lazily
+        caches[alias]
+    import_module(settings.SESSION_ENGINE)
+    import_string(settings.SESSION_SERIALIZER)
+    import_string(settings.MESSAGE_STORAGE)
+
+
+def warm_up():
+    """Warm up the current process, returning what was warmed up and how long it took."""
+    start = time.perf_counter()
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('')
+        import_backends()
+        summary = {
+            'routes': compile_routes(),
+            'serializers': build_serializers(),
+            'schema_paths': compile_schema(),
+        }
+    # Forked processes must not share connections opened while warming up
+    connections.close_all()
+    close_pools()
+    summary['seconds'] = round(time.perf_counter() - start, 3)
+
+    return summary
+
+
+def open_db_connections(count, database=DEFAULT_DB_ALIAS):
+    """
+    Open up to count pooled connections and return them to the pool.
+
+    Moves the cost of connecting from the first requests of a process to
+    its start. Does nothing without the pooled backend, whose connections
+    would be closed right away.
+    """
+    if settings.DB_POOL_SIZE <= 0:
+        return 0
+
+    wrappers = []
+    try:
+        for _ in range(min(count, settings.DB_POOL_SIZE)):
+            wrapper = connections.create_connection(database)
+            wrapper.ensure_connection()
+            wrappers.append(wrapper)
+    except DatabaseError as exc:
+        logger.warning('Could not open DB connections after fork: %s', exc)
+    finally:
+        for wrapper in wrappers:
+            wrapper.close()
+
+    return len(wrappers)
+
+
+def after_fork(db_connections):
+    """Set up a worker forked from a warmed up master."""
+    # Connections inherited from the master share its sockets; drop them
+    # without closing, which would end the master's sessions
+    for connection in connections.all(initialized_only=True):
+        connection.connection = None
+    # Workers would otherwise pick the same replicas and backoff jitter
+    random.seed()
+    open_db_connections(db_connections)
+
+
+def install_uwsgi_hooks():
+    """Warm up the uWSGI master and set up its workers after they fork."""
+    import uwsgi
+    from uwsgidecorators import postfork
+
+    # Recycled workers must not leave their live gauges behind
+    uwsgi.atexit = metrics.mark_process_dead
+    threads = int(uwsgi.opt.get('threads', 1))
+    if uwsgi.worker_id() > 0:
+        # Loaded by a worker after forking, with lazy-apps
+        logger.info('Warmed up uWSGI worker: %s', warm_up())
+        open_db_connections(threads)
+        return
+
+    logger.info('Warmed up uWSGI master: %s', warm_up())
+
+    @postfork
+    def set_up_worker():
+        after_fork(db_connections=threads)
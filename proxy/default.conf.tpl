@@ -5,6 +5,15 @@ server {
         alias /static_files;
     }
 
+    location /api/async/ {
+        proxy_pass              http://${APP_HOST}:${ASGI_PORT};
+        proxy_set_header        Host $host;
+        proxy_set_header        X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header        X-Forwarded-Proto $scheme;
+        proxy_http_version      1.1;
+        proxy_set_header        Connection "";
+    }
+
     location / {
         uwsgi_pass              ${APP_HOST}:${APP_PORT};
         include                 /etc/nginx/uwsgi_params;
@@ -0,0 +1,183 @@
+"""
+Async read-only views for the recipe APIs
+
+Natively async counterparts of the list/retrieve endpoints of the recipe
+viewsets, built on Django's async ORM so a worker is not pinned while a
+request waits on the database or a slow client. Responses match the sync
+endpoints, including cursor pagination links.
+"""
+import functools
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.pagination import Cursor
+from rest_framework.request import Request
+
+from core.authentication import aauthenticate
+from core.models import Recipe, Tag, Ingredient
+from core.renderers import FastJSONRenderer
+from recipe import serializers
+from recipe.filters import (
+    RecipeAttrOrderingFilter,
+    autocomplete_recipe_attrs,
+    filter_recipe_attrs,
+    filter_recipes,
+    get_autocomplete_limit,
+    wants_recipe_counts,
+)
+from recipe.pagination import IdCursorPagination
+from recipe.views import optimize_for_serializer
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    """Render data the way the sync endpoints' renderer does."""
+    return HttpResponse(
+        FastJSONRenderer().render(data),
+        status=status_code,
+        content_type='application/json',
+    )
+
+
+def async_read_view(view):
+    """
+    Run an async view for an authenticated GET request and render its data.
+
+    The view receives the request, the token's user and the URL kwargs.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            detail = f'Method "{request.method}" not allowed.'
+            return render({'detail': detail}, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        user = await aauthenticate(request)
+        if user is None:
+            response = render(
+                {'detail': 'Authentication credentials were not provided.'},
+                status.HTTP_401_UNAUTHORIZED,
+            )
+            response['WWW-Authenticate'] = 'Token'
+            return response
+
+        try:
+            data = await view(request, user, *args, **kwargs)
+        except APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+            return render(detail, exc.status_code)
+
+        return render(data)
+
+    return wrapper
+
+
+async def paginate(request, queryset, serializer_class):
+    """
+    Return a page of queryset in the IdCursorPagination response format.
+
+    Cursors are interchangeable with the sync endpoints'.
+    """
+    paginator = IdCursorPagination()
+    drf_request = Request(request)
+    paginator.base_url = drf_request.build_absolute_uri()
+    page_size = paginator.get_page_size(drf_request)
+    cursor = paginator.decode_cursor(drf_request)
+
+    if cursor is None or not cursor.reverse:
+        if cursor is not None:
+            queryset = queryset.filter(id__lt=cursor.position)
+        objs = [obj async for obj in queryset.order_by('-id')[:page_size + 1]]
+        has_next, has_previous = len(objs) > page_size, cursor is not None
+        objs = objs[:page_size]
+    else:
+        queryset = queryset.filter(id__gt=cursor.position).order_by('id')
+        objs = [obj async for obj in queryset[:page_size + 1]]
+        has_next, has_previous = True, len(objs) > page_size
+        objs = list(reversed(objs[:page_size]))
+
+    next_link = previous_link = None
+    if objs and has_next:
+        next_link = paginator.encode_cursor(Cursor(0, False, str(objs[-1].id)))
+    if objs and has_previous:
+        previous_link = paginator.encode_cursor(Cursor(0, True, str(objs[0].id)))
+
+    serializer = serializer_class(objs, many=True, context={'request': request})
+    return OrderedDict([
+        ('next', next_link),
+        ('previous', previous_link),
+        ('results', serializer.data),
+    ])
+
+
+@async_read_view
+async def recipe_list(request, user):
+    """List recipes for the authenticated user."""
+    if request.GET.get('search', '').strip():
+        raise ValidationError({'search': 'Search is not supported on this endpoint.'})
+    queryset = filter_recipes(Recipe.objects.filter(user=user), request.GET)
+    serializer_class = serializers.RecipeSerializer
+    queryset = optimize_for_serializer(queryset, serializer_class)
+
+    return await paginate(request, queryset, serializer_class)
+
+
+@async_read_view
+async def recipe_detail(request, user, pk):
+    """Retrieve a recipe of the authenticated user."""
+    serializer_class = serializers.RecipeDetailSerializer
+    queryset = optimize_for_serializer(Recipe.objects.filter(user=user), serializer_class)
+    try:
+        recipe = await queryset.aget(pk=pk)
+    except Recipe.DoesNotExist:
+        raise NotFound()
+
+    return serializer_class(recipe, context={'request': request}).data
+
+
+async def paginate_recipe_attrs(request, queryset, serializer_class, count_serializer_class):
+    """
+    Return a page of tags or ingredients, with usage counts if asked for.
+
+    Pages are keyed on id only, so ordering by usage is left to the sync
+    endpoints. A q parameter returns autocomplete matches instead.
+    """
+    if 'q' in request.GET:
+        text = request.GET['q'].strip()
+        if not text:
+            return {'results': []}
+        matches = await sync_to_async(autocomplete_recipe_attrs)(
+            queryset, text, get_autocomplete_limit(request.GET),
+        )
+        return {'results': [match async for match in matches]}
+    if request.GET.get(RecipeAttrOrderingFilter.ordering_param, '-id') != '-id':
+        raise ValidationError({'ordering': 'Only -id is supported on this endpoint.'})
+    if wants_recipe_counts(request.GET):
+        serializer_class = count_serializer_class
+    queryset = filter_recipe_attrs(queryset, request.GET)
+    queryset = optimize_for_serializer(queryset, serializer_class)
+
+    return await paginate(request, queryset, serializer_class)
+
+
+@async_read_view
+async def tag_list(request, user):
+    """List tags for the authenticated user."""
+    return await paginate_recipe_attrs(
+        request,
+        Tag.objects.filter(user=user),
+        serializers.TagSerializer,
+        serializers.TagCountSerializer,
+    )
+
+
+@async_read_view
+async def ingredient_list(request, user):
+    """List ingredients for the authenticated user."""
+    return await paginate_recipe_attrs(
+        request,
+        Ingredient.objects.filter(user=user),
+        serializers.IngredientSerializer,
+        serializers.IngredientCountSerializer,
+    )
@@ -0,0 +1,120 @@
+"""
+Per-user versioned response caching for the recipe APIs
+"""
+import functools
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.caching import is_shared_cache
+from core.db_router import use_primary
+from core.models import Recipe, Tag, Ingredient
+
+VERSION_KEY_PREFIX = 'recipe-data-version'
+RESPONSE_KEY_PREFIX = 'recipe-response'
+
+
+def get_data_version(user_id):
+    """Return the current version of the user's recipe data."""
+    key = f'{VERSION_KEY_PREFIX}:{user_id}'
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+
+    return version
+
+
+def _set_data_version(user_id):
+    """Store a new random version of the user's recipe data."""
+    cache.set(f'{VERSION_KEY_PREFIX}:{user_id}', uuid.uuid4().hex, None)
+
+
+def bump_data_version(user_id):
+    """
+    Invalidate every cached response of the user.
+
+    A random version (instead of a counter) keeps stale entries unreachable
+    even if the version key itself is evicted from the cache. Inside a
+    transaction the version is bumped again once it commits, as responses
+    rendered before then cannot see the writes.
+    """
+    _set_data_version(user_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(functools.partial(_set_data_version, user_id))
+
+
+class CachedResponseMixin:
+    """
+    Cache list responses per user until their data changes
+
+    Responses are keyed by user, path, query string, response format and the
+    user's data version, which is bumped on every write. Clients sending a
+    matching If-None-Match get a 304 without the view running at all.
+
+    Misses are rendered from the primary database: a lagging replica would
+    cache data older than the version it is stored under. Nothing is cached
+    with a process-local cache, whose versions other workers do not bump.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def cached_response(self, view, request, *args, **kwargs):
+        """Serve the response from cache, or render and cache it."""
+        if not is_shared_cache():
+            return view(request, *args, **kwargs)
+
+        version = get_data_version(request.user.pk)
+        digest = hashlib.md5(
+            f'{version}:{request.accepted_renderer.format}:{request.get_full_path()}'.encode(),
+        ).hexdigest()
+        etag = quote_etag(digest)
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            key = f'{RESPONSE_KEY_PREFIX}:{request.user.pk}:{digest}'
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+            else:
+                with use_primary():
+                    response = view(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(key, response.data, settings.RESPONSE_CACHE_TTL)
+
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+
+def bump_instance_user(sender, instance, **kwargs):
+    """Bump the data version of the owner of a saved or deleted object."""
+    bump_data_version(instance.user_id)
+
+
+def bump_m2m_user(sender, instance, action, **kwargs):
+    """Bump the data version when recipe tags or ingredients are relinked."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_data_version(instance.user_id)
+
+
+def connect_signals():
+    """Bump data versions whenever recipes, tags or ingredients change."""
+    for model in (Recipe, Tag, Ingredient):
+        post_save.connect(bump_instance_user, sender=model)
+        post_delete.connect(bump_instance_user, sender=model)
+    for through in (Recipe.tags.through, Recipe.ingredients.through):
+        m2m_changed.connect(bump_m2m_user, sender=through)
@@ -0,0 +1,364 @@
+"""
+Queryset filters for the recipe APIs
+"""
+from django.conf import settings
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVectorExact,
+    SearchVectorField,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import (
+    BigIntegerField,
+    BooleanField,
+    Case,
+    Count,
+    Exists,
+    ExpressionWrapper,
+    F,
+    Field,
+    FloatField,
+    Func,
+    Lookup,
+    OuterRef,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+from rest_framework import fields
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from rest_framework.pagination import CursorPagination
+
+from core.models import Recipe
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_CHOICES = (MATCH_ANY, MATCH_ALL)
+
+RECIPE_COUNT = 'recipe_count'
+# Unique sort key of attributes ordered by usage, see RecipeAttrOrderingFilter
+RECIPE_COUNT_KEY = 'recipe_count_key'
+# Larger than any id, so the key orders by usage first
+ID_SPAN = 2 ** 40
+# Largest id a filter may ask for, that of a bigint primary key
+MAX_ID = 2 ** 63 - 1
+
+SEARCH_CONFIG = 'english'
+SEARCH_RANK = 'search_rank'
+# Unique sort key of searched recipes, see RecipeSearchOrderingFilter
+SEARCH_KEY = 'search_key'
+
+
+def filter_by_related(queryset, field_name, ids, match=MATCH_ANY):
+    """
+    Filter recipes linked to any (or all) of ids through field_name.
+
+    Both modes are semi-joins on the through table, so matching recipes are
+    returned once without a DISTINCT over the full recipe row: ``any`` is a
+    correlated EXISTS and ``all`` keeps recipes whose links, grouped per
+    recipe, cover every requested id.
+    """
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through
+    source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+    links = through.objects.filter(**{f'{target}_id__in': ids})
+
+    if match == MATCH_ALL:
+        matching = links.values(f'{source}_id').annotate(
+            matched=Count(f'{target}_id', distinct=True),
+        ).filter(matched=len(set(ids))).values(f'{source}_id')
+        return queryset.filter(id__in=matching)
+
+    return queryset.filter(Exists(links.filter(**{source: OuterRef('pk')})))
+
+
+def search_vector():
+    """
+    Return the recipe search vector column.
+
+    It is a stored column generated by Postgres from the weighted title and
+    description (core migration 0008) and GIN indexed, so it is not declared
+    on the model.
+    """
+    return RawSQL(
+        f'"{Recipe._meta.db_table}"."search_vector"', [], output_field=SearchVectorField(),
+    )
+
+
+def search_recipes(queryset, text):
+    """
+    Keep recipes matching text and annotate them with their search_rank.
+
+    text uses web search syntax ("quoted phrases", or, -excluded). Matching
+    is a ``@@`` on the indexed vector and ranking uses ts_rank, cast to
+    double precision so cursor positions round-trip exactly.
+    """
+    query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+    rank = Cast(SearchRank(search_vector(), query), FloatField())
+
+    return queryset.filter(SearchVectorExact(search_vector(), query)).annotate(
+        **{SEARCH_RANK: rank},
+    )
+
+
+def params_to_ints(qs, name):
+    """Convert the comma separated ids of query parameter name to integers."""
+    try:
+        ids = [int(str_id) for str_id in qs.split(',')]
+    except ValueError:
+        ids = None
+    if ids is None or not all(0 < id_ <= MAX_ID for id_ in ids):
+        raise ValidationError({name: 'Must be a comma separated list of ids.'})
+
+    return ids
+
+
+def get_autocomplete_limit(query_params):
+    """Return the requested number of autocomplete matches, within bounds."""
+    try:
+        limit = int(query_params.get('limit', settings.AUTOCOMPLETE_LIMIT))
+    except ValueError:
+        raise ValidationError({'limit': 'A valid integer is required.'})
+
+    return max(1, min(limit, settings.AUTOCOMPLETE_MAX_LIMIT))
+
+
+def get_flag(query_params, name):
+    """Return a boolean query parameter (1, true, yes or 0, false, no), False if absent."""
+    try:
+        return fields.BooleanField().to_internal_value(query_params.get(name, False))
+    except ValidationError:
+        raise ValidationError({name: 'Must be a valid boolean.'})
+
+
+def filter_recipes(queryset, query_params):
+    """Apply the search, tags, ingredients and match list filters."""
+    search = query_params.get('search', '').strip()
+    tags = query_params.get('tags')
+    ingredients = query_params.get('ingredients')
+    match = query_params.get('match', MATCH_ANY)
+    if match not in MATCH_CHOICES:
+        raise ValidationError({'match': f'Must be one of: {", ".join(MATCH_CHOICES)}.'})
+
+    if tags:
+        tag_ids = params_to_ints(tags, 'tags')
+        queryset = filter_by_related(queryset, 'tags', tag_ids, match)
+    if ingredients:
+        ingredient_ids = params_to_ints(ingredients, 'ingredients')
+        queryset = filter_by_related(queryset, 'ingredients', ingredient_ids, match)
+    if search:
+        queryset = search_recipes(queryset, search)
+
+    return queryset
+
+
+class RowKeyField(Field):
+    """
+    Postgres row of values, compared column by column
+
+    Rows are read back as text, like ``(0.5,12)``, which cursors keep as
+    their position. Comparisons parse that text into a row of db_types.
+    """
+
+    def __init__(self, db_types, **kwargs):
+        self.db_types = db_types
+        super().__init__(**kwargs)
+
+    def parse(self, text):
+        """Return the values of a row's text, or raise ValueError."""
+        values = text.strip('()').split(',')
+        if len(values) != len(self.db_types):
+            raise ValueError(f'Expected {len(self.db_types)} values: {text}')
+
+        return [
+            float(value) if db_type == 'double precision' else int(value)
+            for value, db_type in zip(values, self.db_types)
+        ]
+
+
+class RowKeyLessThan(Lookup):
+    """Compare a row key with the text of another row."""
+    lookup_name = 'lt'
+    operator = '<'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        field = self.lhs.output_field
+        try:
+            values = field.parse(self.rhs)
+        except ValueError:
+            # Only cursors compare row keys
+            raise NotFound(CursorPagination.invalid_cursor_message)
+        placeholders = ', '.join(f'%s::{db_type}' for db_type in field.db_types)
+        return f'{lhs} {self.operator} ROW({placeholders})', [*lhs_params, *values]
+
+
+class RowKeyGreaterThan(RowKeyLessThan):
+    lookup_name = 'gt'
+    operator = '>'
+
+
+RowKeyField.register_lookup(RowKeyLessThan)
+RowKeyField.register_lookup(RowKeyGreaterThan)
+
+
+class RowKey(Func):
+    """ROW() of expressions, a sort key unique when one of them is."""
+    template = 'ROW(%(expressions)s)'
+
+
+class RecipeSearchOrderingFilter(BaseFilterBackend):
+    """
+    Order searched recipes by rank, and other lists newest first
+
+    Ties are broken on -id so cursor pages stay stable. Cursors only compare
+    the first ordering term, skipping ties by offset, so searches order by
+    one unique key: the row of the rank and the id.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        if request.query_params.get('search', '').strip():
+            return [f'-{SEARCH_KEY}']
+
+        return ['-id']
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if ordering[0] == f'-{SEARCH_KEY}':
+            queryset = queryset.annotate(**{SEARCH_KEY: RowKey(
+                SEARCH_RANK, 'id',
+                output_field=RowKeyField(('double precision', 'bigint')),
+            )})
+
+        return queryset.order_by(*ordering)
+
+
+def wants_recipe_counts(query_params):
+    """Return whether tags or ingredients should be annotated with their usage."""
+    ordering = query_params.get(RecipeAttrOrderingFilter.ordering_param, '')
+    return (
+        get_flag(query_params, 'with_counts')
+        or RECIPE_COUNT in (term.strip().lstrip('-') for term in ordering.split(','))
+    )
+
+
+def filter_recipe_attrs(queryset, query_params):
+    """
+    Apply the assigned_only filter and usage counts to tags or ingredients.
+
+    assigned_only is an EXISTS on the through table, so attributes linked to
+    many recipes are neither multiplied nor deduplicated. Usage counts are
+    added as recipe_count in the same grouped query.
+    """
+    rel = queryset.model._meta.get_field('recipe')
+    assigned_only = get_flag(query_params, 'assigned_only')
+    if assigned_only:
+        links = rel.through.objects.filter(
+            **{f'{rel.field.m2m_reverse_field_name()}_id': OuterRef('pk')},
+        )
+        queryset = queryset.filter(Exists(links))
+    if wants_recipe_counts(query_params):
+        queryset = queryset.annotate(**{RECIPE_COUNT: Count('recipe')})
+
+    return queryset
+
+
+class ILikePrefix(Lookup):
+    """
+    Case-insensitive prefix match compiled to ``ILIKE 'text%'``
+
+    Unlike istartswith, which Django compiles to ``UPPER(name) LIKE
+    UPPER('text%')``, ILIKE can be served by the gin_trgm_ops indexes.
+    """
+    lookup_name = 'ilike_prefix'
+    prepare_rhs = False
+
+    def get_db_prep_lookup(self, value, connection):
+        return '%s', [f'{connection.ops.prep_for_like_query(value)}%']
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', [*lhs_params, *rhs_params]
+
+
+_trigram_support = {}
+
+
+def has_trigram_support(using):
+    """Return whether the pg_trgm extension is installed in database using."""
+    if using not in _trigram_support:
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT EXISTS(SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            _trigram_support[using] = cursor.fetchone()[0]
+
+    return _trigram_support[using]
+
+
+def autocomplete_recipe_attrs(queryset, text, limit):
+    """
+    Return the id and name of the limit tags or ingredients best matching text.
+
+    Names starting with text come first. With pg_trgm, names where some word
+    is similar to text also match (typos, partial words), ranked by word
+    similarity and served by the trigram indexes of core migration 0009.
+    Without it, names containing text match.
+    """
+    prefix = Case(
+        When(ILikePrefix(F('name'), text), then=Value(True)),
+        default=Value(False),
+        output_field=BooleanField(),
+    )
+    if has_trigram_support(queryset.db):
+        queryset = queryset.filter(
+            Q(ILikePrefix(F('name'), text)) | Q(TrigramWordSimilar(F('name'), text)),
+        ).annotate(
+            is_prefix=prefix,
+            similarity=TrigramWordSimilarity(text, 'name'),
+        ).order_by('-is_prefix', '-similarity', 'name', 'id')
+    else:
+        queryset = queryset.filter(name__icontains=text).annotate(
+            is_prefix=prefix,
+        ).order_by('-is_prefix', 'name', 'id')
+
+    return queryset.values('id', 'name')[:limit]
+
+
+class RecipeAttrOrderingFilter(OrderingFilter):
+    """
+    Order tags or ingredients by id (default) or usage
+
+    ordering=-recipe_count returns the most used attributes first. Ties are
+    broken on -id so cursor pages stay stable. Cursors only compare the
+    first ordering term, skipping ties by offset, so usage orders by one
+    unique key combining the recipe count with the id.
+    """
+    ordering_fields = [RECIPE_COUNT, 'id']
+
+    def get_default_ordering(self, view):
+        return ['-id']
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering[0].lstrip('-') == RECIPE_COUNT:
+            return [ordering[0].replace(RECIPE_COUNT, RECIPE_COUNT_KEY)]
+
+        return ordering[:1]
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if ordering[0].lstrip('-') == RECIPE_COUNT_KEY:
+            # Ids descend within a usage, whichever way the usage is ordered
+            tie_breaker = F('id') if ordering[0].startswith('-') else -F('id')
+            queryset = queryset.annotate(**{RECIPE_COUNT_KEY: ExpressionWrapper(
+                F(RECIPE_COUNT) * ID_SPAN + tie_breaker, output_field=BigIntegerField(),
+            )})
+
+        return queryset.order_by(*ordering)
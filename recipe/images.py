@@ -0,0 +1,164 @@
+"""
+Off-request image processing for recipe uploads
+"""
+import functools
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# Variant name and longest side in pixels, largest first so each variant can
+# be downscaled from the previous one.
+VARIANTS = (
+    ('main', 2048),
+    ('medium', 1024),
+    ('thumbnail', 256),
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_name(image_name, variant):
+    """Return the storage name of a variant, next to the original image."""
+    root, _ = os.path.splitext(image_name)
+    return f'{root}_{variant}.jpg'
+
+
+def get_variant_urls(variants):
+    """
+    Return the URL of every variant, or None for those not ready yet.
+
+    variants maps the rendered variants to their storage names, as recorded
+    in Recipe.image_variants, so the storage is not queried.
+    """
+    return {
+        variant: default_storage.url(variants[variant]) if variant in variants else None
+        for variant, _ in VARIANTS
+    }
+
+
+def delete_image(image_name):
+    """Delete a stored image and its variants."""
+    for name in [image_name] + [variant_name(image_name, variant) for variant, _ in VARIANTS]:
+        default_storage.delete(name)
+
+
+def render_variants(source_path, targets):
+    """
+    Decode the source image once and write every variant as JPEG.
+
+    Runs in a worker process. targets is a list of (path, longest side)
+    pairs ordered largest first. Files are written under a temporary name
+    and renamed, so a variant only becomes visible once complete.
+    """
+    with Image.open(source_path) as source:
+        source.draft('RGB', (targets[0][1], targets[0][1]))
+        image = ImageOps.exif_transpose(source).convert('RGB')
+
+    for path, size in targets:
+        image.thumbnail((size, size), Image.LANCZOS)
+        tmp_path = f'{path}.tmp'
+        image.save(tmp_path, 'JPEG', quality=85, optimize=True, progressive=True)
+        os.replace(tmp_path, path)
+
+    return [path for path, _ in targets]
+
+
+def get_python_executable():
+    """Return the Python interpreter to spawn pool processes with."""
+    # Embedding servers like uWSGI report their own binary as the executable
+    if os.path.basename(sys.executable).startswith('python'):
+        return sys.executable
+
+    return os.path.join(sys.exec_prefix, 'bin', 'python{}.{}'.format(*sys.version_info))
+
+
+def get_executor():
+    """Return the process pool shared by this worker, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            mp_context = multiprocessing.get_context('spawn')
+            mp_context.set_executable(get_python_executable())
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PROCESSING_WORKERS,
+                mp_context=mp_context,
+            )
+
+    return _executor
+
+
+def finish_processing(recipe_id, user_id, image_name):
+    """
+    Record the rendered variants of a recipe image.
+
+    Bumps the owner's data version, so cached responses show the variants.
+    Variants of an image replaced while they were rendered are deleted.
+    """
+    # Pool processes import this module without setting up Django
+    from core.models import Recipe
+    from recipe.caching import bump_data_version
+
+    variants = {variant: variant_name(image_name, variant) for variant, _ in VARIANTS}
+    if Recipe.objects.filter(pk=recipe_id, image=image_name).update(image_variants=variants):
+        bump_data_version(user_id)
+    else:
+        delete_image(image_name)
+
+
+def _finish_rendered(recipe_id, user_id, image_name, future):
+    """Finish processing an image rendered by the pool, logging failures."""
+    exc = future.exception()
+    if exc is not None:
+        logger.error('Recipe image processing failed', exc_info=exc)
+        return
+
+    # Runs in the pool's thread, outside of any request
+    close_old_connections()
+    try:
+        finish_processing(recipe_id, user_id, image_name)
+    finally:
+        close_old_connections()
+
+
+def process_image(recipe_id, user_id, image_name):
+    """Render the variants of a recipe image, in the pool when configured."""
+    targets = [
+        (default_storage.path(variant_name(image_name, variant)), size)
+        for variant, size in VARIANTS
+    ]
+    source_path = default_storage.path(image_name)
+    if settings.IMAGE_PROCESSING_WORKERS <= 0:
+        render_variants(source_path, targets)
+        finish_processing(recipe_id, user_id, image_name)
+        return
+
+    future = get_executor().submit(render_variants, source_path, targets)
+    future.add_done_callback(
+        functools.partial(_finish_rendered, recipe_id, user_id, image_name),
+    )
+
+
+def schedule_image_processing(recipe, replaced_image=None):
+    """
+    Process the recipe image once the upload transaction has committed,
+    deleting the image it replaced and its variants.
+    """
+    image_name = recipe.image.name
+
+    def on_commit():
+        if replaced_image and replaced_image != image_name:
+            delete_image(replaced_image)
+        process_image(recipe.pk, recipe.user_id, image_name)
+
+    transaction.on_commit(on_commit)
@@ -0,0 +1,90 @@
+"""
+Django command to compare recipe tag filter query plans on a seeded dataset
+"""
+import json
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.benchmarking import rolled_back, time_first_page
+from core.models import Recipe, Tag
+from recipe.filters import MATCH_ALL, MATCH_ANY, filter_by_related
+
+
+class Command(BaseCommand):
+    """
+    Seed a throwaway dataset and time the legacy JOIN + DISTINCT tag filter
+    against the EXISTS and grouped semi-join filters. Nothing is persisted.
+    """
+    help = 'Benchmark recipe tag filters on a seeded dataset (rolled back).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--tags-per-recipe', type=int, default=5)
+        parser.add_argument('--filter-tags', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--explain', action='store_true', help='Include EXPLAIN ANALYZE plans')
+
+    def _seed(self, options):
+        """Create a user with recipes randomly linked to tags."""
+        rng = random.Random(options['seed'])
+        user = get_user_model()(email='benchmark-filters@example.com', name='Benchmark')
+        user.set_unusable_password()
+        user.save()
+        tags = Tag.objects.bulk_create(
+            [Tag(user=user, name=f'Tag {i}') for i in range(options['tags'])]
+        )
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=f'Recipe {i}',
+                time_minutes=rng.randint(5, 120),
+                price=Decimal(rng.randint(100, 9999)) / 100,
+                description=' '.join(rng.choices(['lorem', 'ipsum', 'dolor', 'sit'], k=100)),
+            )
+            for i in range(options['recipes'])
+        ], batch_size=5000)
+        through = Recipe.tags.through
+        through.objects.bulk_create([
+            through(recipe=recipe, tag=tag)
+            for recipe in recipes
+            for tag in rng.sample(tags, options['tags_per_recipe'])
+        ], batch_size=5000)
+        tables = ', '.join(model._meta.db_table for model in (Recipe, Tag, through))
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {tables}')
+
+        return user, [tag.id for tag in rng.sample(tags, options['filter_tags'])]
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        results = {}
+        with rolled_back():
+            user, tag_ids = self._seed(options)
+            recipes = Recipe.objects.filter(user=user)
+            variants = {
+                'legacy_join_distinct': recipes.filter(tags__id__in=tag_ids).distinct(),
+                'exists_any': filter_by_related(recipes, 'tags', tag_ids, MATCH_ANY),
+                'grouped_all': filter_by_related(recipes, 'tags', tag_ids, MATCH_ALL),
+            }
+            for name, queryset in variants.items():
+                queryset = queryset.order_by('-id')
+                results[name] = time_first_page(
+                    queryset, options['page_size'], options['repeat'],
+                )
+                if options['explain']:
+                    results[name]['plan'] = queryset[:options['page_size']].explain(
+                        analyze=True,
+                    )
+
+        self.stdout.write(json.dumps({'options': {
+            key: options[key] for key in (
+                'recipes', 'tags', 'tags_per_recipe', 'filter_tags', 'page_size', 'repeat', 'seed',
+            )
+        }, 'results': results}, indent=2))
@@ -0,0 +1,110 @@
+"""
+Django command to measure recipe full-text search latency on a seeded dataset
+"""
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.benchmarking import rolled_back, time_first_page
+from core.models import Recipe, Tag
+from recipe.filters import SEARCH_RANK, filter_recipes
+
+WORDS = [
+    'chicken', 'beef', 'tofu', 'lentil', 'tomato', 'garlic', 'onion', 'curry', 'soup', 'salad',
+    'roasted', 'spicy', 'creamy', 'baked', 'grilled', 'fresh', 'quick', 'vegan', 'lemon', 'herb',
+    'rice', 'pasta', 'noodle', 'bread', 'cheese', 'mushroom', 'pepper', 'ginger', 'honey', 'chili',
+    'potato', 'carrot', 'spinach', 'bean', 'coconut', 'basil', 'mint', 'yogurt', 'apple', 'pear',
+]
+SEARCHES = ['curry', 'spicy lentil soup', '"grilled chicken"', 'coconut -chili', 'saffron']
+
+
+class Command(BaseCommand):
+    """
+    Seed recipes with random titles and descriptions and time fetching the
+    first ranked page of search results, alone and combined with a tag
+    filter. Nothing is persisted.
+    """
+    help = 'Benchmark recipe full-text search on a seeded dataset (rolled back).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--description-words', type=int, default=30)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--explain', action='store_true', help='Include EXPLAIN ANALYZE plans')
+
+    def _seed(self, options):
+        """Create a user with recipes built from random words, every 10th tagged."""
+        user = get_user_model()(email='benchmark-search@example.com', name='Benchmark')
+        user.set_unusable_password()
+        user.save()
+        tag = Tag.objects.create(user=user, name='Benchmark')
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT setseed(0.42)')
+            cursor.execute(
+                f"""
+                INSERT INTO {Recipe._meta.db_table}
+                    (user_id, title, time_minutes, price, description, link)
+                SELECT
+                    %(user)s,
+                    concat_ws(' ', (%(words)s::text[])[1 + floor(random() * %(n)s)::int],
+                              (%(words)s::text[])[1 + floor(random() * %(n)s)::int],
+                              (%(words)s::text[])[1 + floor(random() * %(n)s)::int]),
+                    5 + floor(random() * 115)::int,
+                    round((1 + random() * 98)::numeric, 2),
+                    array_to_string(ARRAY(
+                        SELECT (%(words)s::text[])[1 + floor(random() * %(n)s)::int]
+                        FROM generate_series(1, %(description_words)s)
+                        WHERE g > 0
+                    ), ' '),
+                    ''
+                FROM generate_series(1, %(recipes)s) AS g
+                """,
+                {
+                    'user': user.id,
+                    'words': WORDS,
+                    'n': len(WORDS),
+                    'recipes': options['recipes'],
+                    'description_words': options['description_words'],
+                },
+            )
+            through = Recipe.tags.through
+            cursor.execute(
+                f"""
+                INSERT INTO {through._meta.db_table} (recipe_id, tag_id)
+                SELECT id, %s FROM {Recipe._meta.db_table}
+                WHERE user_id = %s AND id %% 10 = 0
+                """,
+                [tag.id, user.id],
+            )
+            tables = ', '.join(model._meta.db_table for model in (Recipe, Tag, through))
+            cursor.execute(f'ANALYZE {tables}')
+
+        return user, tag
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        results = {}
+        with rolled_back():
+            seed_start = time.perf_counter()
+            user, tag = self._seed(options)
+            results['seed_s'] = round(time.perf_counter() - seed_start, 1)
+            recipes = Recipe.objects.filter(user=user).only('id', 'title')
+            for search in SEARCHES:
+                for name, params in (
+                    ('search', {'search': search}),
+                    ('search_and_tag', {'search': search, 'tags': str(tag.id)}),
+                ):
+                    queryset = filter_recipes(recipes, params)
+                    queryset = queryset.order_by(f'-{SEARCH_RANK}', '-id')
+                    result = time_first_page(queryset, options['page_size'], options['repeat'])
+                    if options['explain']:
+                        result['plan'] = queryset[:options['page_size']].explain(analyze=True)
+                    results.setdefault(search, {})[name] = result
+
+        self.stdout.write(json.dumps({'options': {
+            key: options[key] for key in ('recipes', 'description_words', 'page_size', 'repeat')
+        }, 'results': results}, indent=2))
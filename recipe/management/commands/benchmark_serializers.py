@@ -0,0 +1,127 @@
+"""
+Django command to compare recipe list serialization paths on a seeded dataset
+"""
+import json
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from core.benchmarking import rolled_back, time_calls
+from core.models import Recipe, Tag, Ingredient
+from core.renderers import FastJSONRenderer
+from recipe.serializers import FastReadSerializer, RecipeSerializer
+from recipe.views import optimize_for_serializer
+
+
+class Command(BaseCommand):
+    """
+    Seed a throwaway dataset and time rendering a recipe list page with
+    RecipeSerializer against FastReadSerializer, and rendering the page data
+    with JSONRenderer against FastJSONRenderer. Nothing is persisted.
+    """
+    help = 'Benchmark recipe list serialization on a seeded dataset (rolled back).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=1000)
+        parser.add_argument('--attrs', type=int, default=50)
+        parser.add_argument('--attrs-per-recipe', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _seed(self, options):
+        """Create a user with a page of recipes randomly linked to tags and ingredients."""
+        rng = random.Random(options['seed'])
+        user = get_user_model()(email='benchmark-serializers@example.com', name='Benchmark')
+        user.set_unusable_password()
+        user.save()
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=f'Recipe {i}',
+                time_minutes=rng.randint(5, 120),
+                price=Decimal(rng.randint(100, 9999)) / 100,
+                link=f'https://example.com/recipes/{i}',
+            )
+            for i in range(options['page_size'])
+        ])
+        for model, field_name in ((Tag, 'tags'), (Ingredient, 'ingredients')):
+            objs = model.objects.bulk_create(
+                [model(user=user, name=f'{model.__name__} {i}') for i in range(options['attrs'])]
+            )
+            through = Recipe._meta.get_field(field_name).remote_field.through
+            through.objects.bulk_create([
+                through(**{'recipe': recipe, model.__name__.lower(): obj})
+                for recipe in recipes
+                for obj in rng.sample(objs, options['attrs_per_recipe'])
+            ])
+
+        return user
+
+    @staticmethod
+    def _time(render, items, repeat):
+        """Return timings of render() in milliseconds and per item in microseconds."""
+        timings, content = time_calls(render, repeat)
+        median = timings['median_ms']
+
+        return {
+            'bytes': len(content),
+            **timings,
+            'per_item_us': round(median * 1000 / items, 3) if items else None,
+        }, content
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        results = {}
+        with rolled_back():
+            user = self._seed(options)
+            queryset = Recipe.objects.filter(user=user).order_by('-id')
+            context = {'request': APIRequestFactory().get('/api/recipe/recipes/')}
+            renderer = FastJSONRenderer()
+
+            def render_serializer():
+                serializer = RecipeSerializer(
+                    optimize_for_serializer(queryset, RecipeSerializer),
+                    many=True,
+                    context=context,
+                )
+                return renderer.render(serializer.data)
+
+            def render_fast():
+                reader = FastReadSerializer(RecipeSerializer, context=context)
+                return renderer.render(
+                    reader.to_representation(reader.get_queryset(queryset)),
+                )
+
+            results['serializer'], expected = self._time(
+                render_serializer, options['page_size'], options['repeat'],
+            )
+            results['fast_read'], content = self._time(
+                render_fast, options['page_size'], options['repeat'],
+            )
+            results['identical'] = content == expected
+            results['speedup'] = round(
+                results['serializer']['median_ms'] / results['fast_read']['median_ms'], 2,
+            )
+
+            reader = FastReadSerializer(RecipeSerializer, context=context)
+            data = reader.to_representation(reader.get_queryset(queryset))
+            results['renderers'] = {
+                name: self._time(
+                    lambda: renderer_class().render(data),
+                    options['page_size'],
+                    options['repeat'],
+                )[0]
+                for name, renderer_class in (
+                    ('json', JSONRenderer), ('fast_json', FastJSONRenderer),
+                )
+            }
+
+        self.stdout.write(json.dumps({'options': {
+            key: options[key] for key in (
+                'page_size', 'attrs', 'attrs_per_recipe', 'repeat', 'seed',
+            )
+        }, 'results': results}, indent=2))
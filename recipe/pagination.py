@@ -0,0 +1,19 @@
+"""
+Pagination for the recipe APIs
+"""
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination on id, newest first
+
+    Pages are fetched with an indexed ``id`` comparison instead of OFFSET and
+    no total count is computed, so every page costs the same regardless of
+    how deep the client has paged or how many rows the user owns.
+    """
+    ordering = '-id'
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
@@ -0,0 +1,25 @@
+"""
+Parsers for the recipe APIs
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from core.parsers import loads
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parse newline delimited JSON into a list of objects
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse every non-blank line of the stream as a JSON document."""
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            lines = stream.read().decode(encoding).splitlines()
+            return [loads(line) for line in lines if line.strip()]
+        except ValueError as exc:
+            raise ParseError(f'NDJSON parse error - {exc}')
@@ -2,12 +2,55 @@
 Serializers for recipe APIs
 """
 
+from itertools import chain
+
+from django.db import IntegrityError, transaction
+from django.db.models import FileField, prefetch_related_objects
 from rest_framework import serializers
 
 from core.models import Recipe, Tag, Ingredient
+from recipe.caching import bump_data_version
+from recipe.images import get_variant_urls
+
 
+class RecipeAttrSerializer(serializers.ModelSerializer):
+    """
+    Base serializer for recipe attributes
+
+    Names are unique per user. Nested in recipes, existing names are reused
+    rather than rejected.
+    """
 
-class IngredientSerializer(serializers.ModelSerializer):
+    def name_taken_error(self, name):
+        """Return the error for a name the user already has."""
+        verbose_name = self.Meta.model._meta.verbose_name
+        return serializers.ValidationError(f'You already have a {verbose_name} named "{name}".')
+
+    def validate_name(self, value):
+        """Check the user has no other attribute with the name."""
+        request = self.context.get('request')
+        if self.parent is not None or request is None:
+            return value
+
+        others = self.Meta.model.objects.filter(user=request.user, name=value)
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+        if others.exists():
+            raise self.name_taken_error(value)
+        return value
+
+    def update(self, instance, validated_data):
+        """Update the attribute, reporting a name taken concurrently as invalid."""
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {'name': self.name_taken_error(validated_data.get('name')).detail},
+            )
+
+
+class IngredientSerializer(RecipeAttrSerializer):
     """Serializer for ingredients."""
 
     class Meta:
@@ -16,7 +59,7 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(RecipeAttrSerializer):
     """
     Serializer for tag objects
     """
@@ -26,37 +69,194 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+class IngredientCountSerializer(IngredientSerializer):
+    """Serializer for ingredients annotated with their usage."""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ['recipe_count']
+
+
+class TagCountSerializer(TagSerializer):
+    """Serializer for tags annotated with their usage."""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ['recipe_count']
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Read-only field reporting the processed variants of an image
+
+    Reads the variants recorded on the recipe; those still being processed
+    are reported as null.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = get_variant_urls(value)
+        if request is None:
+            return urls
+
+        return {
+            variant: request.build_absolute_uri(url) if url else None
+            for variant, url in urls.items()
+        }
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """
+    Serializer for creating and updating recipes in bulk
+    """
+
+    def _resolve_attrs(self, model, per_item):
+        """Resolve the attributes of every item at once, keyed by name."""
+        items = chain.from_iterable(attrs for attrs in per_item if attrs)
+        return {obj.name: obj for obj in self.child._get_or_create_attrs(model, items)}
+
+    def _add_attrs(self, recipes, field_name, model, per_item):
+        """Link the attributes of all new recipes in one insert."""
+        lookup = self._resolve_attrs(model, per_item)
+        links = {
+            (recipe.id, lookup[item['name']].id): (recipe, lookup[item['name']])
+            for recipe, items in zip(recipes, per_item)
+            for item in items
+        }
+        RecipeSerializer._add_attrs(field_name, list(links.values()))
+
+    def _sync_attrs(self, recipes, field_name, model, per_item):
+        """Replace the attributes of the recipes that sent them."""
+        lookup = self._resolve_attrs(model, per_item)
+        wanted = {
+            recipe: [lookup[item['name']] for item in items]
+            for recipe, items in zip(recipes, per_item)
+            if items is not None
+        }
+        if wanted:
+            RecipeSerializer._sync_attrs(field_name, wanted)
+
+    def create(self, validated_data):
+        """Create recipes with a single insert per table."""
+        tags = [attrs.pop('tags', []) for attrs in validated_data]
+        ingredients = [attrs.pop('ingredients', []) for attrs in validated_data]
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create([Recipe(**attrs) for attrs in validated_data])
+            self._add_attrs(recipes, 'tags', Tag, tags)
+            self._add_attrs(recipes, 'ingredients', Ingredient, ingredients)
+
+        bump_data_version(self.child.context['request'].user.pk)
+        prefetch_related_objects(recipes, 'tags', 'ingredients')
+        return recipes
+
+    def update(self, instances, validated_data):
+        """Update recipes, applying only the link changes each one needs."""
+        tags = [attrs.pop('tags', None) for attrs in validated_data]
+        ingredients = [attrs.pop('ingredients', None) for attrs in validated_data]
+        fields = set()
+        for recipe, attrs in zip(instances, validated_data):
+            for key, value in attrs.items():
+                setattr(recipe, key, value)
+            fields.update(attrs)
+
+        with transaction.atomic():
+            if fields:
+                Recipe.objects.bulk_update(instances, fields)
+            self._sync_attrs(instances, 'tags', Tag, tags)
+            self._sync_attrs(instances, 'ingredients', Ingredient, ingredients)
+
+        bump_data_version(self.child.context['request'].user.pk)
+        prefetch_related_objects(instances, 'tags', 'ingredients')
+        return instances
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """
     Serializer for recipe objects
     """
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ['id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients', 'image']
+        fields = [
+            'id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients', 'image',
+            'image_variants',
+        ]
         read_only_fields = ['id']
+        list_serializer_class = RecipeListSerializer
+
+    def _get_or_create_attrs(self, model, items):
+        """
+        Resolve recipe attributes by name, creating the missing ones.
+
+        All names are resolved for the user with a single
+        INSERT ... ON CONFLICT statement.
+        """
+        auth_user = self.context['request'].user
+        names = list(dict.fromkeys(item['name'] for item in items))
+        objs = model.objects.get_or_create_by_names(auth_user, names)
+
+        return [objs[name] for name in names]
+
+    @staticmethod
+    def _get_through(field_name):
+        """Return the through model and its recipe/target field names."""
+        field = Recipe._meta.get_field(field_name)
+        return field.remote_field.through, field.m2m_field_name(), field.m2m_reverse_field_name()
+
+    @staticmethod
+    def _add_attrs(field_name, links):
+        """Insert (recipe, obj) links with a single through-table insert."""
+        if not links:
+            return
+        through, source, target = RecipeSerializer._get_through(field_name)
+        through.objects.bulk_create(
+            [through(**{source: recipe, target: obj}) for recipe, obj in links],
+            ignore_conflicts=True,
+        )
+
+    @staticmethod
+    def _sync_attrs(field_name, wanted):
+        """
+        Make each recipe's links match wanted, touching only the rows that changed.
+
+        wanted maps every recipe to the full list of objects it should link to.
+        """
+        through, source, target = RecipeSerializer._get_through(field_name)
+        current = {
+            (recipe_id, obj_id): link_id
+            for link_id, recipe_id, obj_id in through.objects.filter(
+                **{f'{source}__in': list(wanted)}
+            ).values_list('id', f'{source}_id', f'{target}_id')
+        }
+        wanted_links = {
+            (recipe.id, obj.id): (recipe, obj)
+            for recipe, objs in wanted.items()
+            for obj in objs
+        }
+        removed_ids = [link_id for key, link_id in current.items() if key not in wanted_links]
+        if removed_ids:
+            through.objects.filter(id__in=removed_ids).delete()
+        RecipeSerializer._add_attrs(
+            field_name,
+            [link for key, link in wanted_links.items() if key not in current],
+        )
 
     def _get_or_create_tags(self, tags, recipe):
         """Handle getting or creating tags as needed."""
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
+        objs = self._get_or_create_attrs(Tag, tags)
+        self._add_attrs('tags', [(recipe, obj) for obj in objs])
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         """Handle getting or creating ingredients as needed."""
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        objs = self._get_or_create_attrs(Ingredient, ingredients)
+        self._add_attrs('ingredients', [(recipe, obj) for obj in objs])
 
     def create(self, validated_data):
         """Create a recipe."""
@@ -65,6 +265,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         self._get_or_create_tags(tags, recipe)
         self._get_or_create_ingredients(ingredients, recipe)
+        bump_data_version(recipe.user_id)
 
         return recipe
 
@@ -73,11 +274,10 @@ class RecipeSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags=tags, recipe=instance)
+            self._sync_attrs('tags', {instance: self._get_or_create_attrs(Tag, tags)})
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients=ingredients, recipe=instance)
+            objs = self._get_or_create_attrs(Ingredient, ingredients)
+            self._sync_attrs('ingredients', {instance: objs})
 
         for key, value in validated_data.items():
             setattr(instance, key, value)
@@ -96,9 +296,111 @@ class RecipeDetailSerializer(RecipeSerializer):
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes."""
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'image_variants']
         read_only_fields = ['id']
         extra_kwargs = {'image': {'required': 'True'}}
+
+
+class FastReadSerializer:
+    """
+    Read-only equivalent of serializer_class(many=True) over values() rows
+
+    Fields are compiled once per instance: plain integer and char fields are
+    copied from the row as is, other fields still go through their own
+    to_representation, and nested many-to-many serializers are filled with
+    one query per relation for the whole page. The output is identical to
+    serializer_class, without building model instances and bound fields for
+    every item.
+    """
+    passthrough_fields = (serializers.IntegerField, serializers.CharField)
+
+    def __init__(self, serializer_class, context=None):
+        model = serializer_class.Meta.model
+        self.pk = model._meta.pk.attname
+        self.fields = []
+        self.relations = []
+        for name, field in serializer_class(context=context or {}).fields.items():
+            if isinstance(field, serializers.ListSerializer):
+                model_field = model._meta.get_field(field.source)
+                self.relations.append((name, model_field, self._compile(field.child)))
+                self.fields.append((name, None, None))
+                continue
+            model_field = model._meta.get_field(field.source)
+            if isinstance(model_field, FileField):
+                convert = self._file_converter(field, model_field)
+            elif type(field) in self.passthrough_fields:
+                convert = None
+            else:
+                convert = field.to_representation
+            self.fields.append((name, model_field.attname, convert))
+
+    def _compile(self, serializer):
+        """Return the (name, source, converter) triples of a nested serializer."""
+        return [
+            (name, field.source, None if type(field) in self.passthrough_fields
+             else field.to_representation)
+            for name, field in serializer.fields.items()
+        ]
+
+    @staticmethod
+    def _file_converter(field, model_field):
+        """Render a stored file name the way field renders the model's FieldFile."""
+        def convert(name):
+            return field.to_representation(model_field.attr_class(None, model_field, name))
+
+        return convert
+
+    def get_queryset(self, queryset):
+        """
+        Return queryset as the values() rows to_representation expects.
+
+        Annotations are kept so paginators can read the values rows are
+        ordered by.
+        """
+        sources = dict.fromkeys(source for _, source, _ in self.fields if source)
+        if self.relations:
+            sources.setdefault(self.pk)
+
+        return queryset.prefetch_related(None).values(*sources, *queryset.query.annotations)
+
+    def _fetch_relation(self, model_field, nested, ids):
+        """Return the rendered related items of every recipe id, in one query."""
+        through = model_field.remote_field.through
+        source = f'{model_field.m2m_field_name()}_id'
+        target = model_field.m2m_reverse_field_name()
+        rows = through.objects.filter(**{f'{source}__in': ids}).order_by(f'{target}__pk')
+        items = {}
+        for row in rows.values_list(source, *(f'{target}__{src}' for _, src, _ in nested)):
+            items.setdefault(row[0], []).append({
+                name: value if value is None or convert is None else convert(value)
+                for (name, _, convert), value in zip(nested, row[1:])
+            })
+
+        return items
+
+    def to_representation(self, rows):
+        """Render the rows like serializer_class(instances, many=True).data."""
+        rows = list(rows)
+        ids = [row[self.pk] for row in rows]
+        related = {
+            name: self._fetch_relation(model_field, nested, ids)
+            for name, model_field, nested in self.relations
+        }
+        data = []
+        for row_id, row in zip(ids, rows):
+            item = {}
+            for name, source, convert in self.fields:
+                if source is None:
+                    item[name] = related[name].get(row_id, [])
+                    continue
+                value = row[source]
+                if convert is not None and value is not None:
+                    value = convert(value)
+                item[name] = value
+            data.append(item)
+
+        return data
@@ -0,0 +1,152 @@
+"""
+Tests for the async recipe read APIs
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+def create_recipe(user, **params):
+    """
+    Helper function to create a recipe
+    """
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.25'),
+        'description': 'Sample description',
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class AsyncRecipeApiTests(TestCase):
+    """
+    Test the async endpoints match their sync counterparts
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123pass',
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(user=self.user, name='Tofu')
+        self.recipes = []
+        for i in range(3):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            if i % 2 == 0:
+                recipe.tags.add(self.tag)
+                recipe.ingredients.add(self.ingredient)
+            self.recipes.append(recipe)
+
+    def assertSameAsSync(self, name, params=None, args=None):
+        """Assert the async endpoint returns what the sync one does."""
+        sync_res = self.client.get(reverse(f'recipe:{name}', args=args), params)
+        async_res = self.client.get(reverse(f'recipe-async:{name}', args=args), params)
+
+        self.assertEqual(async_res.status_code, sync_res.status_code)
+        sync_data, async_data = sync_res.json(), async_res.json()
+        for link in ('next', 'previous'):
+            if isinstance(sync_data, dict) and sync_data.get(link):
+                sync_data[link] = sync_data[link].replace('/api/recipe/', '/api/async/recipe/')
+        self.assertEqual(async_data, sync_data)
+
+        return async_data
+
+    def test_recipe_list(self):
+        """Test listing recipes asynchronously."""
+        data = self.assertSameAsSync('recipe-list')
+
+        self.assertEqual(len(data['results']), 3)
+
+    def test_recipe_list_filtered(self):
+        """Test filtering recipes asynchronously."""
+        params = {'tags': self.tag.id, 'ingredients': self.ingredient.id, 'match': 'all'}
+        data = self.assertSameAsSync('recipe-list', params)
+
+        self.assertEqual(len(data['results']), 2)
+
+    def test_recipe_list_cursor_pages(self):
+        """Test async cursor pages match the sync ones in both directions."""
+        first = self.assertSameAsSync('recipe-list', {'page_size': 1})
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+
+        self.assertEqual(second['results'][0]['id'], self.recipes[1].id)
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['previous'])
+
+    def test_recipe_detail(self):
+        """Test retrieving a recipe asynchronously."""
+        data = self.assertSameAsSync('recipe-detail', args=[self.recipes[0].id])
+
+        self.assertEqual(data['description'], 'Sample description')
+
+    def test_recipe_detail_other_user_not_found(self):
+        """Test recipes of other users are not found."""
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='test123pass',
+        )
+        recipe = create_recipe(user=other_user)
+        url = reverse('recipe-async:recipe-detail', args=[recipe.id])
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tag_and_ingredient_lists(self):
+        """Test listing tags and ingredients asynchronously."""
+        self.assertSameAsSync('tag-list')
+        self.assertSameAsSync('tag-list', {'assigned_only': 1})
+        self.assertSameAsSync('tag-list', {'with_counts': 1})
+        self.assertSameAsSync('ingredient-list')
+        self.assertSameAsSync('ingredient-list', {'with_counts': 1, 'assigned_only': 1})
+        self.assertSameAsSync('tag-list', {'q': 'veg', 'limit': 5})
+
+    def test_search_rejected(self):
+        """Test search is left to the sync endpoint."""
+        res = self.client.get(reverse('recipe-async:recipe-list'), {'search': 'recipe'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordering_by_usage_rejected(self):
+        """Test ordering by usage is left to the sync endpoints."""
+        res = self.client.get(reverse('recipe-async:tag-list'), {'ordering': '-recipe_count'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_match_rejected(self):
+        """Test invalid filters are reported like the sync endpoint."""
+        self.assertSameAsSync('recipe-list', {'tags': self.tag.id, 'match': 'some'})
+
+    def test_invalid_ids_rejected(self):
+        """Test invalid tag and ingredient ids are reported like the sync endpoint."""
+        self.assertIn('tags', self.assertSameAsSync('recipe-list', {'tags': 'abc'}))
+        self.assertIn('ingredients', self.assertSameAsSync('recipe-list', {'ingredients': '1,,2'}))
+
+    def test_auth_required(self):
+        """Test the async endpoints require a valid token."""
+        res = APIClient().get(reverse('recipe-async:recipe-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_write_not_allowed(self):
+        """Test the async endpoints are read only."""
+        res = self.client.post(reverse('recipe-async:recipe-list'), {})
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -0,0 +1,84 @@
+"""
+Contract tests for the fast recipe read path
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.serializers import FastReadSerializer, RecipeSerializer
+from recipe.views import optimize_for_serializer
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class FastReadSerializerTests(TestCase):
+    """Test FastReadSerializer renders exactly what RecipeSerializer does."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123pass',
+        )
+        tags = [Tag.objects.create(user=self.user, name=f'Tag {i}') for i in range(3)]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ingredient {i}') for i in range(3)
+        ]
+        first = Recipe.objects.create(
+            user=self.user,
+            title='Thai curry',
+            time_minutes=30,
+            price=Decimal('5.5'),
+            link='https://example.com/curry',
+            description='Spicy',
+            image='uploads/recipe/curry.jpg',
+        )
+        first.tags.add(tags[2], tags[0])
+        first.ingredients.add(ingredients[1], ingredients[2], ingredients[0])
+        second = Recipe.objects.create(
+            user=self.user,
+            title='Plain rice',
+            time_minutes=15,
+            price=Decimal('0.99'),
+        )
+        second.tags.add(tags[1])
+        Recipe.objects.create(user=self.user, title='Empty', time_minutes=1, price=Decimal('10'))
+
+    def test_output_matches_recipe_serializer(self):
+        """Test the rendered JSON is byte-identical to RecipeSerializer's."""
+        request = APIRequestFactory().get(RECIPES_URL)
+        context = {'request': request}
+        queryset = Recipe.objects.filter(user=self.user).order_by('-id')
+        expected = RecipeSerializer(
+            optimize_for_serializer(queryset, RecipeSerializer),
+            many=True,
+            context=context,
+        ).data
+        reader = FastReadSerializer(RecipeSerializer, context=context)
+
+        with self.assertNumQueries(3):
+            data = reader.to_representation(reader.get_queryset(queryset))
+
+        self.assertEqual(JSONRenderer().render(data), JSONRenderer().render(expected))
+
+    def test_list_response_matches_serializer_path(self):
+        """Test the list endpoint responds the same with the fast path on or off."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        params = {'page_size': 2}
+
+        with override_settings(API_FAST_READ=False):
+            expected = client.get(RECIPES_URL, params)
+            next_expected = client.get(expected.data['next'])
+        cache.clear()
+        res = client.get(RECIPES_URL, params)
+        next_res = client.get(res.data['next'])
+
+        self.assertEqual(res.content, expected.content)
+        self.assertEqual(next_res.content, next_expected.content)
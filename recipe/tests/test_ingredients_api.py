@@ -56,7 +56,7 @@ class PrivateIngredientsApiTests(TestCase):
         ingredients = Ingredient.objects.all().order_by('-id')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test list of ingredients is limited to authenticated user."""
@@ -67,7 +67,7 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        response_data = res.data
+        response_data = res.data['results']
         self.assertEqual(len(response_data), 1)
         for key, value in response_data[0].items():
             self.assertEqual(value, getattr(ingredient, key))
@@ -84,6 +84,28 @@ class PrivateIngredientsApiTests(TestCase):
         ingredient.refresh_from_db()
         self.assertEqual(ingredient.name, payload['name'])
 
+    def test_rename_ingredient_to_existing_name(self):
+        """Test renaming a ingredient to the name of another of the user's is rejected."""
+        ingredient = Ingredient.objects.create(user=self.user, name='Cilantro')
+        Ingredient.objects.create(user=self.user, name='Coriander')
+
+        res = self.client.patch(detail_url(ingredient.id), {'name': 'Coriander'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.name, 'Cilantro')
+
+    def test_rename_ingredient_to_other_users_name(self):
+        """Test names only need to be unique per user, and may be kept."""
+        ingredient = Ingredient.objects.create(user=self.user, name='Cilantro')
+        Ingredient.objects.create(user=create_user(email='other@example.com'), name='Coriander')
+
+        res = self.client.put(detail_url(ingredient.id), {'name': 'Coriander'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.put(detail_url(ingredient.id), {'name': 'Coriander'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
     def test_delete_ingredient(self):
         """Test deleting an ingredient."""
         ingredient = Ingredient.objects.create(user=self.user, name='Lettuce')
@@ -111,8 +133,8 @@ class PrivateIngredientsApiTests(TestCase):
 
         s1 = IngredientSerializer(in1)
         s2 = IngredientSerializer(in2)
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_ingredients_unique(self):
         """Test filtered ingredients returns a unique list."""
@@ -135,4 +157,33 @@ class PrivateIngredientsApiTests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_ingredients_with_counts(self):
+        """Test listing ingredients with the number of recipes using them."""
+        ing = Ingredient.objects.create(user=self.user, name='Eggs')
+        unused = Ingredient.objects.create(user=self.user, name='Lentils')
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                title=f'Omelette {i}',
+                time_minutes=10,
+                price=Decimal('3.00'),
+                user=self.user,
+            )
+            recipe.ingredients.add(ing)
+
+        res = self.client.get(INGREDIENTS_URL, {'ordering': '-recipe_count'})
+
+        self.assertEqual(res.data['results'], [
+            {'id': ing.id, 'name': 'Eggs', 'recipe_count': 3},
+            {'id': unused.id, 'name': 'Lentils', 'recipe_count': 0},
+        ])
+
+    def test_autocomplete(self):
+        """Test autocompleting ingredients."""
+        ing = Ingredient.objects.create(user=self.user, name='Chickpeas')
+        Ingredient.objects.create(user=self.user, name='Lentils')
+
+        res = self.client.get(INGREDIENTS_URL, {'q': 'chick'})
+
+        self.assertEqual(res.data['results'], [{'id': ing.id, 'name': 'Chickpeas'}])
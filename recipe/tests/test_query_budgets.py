@@ -0,0 +1,110 @@
+"""
+Query count budgets for the recipe APIs
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+# Maximum number of queries each endpoint may run, whatever the page size.
+QUERY_BUDGETS = {
+    'recipe-list': 3,
+    'recipe-detail': 3,
+    'tag-list': 1,
+    'ingredient-list': 1,
+}
+
+
+def create_recipes(user, count):
+    """
+    Helper function to create recipes with tags and ingredients
+    """
+    recipes = []
+    for i in range(count):
+        recipe = Recipe.objects.create(
+            user=user,
+            title=f'Recipe {i}',
+            time_minutes=10,
+            price=Decimal('5.25'),
+            description='Sample description',
+        )
+        recipe.tags.add(
+            Tag.objects.create(user=user, name=f'Tag {recipe.id}'),
+            Tag.objects.create(user=user, name=f'Other tag {recipe.id}'),
+        )
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=user, name=f'Ingredient {recipe.id}'),
+        )
+        recipes.append(recipe)
+
+    return recipes
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Test endpoints stay within their query budget as data grows
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123pass',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _count_queries(self, url, params=None):
+        """Return the number of queries a GET on url runs."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return len(ctx)
+
+    def assertWithinBudget(self, name, url, params=None):
+        """Assert url stays within budget for both small and large datasets."""
+        small = self._count_queries(url, params)
+        create_recipes(self.user, 10)
+        large = self._count_queries(url, params)
+
+        self.assertEqual(small, large, f'{name} query count grows with the data')
+        self.assertLessEqual(large, QUERY_BUDGETS[name], f'{name} exceeds its query budget')
+
+    def test_recipe_list_budget(self):
+        """Test listing recipes stays within budget."""
+        create_recipes(self.user, 1)
+        self.assertWithinBudget('recipe-list', reverse('recipe:recipe-list'))
+
+    def test_recipe_list_filtered_budget(self):
+        """Test filtering recipes stays within budget."""
+        recipe = create_recipes(self.user, 1)[0]
+        tag_ids = ','.join(str(tag.id) for tag in recipe.tags.all())
+        self.assertWithinBudget('recipe-list', reverse('recipe:recipe-list'), {'tags': tag_ids})
+
+    def test_recipe_detail_budget(self):
+        """Test retrieving a recipe stays within budget."""
+        recipe = create_recipes(self.user, 1)[0]
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        with self.assertNumQueries(QUERY_BUDGETS['recipe-detail']):
+            res = self.client.get(url)
+
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertEqual(res.data['description'], 'Sample description')
+
+    def test_tag_list_budget(self):
+        """Test listing tags stays within budget."""
+        create_recipes(self.user, 1)
+        self.assertWithinBudget('tag-list', reverse('recipe:tag-list'))
+
+    def test_ingredient_list_budget(self):
+        """Test listing assigned ingredients stays within budget."""
+        create_recipes(self.user, 1)
+        url = reverse('recipe:ingredient-list')
+        self.assertWithinBudget('ingredient-list', url, {'assigned_only': 1})
@@ -1,21 +1,40 @@
 """
 Test for the recipe APIs
 """
+import json
 import os
+import subprocess
 import tempfile
 from decimal import Decimal
+from concurrent.futures import Future
+from unittest.mock import patch
 
 from PIL import Image
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.pagination import Cursor
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
+from recipe.caching import get_data_version
+from recipe.images import (
+    VARIANTS,
+    finish_processing,
+    get_python_executable,
+    variant_name,
+)
+from recipe.pagination import IdCursorPagination
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPE_URL = reverse('recipe:recipe-list')
+BULK_RECIPE_URL = reverse('recipe:recipe-bulk')
 
 
 def detail_url(recipe_id):
@@ -91,7 +110,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['results'], serializer.data)
 
     def test_recipes_list_limited_to_user(self):
         """
@@ -106,7 +125,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['results'], serializer.data)
 
     def test_get_recipe_detail(self):
         """
@@ -405,6 +424,110 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.ingredients.count(), 0)
 
+    def test_create_recipe_nested_attrs_query_count(self):
+        """Test creating a recipe costs a fixed number of queries for any payload size."""
+        Tag.objects.create(user=self.user, name='Tag 0')
+        Ingredient.objects.create(user=self.user, name='Ingredient 0')
+        payload = {
+            'title': 'Paella',
+            'time_minutes': 45,
+            'price': Decimal('12.50'),
+            'description': 'Spanish rice dish',
+            'tags': [{'name': f'Tag {i}'} for i in range(30)],
+            'ingredients': [{'name': f'Ingredient {i}'} for i in range(30)],
+        }
+
+        # Recipe insert, then resolve and link per relation,
+        # plus one read per relation to render the response.
+        with self.assertNumQueries(7):
+            res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(recipe.ingredients.count(), 30)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 30)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 30)
+
+    def test_update_recipe_nested_attrs_query_count(self):
+        """Test updating recipe tags costs a fixed number of queries for any payload size."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Old'))
+        for i in range(10):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        payload = {'tags': [{'name': f'Tag {i}'} for i in range(30)]}
+        url = detail_url(recipe.id)
+        with CaptureQueriesContext(connection) as large_update:
+            res = self.client.patch(url, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        payload = {'tags': [{'name': 'Tag 0'}, {'name': 'Tag 99'}]}
+        with CaptureQueriesContext(connection) as small_update:
+            res = self.client.patch(url, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(len(large_update), len(small_update))
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Tag 0', 'Tag 99'],
+        )
+
+    def test_update_recipe_unchanged_attrs_no_link_writes(self):
+        """Test re-sending the current tags and ingredients writes no link rows."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.ingredients.add(Ingredient.objects.create(user=self.user, name='Tofu'))
+
+        payload = {'tags': [{'name': 'Vegan'}], 'ingredients': [{'name': 'Tofu'}]}
+        url = detail_url(recipe.id)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        link_writes = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith(('INSERT', 'DELETE'))
+        ]
+        self.assertEqual(link_writes, [])
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertEqual(recipe.ingredients.count(), 1)
+
+    def test_update_recipe_attrs_only_changes_diff(self):
+        """Test updating tags keeps unchanged links and swaps the rest."""
+        recipe = create_recipe(user=self.user)
+        tag_kept = Tag.objects.create(user=self.user, name='Kept')
+        tag_removed = Tag.objects.create(user=self.user, name='Removed')
+        recipe.tags.add(tag_kept, tag_removed)
+        kept_link = Recipe.tags.through.objects.get(recipe=recipe, tag=tag_kept)
+
+        payload = {'tags': [{'name': 'Kept'}, {'name': 'Added'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(Recipe.tags.through.objects.filter(id=kept_link.id).exists())
+        self.assertNotIn(tag_removed, recipe.tags.all())
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Added', 'Kept'],
+        )
+
+    def test_create_recipe_duplicate_tag_names(self):
+        """Test repeated tag names in a payload create and link a single tag."""
+        payload = {
+            'title': 'Pancakes',
+            'time_minutes': 15,
+            'price': Decimal('3.00'),
+            'description': 'Fluffy pancakes',
+            'tags': [{'name': 'Breakfast'}, {'name': 'Breakfast'}],
+        }
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user, name='Breakfast').count(), 1)
+
     def test_filter_by_tags(self):
         """Test filtering recipes by tags."""
         r1 = create_recipe(user=self.user, title='Thai Vegetable Curry')
@@ -421,9 +544,9 @@ class PrivateRecipeApiTests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
     def test_filter_by_ingredients(self):
         """Test filtering recipes by ingredients."""
@@ -441,9 +564,318 @@ class PrivateRecipeApiTests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def test_filter_by_tags_no_duplicates(self):
+        """Test a recipe matching several filtered tags is returned once."""
+        recipe = create_recipe(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Quick')
+        recipe.tags.add(tag1, tag2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual([r['id'] for r in res.data['results']], [recipe.id])
+        self.assertNotIn('DISTINCT', ctx.captured_queries[0]['sql'])
+
+    def test_filter_by_tags_match_all(self):
+        """Test match=all only returns recipes having every filtered tag."""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Quick')
+        r1 = create_recipe(user=self.user, title='Both')
+        r1.tags.add(tag1, tag2)
+        r2 = create_recipe(user=self.user, title='Vegan only')
+        r2.tags.add(tag1)
+
+        params = {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data['results']], [r1.id])
+
+    def test_filter_by_ingredients_match_all_with_tags(self):
+        """Test match=all applies to tag and ingredient filters together."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        in1 = Ingredient.objects.create(user=self.user, name='Tofu')
+        in2 = Ingredient.objects.create(user=self.user, name='Rice')
+        r1 = create_recipe(user=self.user, title='Tofu rice')
+        r1.tags.add(tag)
+        r1.ingredients.add(in1, in2)
+        r2 = create_recipe(user=self.user, title='Tofu')
+        r2.tags.add(tag)
+        r2.ingredients.add(in1)
+
+        params = {'tags': f'{tag.id}', 'ingredients': f'{in1.id},{in2.id}', 'match': 'all'}
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual([r['id'] for r in res.data['results']], [r1.id])
+
+    def test_filter_invalid_ids(self):
+        """Test tag and ingredient ids which are not integers are rejected."""
+        for params in (
+            {'tags': 'abc'},
+            {'ingredients': '1,,2'},
+            {'tags': '1', 'ingredients': '2.5'},
+            {'tags': str(2 ** 63)},
+            {'ingredients': '-1'},
+        ):
+            with self.subTest(params=params):
+                res = self.client.get(RECIPE_URL, params)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(list(res.data), [next(reversed(params))])
+
+    def test_filter_invalid_match(self):
+        """Test an unknown match mode is rejected."""
+        res = self.client.get(RECIPE_URL, {'tags': '1', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_paginated_by_cursor(self):
+        """Test walking the recipe list page by page with cursors."""
+        recipes = [create_recipe(user=self.user, title=f'Recipe {i}') for i in range(5)]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        ids = [r['id'] for r in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [r['id'] for r in res.data['results']]
+
+        self.assertEqual(ids, [r.id for r in reversed(recipes)])
+        self.assertNotIn('count', res.data)
+
+    def test_list_page_size_capped(self):
+        """Test the requested page size cannot exceed the configured maximum."""
+        for i in range(3):
+            create_recipe(user=self.user, title=f'Recipe {i}')
+
+        with patch.object(IdCursorPagination, 'max_page_size', 2):
+            res = self.client.get(RECIPE_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_list_paginated_with_filters(self):
+        """Test cursor pages only contain recipes matching the filters."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        tagged = []
+        for i in range(4):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            if i % 2 == 0:
+                recipe.tags.add(tag)
+                tagged.append(recipe)
+
+        res = self.client.get(RECIPE_URL, {'tags': tag.id, 'page_size': 1})
+        ids = [r['id'] for r in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [r['id'] for r in res.data['results']]
+
+        self.assertEqual(ids, [r.id for r in reversed(tagged)])
+        self.assertIsNone(res.data['next'])
+
+    def test_search_ranks_title_matches_first(self):
+        """Test searching title and description, best matches first."""
+        in_description = create_recipe(
+            user=self.user, title='Weeknight dinner', description='A creamy curry.',
+        )
+        in_title = create_recipe(user=self.user, title='Thai curries')
+        create_recipe(user=self.user, title='Porridge')
+        create_recipe(user=create_user(email='other@example.com'), title='Curry')
+
+        for fast_read in (True, False):
+            cache.clear()
+            with self.subTest(fast_read=fast_read), override_settings(API_FAST_READ=fast_read):
+                res = self.client.get(RECIPE_URL, {'search': 'curry'})
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    [r['id'] for r in res.data['results']],
+                    [in_title.id, in_description.id],
+                )
+
+    def test_search_with_filters_paginated(self):
+        """Test search composes with tag filters and cursor pages."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        expected = []
+        for i in range(5):
+            recipe = create_recipe(user=self.user, title=f'Lentil soup {i}')
+            if i != 2:
+                recipe.tags.add(tag)
+                expected.append(recipe)
+        create_recipe(user=self.user, title='Tomato soup').tags.add(tag)
+
+        res = self.client.get(RECIPE_URL, {'search': 'lentil', 'tags': tag.id, 'page_size': 3})
+        ids = [r['id'] for r in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [r['id'] for r in res.data['results']]
+
+        self.assertEqual(ids, [r.id for r in reversed(expected)])
+        self.assertIsNone(res.data['next'])
+
+    def test_search_tied_ranks_paged_both_ways(self):
+        """Test recipes of equal rank are paged by key, forwards and backwards."""
+        best = create_recipe(user=self.user, title='Lentil soup', description='Lentil stew')
+        tied = [create_recipe(user=self.user, title='Lentil soup') for _ in range(7)]
+        expected = [best.id] + [r.id for r in reversed(tied)]
+
+        for fast_read in (True, False):
+            cache.clear()
+            with self.subTest(fast_read=fast_read), override_settings(API_FAST_READ=fast_read):
+                res = self.client.get(RECIPE_URL, {'search': 'lentil', 'page_size': 3})
+                pages = [[r['id'] for r in res.data['results']]]
+                while res.data['next']:
+                    with CaptureQueriesContext(connection) as queries:
+                        res = self.client.get(res.data['next'])
+                    pages.append([r['id'] for r in res.data['results']])
+                    self.assertNotIn('OFFSET', queries[-1]['sql'])
+
+                self.assertEqual(sum(pages, []), expected)
+                previous_pages = [pages[-1]]
+                while res.data['previous']:
+                    res = self.client.get(res.data['previous'])
+                    previous_pages.insert(0, [r['id'] for r in res.data['results']])
+
+                self.assertEqual(sum(previous_pages, []), expected)
+
+    def test_search_invalid_cursor(self):
+        """Test a tampered search cursor is rejected."""
+        create_recipe(user=self.user, title='Lentil soup')
+        paginator = IdCursorPagination()
+        paginator.base_url = f'http://testserver{RECIPE_URL}?search=lentil'
+
+        res = self.client.get(paginator.encode_cursor(Cursor(0, False, '(lentil,1)')))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+def bulk_payload(count, **params):
+    """
+    Helper function to build a list of recipe payloads
+    """
+    payload = []
+    for i in range(count):
+        item = {
+            'title': f'Recipe {i}',
+            'time_minutes': 10 + i,
+            'price': '5.25',
+            'description': f'Description {i}',
+            'tags': [{'name': 'Shared'}, {'name': f'Tag {i}'}],
+            'ingredients': [{'name': f'Ingredient {i}'}],
+        }
+        item.update(params)
+        payload.append(item)
+
+    return payload
+
+
+class BulkRecipeApiTests(TestCase):
+    """
+    Test bulk recipe create and update API
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123pass')
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_recipes(self):
+        """Test creating many recipes with shared tags in one request."""
+        res = self.client.post(BULK_RECIPE_URL, bulk_payload(3), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['errors'], [{}, {}, {}])
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual([r.title for r in recipes], ['Recipe 0', 'Recipe 1', 'Recipe 2'])
+        self.assertEqual([r['id'] for r in res.data['results']], [r.id for r in recipes])
+        self.assertEqual(Tag.objects.filter(user=self.user, name='Shared').count(), 1)
+        for i, recipe in enumerate(recipes):
+            self.assertEqual(
+                sorted(recipe.tags.values_list('name', flat=True)),
+                ['Shared', f'Tag {i}'],
+            )
+            self.assertEqual(recipe.ingredients.get().name, f'Ingredient {i}')
+
+    def test_bulk_create_ndjson(self):
+        """Test creating recipes from newline delimited JSON."""
+        body = '\n'.join(json.dumps(item) for item in bulk_payload(2)) + '\n'
+        res = self.client.post(
+            BULK_RECIPE_URL,
+            body,
+            content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_query_count_constant(self):
+        """Test bulk create cost does not grow with the number of recipes."""
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(BULK_RECIPE_URL, bulk_payload(2), format='json')
+        Recipe.objects.all().delete()
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(BULK_RECIPE_URL, bulk_payload(50), format='json')
+
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 50)
+
+    def test_bulk_create_partial_errors(self):
+        """Test valid items are saved and invalid ones reported by index."""
+        payload = bulk_payload(3)
+        payload[1]['time_minutes'] = 'not a number'
+        res = self.client.post(BULK_RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertIsNone(res.data['results'][1])
+        self.assertIn('time_minutes', res.data['errors'][1])
+        self.assertEqual(res.data['errors'][0], {})
+        self.assertEqual(
+            sorted(Recipe.objects.filter(user=self.user).values_list('title', flat=True)),
+            ['Recipe 0', 'Recipe 2'],
+        )
+
+    def test_bulk_create_requires_list(self):
+        """Test a non-list payload is rejected."""
+        res = self.client.post(BULK_RECIPE_URL, {'title': 'Single'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_update_recipes(self):
+        """Test updating many recipes by id."""
+        r1 = create_recipe(user=self.user, title='First')
+        r2 = create_recipe(user=self.user, title='Second')
+        r1.tags.add(Tag.objects.create(user=self.user, name='Old'))
+        payload = [
+            {'id': r1.id, 'tags': [{'name': 'New'}]},
+            {'id': r2.id, 'title': 'Second updated'},
+        ]
+        res = self.client.patch(BULK_RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        r1.refresh_from_db()
+        r2.refresh_from_db()
+        self.assertEqual(r1.title, 'First')
+        self.assertEqual(list(r1.tags.values_list('name', flat=True)), ['New'])
+        self.assertEqual(r2.title, 'Second updated')
+        self.assertEqual(res.data['results'][1]['title'], 'Second updated')
+
+    def test_bulk_update_other_users_recipe_error(self):
+        """Test recipes of other users cannot be bulk updated."""
+        other_user = create_user(email='other@example.com', password='test123pass')
+        recipe = create_recipe(user=other_user, title='Theirs')
+        own = create_recipe(user=self.user, title='Mine')
+        payload = [{'id': recipe.id, 'title': 'Hacked'}, {'id': own.id, 'title': 'Mine v2'}]
+        res = self.client.patch(BULK_RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertIn('id', res.data['errors'][0])
+        recipe.refresh_from_db()
+        own.refresh_from_db()
+        self.assertEqual(recipe.title, 'Theirs')
+        self.assertEqual(own.title, 'Mine v2')
 
 
 class ImageUploadTests(TestCase):
@@ -459,6 +891,9 @@ class ImageUploadTests(TestCase):
         self.recipe = create_recipe(user=self.user)
 
     def tearDown(self):
+        if self.recipe.image:
+            for variant, _ in VARIANTS:
+                default_storage.delete(variant_name(self.recipe.image.name, variant))
         self.recipe.image.delete()
 
     def test_upload_image(self):
@@ -483,3 +918,133 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _upload(self, size=(10, 10)):
+        """Upload a generated JPEG image to the recipe."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', size).save(image_file, format='JPEG')
+            image_file.seek(0)
+            return self.client.post(url, {'image': image_file}, format='multipart')
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_upload_image_renders_variants(self):
+        """Test uploading an image renders resized variants next to it."""
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self._upload(size=(3000, 1500))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        for variant, max_size in VARIANTS:
+            path = default_storage.path(variant_name(self.recipe.image.name, variant))
+            with Image.open(path) as variant_image:
+                self.assertEqual(variant_image.format, 'JPEG')
+                self.assertEqual(max(variant_image.size), max_size)
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertTrue(all(res.data['image_variants'].values()))
+
+    @patch('recipe.images.get_executor')
+    def test_upload_image_processed_off_request(self, mock_get_executor):
+        """Test the upload returns before variants are rendered."""
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        mock_get_executor.return_value.submit.assert_called_once()
+        self.assertEqual(
+            res.data['image_variants'],
+            {variant: None for variant, _ in VARIANTS},
+        )
+
+    # The callback runs in the pool's thread, not in the test's transaction
+    @patch('recipe.images.close_old_connections')
+    @patch('recipe.images.render_variants')
+    @patch('recipe.images.get_executor')
+    def test_rendered_variants_recorded(self, mock_get_executor, mock_render, mock_close):
+        """Test variants rendered in the pool are recorded and invalidate cached lists."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload()
+        self.recipe.refresh_from_db()
+        version = get_data_version(self.user.id)
+        future = Future()
+        future.set_result([])
+
+        mock_get_executor.return_value.submit.return_value.add_done_callback.call_args[0][0](
+            future,
+        )
+
+        self.assertNotEqual(get_data_version(self.user.id), version)
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'][0]['image_variants'], {
+            variant: 'http://testserver' + default_storage.url(
+                variant_name(self.recipe.image.name, variant),
+            )
+            for variant, _ in VARIANTS
+        })
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_replaced_image_deleted(self):
+        """Test uploading a new image deletes the previous one and its variants."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload()
+        self.recipe.refresh_from_db()
+        previous = [self.recipe.image.name] + [
+            variant_name(self.recipe.image.name, variant) for variant, _ in VARIANTS
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload()
+
+        self.recipe.refresh_from_db()
+        self.assertNotIn(self.recipe.image.name, previous)
+        for name in previous:
+            self.assertFalse(default_storage.exists(name))
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_variants_of_replaced_image_deleted(self):
+        """Test variants finishing after their image was replaced are deleted."""
+        with patch('recipe.images.process_image'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self._upload()
+        self.recipe.refresh_from_db()
+        first_image = self.recipe.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload()
+        # The variants of the first image are still being rendered
+        for variant, _ in VARIANTS:
+            with open(default_storage.path(variant_name(first_image, variant)), 'wb'):
+                pass
+
+        finish_processing(self.recipe.id, self.user.id, first_image)
+
+        for variant, _ in VARIANTS:
+            self.assertFalse(default_storage.exists(variant_name(first_image, variant)))
+        self.recipe.refresh_from_db()
+        self.assertTrue(all(self.recipe.image_variants.values()))
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_variants_listed_without_storage_lookups(self):
+        """Test listing recipes does not look for variants in the storage."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload()
+
+        with patch.object(default_storage, 'exists', side_effect=AssertionError):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertTrue(all(res.data['results'][0]['image_variants'].values()))
+
+    def test_pool_spawned_with_python(self):
+        """Test pool processes are spawned with Python rather than an embedding server."""
+        with patch('sys.executable', '/usr/local/bin/uwsgi'):
+            executable = get_python_executable()
+
+        self.assertRegex(os.path.basename(executable), r'^python\d+\.\d+$')
+        self.assertTrue(os.path.exists(executable))
+
+    def test_pool_processes_import_images(self):
+        """Test pool processes can load the rendering code without setting up Django."""
+        subprocess.run(
+            [get_python_executable(), '-c', 'from recipe.images import render_variants'],
+            cwd=settings.BASE_DIR, env={}, check=True,
+        )
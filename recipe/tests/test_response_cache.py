@@ -0,0 +1,211 @@
+"""
+Tests for the recipe API response cache
+"""
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Recipe, Tag
+from core.tests.caches import use_shared_cache
+from recipe.caching import CachedResponseMixin, bump_data_version, get_data_version
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def create_recipe(user, **params):
+    """
+    Helper function to create a recipe
+    """
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.25'),
+        'description': 'Sample description',
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@use_shared_cache
+class ResponseCacheTests(TestCase):
+    """
+    Test caching of recipe API responses
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123pass',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """Test an unchanged list is served without querying the database."""
+        create_recipe(user=self.user)
+        first = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPE_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_if_none_match_returns_not_modified(self):
+        """Test a matching ETag returns 304 without querying the database."""
+        recipe = create_recipe(user=self.user)
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_query_string_part_of_key(self):
+        """Test different query strings are cached separately."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        create_recipe(user=self.user).tags.add(tag)
+        create_recipe(user=self.user)
+
+        all_recipes = self.client.get(RECIPE_URL)
+        filtered = self.client.get(RECIPE_URL, {'tags': tag.id})
+
+        self.assertEqual(len(all_recipes.data['results']), 2)
+        self.assertEqual(len(filtered.data['results']), 1)
+        self.assertNotEqual(all_recipes['ETag'], filtered['ETag'])
+
+    def test_write_invalidates_cached_responses(self):
+        """Test writing through the API invalidates the cached list."""
+        first = self.client.get(RECIPE_URL)
+        payload = {
+            'title': 'Soup',
+            'time_minutes': 5,
+            'price': '1.00',
+            'description': 'Hot soup',
+            'tags': [{'name': 'Hot'}],
+        }
+        create_res = self.client.post(RECIPE_URL, payload, format='json')
+        self.assertEqual(create_res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertNotEqual(res['ETag'], first['ETag'])
+
+    def test_tag_update_invalidates_recipe_list(self):
+        """Test renaming a tag is reflected in the cached recipe list."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        create_recipe(user=self.user).tags.add(tag)
+        self.client.get(RECIPE_URL)
+
+        url = reverse('recipe:tag-detail', args=[tag.id])
+        self.client.patch(url, {'name': 'Plant based'})
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Plant based')
+
+    def test_bulk_create_invalidates_cached_responses(self):
+        """Test bulk writes invalidate the cached list."""
+        self.client.get(TAGS_URL)
+        payload = [{
+            'title': 'Soup',
+            'time_minutes': 5,
+            'price': '1.00',
+            'description': 'Hot soup',
+            'tags': [{'name': 'Hot'}],
+        }]
+        bulk_res = self.client.post(reverse('recipe:recipe-bulk'), payload, format='json')
+        self.assertEqual(bulk_res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual([t['name'] for t in res.data['results']], ['Hot'])
+
+    def test_cache_scoped_to_user(self):
+        """Test cached responses are not shared between users."""
+        create_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='test123pass',
+        )
+        self.client.force_authenticate(other_user)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_version_bumped_again_on_commit(self):
+        """Test responses rendered before a write commits are not cached for long."""
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_data_version(self.user.pk)
+            version = get_data_version(self.user.pk)
+
+        self.assertNotEqual(get_data_version(self.user.pk), version)
+
+
+@use_shared_cache
+@override_settings(DB_REPLICAS=['replica_0'])
+class ReplicaRoutedCacheTests(SimpleTestCase):
+    """Test caching responses of requests routed to a replica."""
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self):
+        """Return the cached database alias recipes were read from."""
+        def read_db(request):
+            return Response(router.db_for_read(Recipe))
+
+        def view(request):
+            request = Request(request)
+            request.user = SimpleNamespace(pk=1)
+            request.accepted_renderer = JSONRenderer()
+            return CachedResponseMixin().cached_response(read_db, request)
+
+        return ReplicaRoutingMiddleware(view)(RequestFactory().get(RECIPE_URL))
+
+    def test_misses_rendered_from_primary(self):
+        """Test responses are not cached from a replica, which may lag behind."""
+        first = self.get()
+        second = self.get()
+
+        self.assertEqual(first.data, 'default')
+        self.assertEqual(second.data, 'default')
+        self.assertEqual(second['ETag'], first['ETag'])
+
+
+class ProcessLocalCacheTests(TestCase):
+    """Test responses are not cached in a process-local cache."""
+
+    def test_responses_not_cached(self):
+        """Test every request renders the response, without an ETag."""
+        client = APIClient()
+        client.force_authenticate(
+            get_user_model().objects.create_user(email='user@example.com', password='pass'),
+        )
+        client.get(RECIPE_URL)
+
+        with self.assertNumQueries(1):
+            res = client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', res)
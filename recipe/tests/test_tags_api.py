@@ -4,13 +4,17 @@ Tests for the tags API
 from decimal import Decimal
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection
+from django.db.models import F
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Tag, Recipe
 
+from recipe.filters import ILikePrefix, has_trigram_support
 from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
@@ -70,7 +74,7 @@ class PrivateTagsApiTests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """
@@ -83,9 +87,9 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
-        self.assertEqual(res.data[0]['id'], tag.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+        self.assertEqual(res.data['results'][0]['id'], tag.id)
 
     def test_update_tag(self):
         """
@@ -101,6 +105,28 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload['name'])
 
+    def test_rename_tag_to_existing_name(self):
+        """Test renaming a tag to the name of another of the user's is rejected."""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'Dessert'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Breakfast')
+
+    def test_rename_tag_to_other_users_name(self):
+        """Test names only need to be unique per user, and may be kept."""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=create_user(email='other@example.com'), name='Dessert')
+
+        res = self.client.put(detail_url(tag.id), {'name': 'Dessert'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.put(detail_url(tag.id), {'name': 'Dessert'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
     def test_delete_tag(self):
         """
         Test deleting a tag
@@ -129,8 +155,8 @@ class PrivateTagsApiTests(TestCase):
 
         s1 = TagSerializer(tag1)
         s2 = TagSerializer(tag2)
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_tags_unique(self):
         """Test filtered tags returns a unique list."""
@@ -153,4 +179,150 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tags_paginated_by_cursor(self):
+        """Test tags are returned in cursor paginated pages."""
+        tags = [Tag.objects.create(user=self.user, name=f'Tag {i}') for i in range(3)]
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        self.assertEqual(
+            [t['id'] for t in res.data['results']],
+            [tags[2].id, tags[1].id],
+        )
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual([t['id'] for t in res.data['results']], [tags[0].id])
+        self.assertIsNone(res.data['next'])
+
+    def _create_used_tags(self):
+        """Create tags used by 2, 0 and 2 recipes, oldest first."""
+        names = ('Vegan', 'Keto', 'Quick')
+        tags = [Tag.objects.create(user=self.user, name=name) for name in names]
+        for i in range(2):
+            recipe = Recipe.objects.create(
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=Decimal('5.00'),
+                user=self.user,
+            )
+            recipe.tags.add(tags[0], tags[2])
+
+        return tags
+
+    def test_tags_with_counts(self):
+        """Test listing tags with the number of recipes using them."""
+        tags = self._create_used_tags()
+
+        res = self.client.get(TAGS_URL, {'with_counts': 1, 'assigned_only': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [
+            {'id': tags[2].id, 'name': 'Quick', 'recipe_count': 2},
+            {'id': tags[0].id, 'name': 'Vegan', 'recipe_count': 2},
+        ])
+
+    def test_tags_ordered_by_recipe_count(self):
+        """Test most used tags come first, paged with ties broken on id."""
+        tags = self._create_used_tags()
+
+        res = self.client.get(TAGS_URL, {'ordering': '-recipe_count', 'page_size': 1})
+        ids = [t['id'] for t in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [t['id'] for t in res.data['results']]
+
+        self.assertEqual(ids, [tags[2].id, tags[0].id, tags[1].id])
+        self.assertEqual(res.data['results'][0]['recipe_count'], 0)
+
+    def test_tags_ordered_by_recipe_count_without_offsets(self):
+        """Test tied usages are paged by key rather than by skipping rows."""
+        tags = [Tag.objects.create(user=self.user, name=f'Tag {i}') for i in range(5)]
+
+        res = self.client.get(TAGS_URL, {'ordering': '-recipe_count', 'page_size': 2})
+        ids = [t['id'] for t in res.data['results']]
+        while res.data['next']:
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(res.data['next'])
+            ids += [t['id'] for t in res.data['results']]
+            self.assertNotIn('OFFSET', queries[-1]['sql'])
+
+        self.assertEqual(ids, [tag.id for tag in reversed(tags)])
+
+    def test_boolean_params(self):
+        """Test boolean parameters accept the usual spellings and reject others."""
+        res = self.client.get(TAGS_URL, {'with_counts': 'yes', 'assigned_only': 'false'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        for name in ('with_counts', 'assigned_only'):
+            res = self.client.get(TAGS_URL, {name: 'maybe'})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(name, res.data)
+
+    def test_autocomplete(self):
+        """Test autocompleting tags, names starting with the text first."""
+        dessert = Tag.objects.create(user=self.user, name='Dessert')
+        dinner = Tag.objects.create(user=self.user, name='Dinner')
+        Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick dinner')
+        Tag.objects.create(user=create_user(email='other@example.com'), name='Dinner party')
+
+        res = self.client.get(TAGS_URL, {'q': 'din'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][:2], [
+            {'id': dinner.id, 'name': 'Dinner'},
+            {'id': quick.id, 'name': 'Quick dinner'},
+        ])
+        self.assertNotIn(dessert.id, [t['id'] for t in res.data['results']])
+        self.assertNotIn('next', res.data)
+
+    def test_autocomplete_limit(self):
+        """Test autocomplete returns at most limit matches."""
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'Soup {i}')
+
+        res = self.client.get(TAGS_URL, {'q': 'soup', 'limit': 3})
+
+        self.assertEqual([t['name'] for t in res.data['results']], ['Soup 0', 'Soup 1', 'Soup 2'])
+
+    def test_autocomplete_invalid(self):
+        """Test empty text matches nothing and a bad limit is rejected."""
+        Tag.objects.create(user=self.user, name='Soup')
+
+        self.assertEqual(self.client.get(TAGS_URL, {'q': ' '}).data['results'], [])
+        res = self.client.get(TAGS_URL, {'q': 'soup', 'limit': 'many'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_fuzzy(self):
+        """Test autocomplete tolerates typos with pg_trgm."""
+        if not has_trigram_support(connection.alias):
+            self.skipTest('pg_trgm is not installed')
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+
+        res = self.client.get(TAGS_URL, {'q': 'brekfast'})
+
+        self.assertEqual(res.data['results'], [{'id': tag.id, 'name': 'Breakfast'}])
+
+    def test_autocomplete_prefix_served_by_trigram_index(self):
+        """Test prefix matches can use the trigram index of migration 0009."""
+        if not has_trigram_support(connection.alias):
+            self.skipTest('pg_trgm is not installed')
+        queryset = Tag.objects.filter(ILikePrefix(F('name'), 'din'))
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+
+        self.assertIn('core_tag_name_trgm_idx', plan)
+
+    def test_prefix_lookup(self):
+        """Test prefixes match case-insensitively with ILIKE, wildcards literally."""
+        sale = Tag.objects.create(user=self.user, name='50% Off')
+        Tag.objects.create(user=self.user, name='500 calories')
+        queryset = Tag.objects.filter(ILikePrefix(F('name'), '50% o'))
+
+        self.assertIn('ILIKE', str(queryset.query))
+        self.assertNotIn('UPPER', str(queryset.query))
+        self.assertEqual(list(queryset), [sale])
+        self.assertFalse(Tag.objects.filter(ILikePrefix(F('name'), '5_0')).exists())
@@ -2,6 +2,9 @@
 Views for the recipe APIs
 """
 
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from drf_spectacular.utils import (
     extend_schema,
     extend_schema_view,
@@ -9,13 +12,66 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from core.authentication import CachedTokenAuthentication
+from core.parsers import FastJSONParser
 from core.models import Recipe, Tag, Ingredient
+from core.profiling import ProfiledViewMixin, phase
 from recipe import serializers
+from recipe.caching import CachedResponseMixin
+from recipe.filters import (
+    MATCH_CHOICES,
+    RecipeAttrOrderingFilter,
+    RecipeSearchOrderingFilter,
+    autocomplete_recipe_attrs,
+    filter_recipe_attrs,
+    filter_recipes,
+    get_autocomplete_limit,
+    wants_recipe_counts,
+)
+from recipe.images import schedule_image_processing
+from recipe.pagination import IdCursorPagination
+from recipe.parsers import NDJSONParser
+
+
+def optimize_for_serializer(queryset, serializer_class):
+    """
+    Load only what serializer_class renders.
+
+    Model fields are restricted with only() and many-to-many fields rendered
+    by nested serializers are prefetched in primary key order, so a page costs a fixed number of
+    queries instead of one per row and relation.
+    """
+    model_meta = queryset.model._meta
+    only, prefetches = [], []
+    for name in serializer_class.Meta.fields:
+        try:
+            field = model_meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.many_to_many:
+            nested = serializer_class._declared_fields[name].child
+            related = field.related_model.objects.only(*nested.Meta.fields).order_by('pk')
+            prefetches.append(Prefetch(name, queryset=related))
+        else:
+            only.append(name)
+
+    return queryset.only(*only).prefetch_related(*prefetches)
+
+
+class OptimizedQuerysetMixin:
+    """Load only what the action's serializer renders on read actions."""
+    optimized_actions = ('list', 'retrieve')
+
+    def optimize_queryset(self, queryset):
+        """Apply only() and prefetches for the current action."""
+        if self.action not in self.optimized_actions:
+            return queryset
+
+        return optimize_for_serializer(queryset, self.get_serializer_class())
 
 
 @extend_schema(tags=['Recipe'])
@@ -32,37 +88,62 @@ from recipe import serializers
                 OpenApiTypes.STR,
                 description='Comma separated list of ingredient IDs to filter',
             ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR, enum=list(MATCH_CHOICES),
+                description='Return recipes having any (default) or all of the filtered IDs',
+            ),
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description='Full-text search over title and description, best matches first',
+            ),
         ]
     )
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ProfiledViewMixin,
+                    CachedResponseMixin,
+                    OptimizedQuerysetMixin,
+                    viewsets.ModelViewSet):
     """
     Manage recipes in the database
     """
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
-
-    @staticmethod
-    def _params_to_ints(qs):
-        """Convert a list of strings to integers."""
-        return [int(str_id) for str_id in qs.split(',')]
+    pagination_class = IdCursorPagination
+    filter_backends = [RecipeSearchOrderingFilter]
+    bulk_max_items = 1000
 
     def get_queryset(self):
         """Retrieve recipes for authenticated user."""
-        query_params = self.request.query_params
-        tags = query_params.get('tags')
-        ingredients = query_params.get('ingredients')
         queryset = self.queryset.filter(user=self.request.user)
-        if tags:
-            tag_ids = RecipeViewSet._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = RecipeViewSet._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        queryset = filter_recipes(queryset, self.request.query_params)
+
+        return self.optimize_queryset(queryset.order_by('-id'))
+
+    def list(self, request, *args, **kwargs):
+        if not settings.API_FAST_READ:
+            return super().list(request, *args, **kwargs)
+
+        return self.cached_response(self._fast_list, request, *args, **kwargs)
+
+    def _fast_list(self, request, *args, **kwargs):
+        """List recipes rendered from values() rows by FastReadSerializer."""
+        reader = serializers.FastReadSerializer(
+            self.get_serializer_class(),
+            context=self.get_serializer_context(),
+        )
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(reader.get_queryset(queryset))
+        with phase('serialize'):
+            data = reader.to_representation(page)
 
-        return queryset.order_by('-id').distinct()
+        return self.get_paginated_response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
 
     def get_serializer_class(self):
         """
@@ -83,16 +164,96 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        """Upload an image to recipe."""
+        """Upload an image to recipe; its variants are rendered in the background."""
         recipe = self.get_object()
+        replaced_image = recipe.image.name
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            recipe = serializer.save(image_variants={})
+            schedule_image_processing(recipe, replaced_image=replaced_image)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _get_bulk_instances(self, items, errors):
+        """Look up the recipes referenced by a bulk update, aligned with items."""
+        ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+        recipes = self.get_queryset().filter(id__in=[i for i in ids if isinstance(i, int)])
+        recipes_by_id = {recipe.id: recipe for recipe in recipes}
+        instances = []
+        for index, recipe_id in enumerate(ids):
+            recipe = recipes_by_id.pop(recipe_id, None) if isinstance(recipe_id, int) else None
+            if recipe is None:
+                errors[index] = {'id': ['Recipe not found or listed more than once.']}
+            instances.append(recipe)
+
+        return instances
+
+    def _get_bulk_serializer(self, items, instances, indexes):
+        """Return a list serializer for the items at the given indexes."""
+        data = [items[index] for index in indexes]
+        if instances is None:
+            return self.get_serializer(data=data, many=True)
+
+        return self.get_serializer(
+            [instances[index] for index in indexes],
+            data=data,
+            many=True,
+            partial=True,
+        )
+
+    @extend_schema(request=serializers.RecipeDetailSerializer(many=True))
+    @action(
+        methods=['POST', 'PATCH'],
+        detail=False,
+        url_path='bulk',
+        parser_classes=[FastJSONParser, NDJSONParser],
+    )
+    def bulk(self, request):
+        """
+        Create (POST) or update (PATCH, by id) many recipes in one transaction.
+
+        Accepts a JSON array or NDJSON. Valid items are saved even if others
+        fail; results and errors are returned aligned with the input.
+        """
+        items = request.data
+        if not isinstance(items, list) or len(items) > self.bulk_max_items:
+            msg = f'Expected a list of at most {self.bulk_max_items} recipes.'
+            return Response({'detail': msg}, status=status.HTTP_400_BAD_REQUEST)
+
+        errors = [{} for _ in items]
+        instances = None
+        if request.method == 'PATCH':
+            instances = self._get_bulk_instances(items, errors)
+
+        indexes = [index for index, error in enumerate(errors) if not error]
+        serializer = self._get_bulk_serializer(items, instances, indexes)
+        if not serializer.is_valid():
+            for index, error in zip(indexes, serializer.errors):
+                errors[index] = error
+            indexes = [index for index in indexes if not errors[index]]
+            serializer = self._get_bulk_serializer(items, instances, indexes)
+            serializer.is_valid(raise_exception=True)
+
+        results = [None] * len(items)
+        if indexes:
+            if instances is None:
+                serializer.save(user=self.request.user)
+            else:
+                serializer.save()
+            for index, data in zip(indexes, serializer.data):
+                results[index] = data
+
+        if not any(errors):
+            response_status = status.HTTP_201_CREATED if instances is None else status.HTTP_200_OK
+        elif indexes:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        return Response({'results': results, 'errors': errors}, status=response_status)
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -102,26 +263,73 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 OpenApiTypes.INT, enum=[0, 1],
                 description='Filter by items assigned to recipes. Put 1 for assigned',
             ),
+            OpenApiParameter(
+                'with_counts',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Put 1 to include the number of recipes using each item',
+            ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR, enum=['-id', '-recipe_count', 'recipe_count'],
+                description='Order by id (default) or by number of recipes using each item',
+            ),
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description=(
+                    'Autocomplete: return the id and name of the best matches for this text, '
+                    'unpaginated'
+                ),
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='Number of autocomplete matches (default 10, at most 50)',
+            ),
         ]
     )
 )
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
+class BaseRecipeAttrViewSet(ProfiledViewMixin,
+                            CachedResponseMixin,
+                            OptimizedQuerysetMixin,
+                            mixins.DestroyModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet):
     """Base viewset for recipe attributes."""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = IdCursorPagination
+    filter_backends = [RecipeAttrOrderingFilter]
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
-        query_params = self.request.query_params
-        assigned_only = bool(int(query_params.get('assigned_only', 0)))
         queryset = self.queryset.filter(user=self.request.user)
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+        queryset = filter_recipe_attrs(queryset, self.request.query_params)
+
+        return self.optimize_queryset(queryset.order_by('-id'))
+
+    def list(self, request, *args, **kwargs):
+        if 'q' in request.query_params:
+            return self.cached_response(self.autocomplete, request, *args, **kwargs)
+
+        return super().list(request, *args, **kwargs)
 
-        return queryset.order_by('-id').distinct()
+    def autocomplete(self, request, *args, **kwargs):
+        """Return the best matches for the q parameter, id and name only."""
+        text = request.query_params['q'].strip()
+        limit = get_autocomplete_limit(request.query_params)
+        queryset = self.queryset.filter(user=self.request.user)
+        results = list(autocomplete_recipe_attrs(queryset, text, limit)) if text else []
+
+        return Response({'results': results})
+
+    def get_serializer_class(self):
+        """Include usage counts in lists that asked for them."""
+        if self.action == 'list' and wants_recipe_counts(self.request.query_params):
+            return self.count_serializer_class
+
+        return self.serializer_class
 
 
 @extend_schema(tags=['Tag'])
@@ -130,6 +338,7 @@ class TagViewSet(BaseRecipeAttrViewSet):
     Manage tags in the database
     """
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagCountSerializer
     queryset = Tag.objects.all()
 
 
@@ -137,4 +346,5 @@ class TagViewSet(BaseRecipeAttrViewSet):
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database."""
     serializer_class = serializers.IngredientSerializer
+    count_serializer_class = serializers.IngredientCountSerializer
     queryset = Ingredient.objects.all()
@@ -2,8 +2,33 @@
 
 set -e
 
-python manage.py wait_for_db
-python manage.py collectstatic --noinput
-python manage.py migrate
+# Collects static files, waits for the database and migrates it, skipping
+# the steps with nothing to do, and logs how long each took.
+python manage.py startup
 
-uwsgi --ini uwsgi.ini
+# Workers share their metrics through files in this directory.
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/metrics}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# The uvicorn processes serving the async endpoints share port 8086, each
+# run as a daemon of the uWSGI master, which restarts it if it dies and
+# stops it on shutdown.
+set --
+i=0
+while [ "$i" -lt "${ASGI_WORKERS:-2}" ]; do
+    set -- "$@" --attach-daemon2 \
+        "cmd=exec python manage.py serve_asgi --port 8086,stopsignal=15,reloadsignal=15"
+    i=$((i + 1))
+done
+
+# One uWSGI process per core; on multi-core nodes idle ones are stopped
+# down to half of them (see uwsgi.ini).
+export UWSGI_PROCESSES="${UWSGI_PROCESSES:-$(nproc)}"
+if [ "$UWSGI_PROCESSES" -gt 1 ]; then
+    export UWSGI_CHEAPER="${UWSGI_CHEAPER:-$(( (UWSGI_PROCESSES + 1) / 2 ))}"
+    export UWSGI_CHEAPER_INITIAL="${UWSGI_CHEAPER_INITIAL:-$UWSGI_PROCESSES}"
+fi
+
+# uWSGI replaces the shell, so it gets the container's stop signal.
+exec uwsgi --ini uwsgi.ini "$@"
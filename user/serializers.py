@@ -1,10 +1,12 @@
 """
 Serializers for user API View
 """
-from django.contrib.auth import get_user_model, authenticate
+from django.contrib.auth import get_user_model
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
+from core import passwords
+
 
 class UserSerializer(serializers.ModelSerializer):
     """
@@ -61,11 +63,8 @@ class AuthTokenSerializer(serializers.Serializer):
         email = attrs.get('email')
         password = attrs.get('password')
 
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password,
-        )
+        # Hashes on the password executor, see core/passwords.py
+        user = passwords.authenticate(email, password)
 
         if not user:
             msg = _('Unable to authenticate with provided credentials')
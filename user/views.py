@@ -2,15 +2,17 @@
 Views for the user API
 """
 from drf_spectacular.utils import extend_schema
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core.authentication import CachedTokenAuthentication
+from core.profiling import ProfiledViewMixin
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
 @extend_schema(tags=['User'])
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(ProfiledViewMixin, generics.CreateAPIView):
     """
     Create a new user in the system
     """
@@ -18,21 +20,22 @@ class CreateUserView(generics.CreateAPIView):
 
 
 @extend_schema(tags=['User'])
-class CreateTokenView(ObtainAuthToken):
+class CreateTokenView(ProfiledViewMixin, ObtainAuthToken):
     """
     Create a new auth token for user
     """
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
 
 
 @extend_schema(tags=['User'])
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ProfiledViewMixin, generics.RetrieveUpdateAPIView):
     """
     Manage the authenticated user
     """
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):